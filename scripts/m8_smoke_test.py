@@ -13,7 +13,6 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent
 SRC_DIR = ROOT_DIR / "src"
 DATA_DIR = ROOT_DIR / "data"
-PROFILES_DIR = DATA_DIR / "profiles"
 BEHAVIOR_EVENTS_FILE = DATA_DIR / "behavior_events.jsonl"
 SAVED_NOTES_FILE = DATA_DIR / "saved_notes.jsonl"
 TEST_USER_ID = "m8-smoke-user"
@@ -44,11 +43,9 @@ def _run():
     import sys
 
     sys.path.insert(0, str(SRC_DIR))
-    from main import handle_command  # pylint: disable=import-error
+    from main import handle_command, reset_profile  # pylint: disable=import-error
 
-    profile_path = PROFILES_DIR / "{0}.json".format(TEST_USER_ID)
-    if profile_path.exists():
-        profile_path.unlink()
+    reset_profile(TEST_USER_ID)
 
     outputs = []
     for command in [
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Offline replay of behavior events against a ranker.
+
+Streams data/behavior_events.jsonl (rotated segments first, then the active
+file) in order and rebuilds state as it goes:
+  - a pool snapshot: the most recently seen items (LRU, optionally seeded from a
+    content pool JSON), standing in for the pool each user was served from;
+  - per-user profiles (LRU), updated through main.apply_feedback, the same rules
+    the command handlers apply for view / like / skip / save.
+At every recorded `view` the ranker is re-run over the snapshot minus the
+user's read history and its latency is measured. The ranking is then judged by
+the user's next like/save: hit@k if the item is in the top k, MRR by its rank.
+
+Memory is bounded by --max-items, --max-users and --latency-samples, so the
+tool runs on arbitrarily large logs.
+
+Usage:
+  python3 scripts/replay_eval.py
+  python3 scripts/replay_eval.py --events data/behavior_events.jsonl --pool shared/content_pool.json
+  python3 scripts/replay_eval.py --ranker top_k --k 10 --max-views 2000
+  python3 scripts/replay_eval.py --ranker mypackage.rankers:rank
+A custom ranker is called as ranker(items, profile, recent_sources, weights) and
+returns items ordered best first (the rank_items signature).
+"""
+
+import argparse
+import importlib
+import json
+import random
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+DEFAULT_EVENTS_FILE = ROOT_DIR / "data" / "behavior_events.jsonl"
+
+sys.path.insert(0, str(SRC_DIR))
+
+import main  # noqa: E402  pylint: disable=import-error,wrong-import-position
+from recommend.scorer import rank_items, top_k_items  # noqa: E402  pylint: disable=import-error,wrong-import-position
+from tracker.event_segments import event_time, iter_event_lines, manifest_path  # noqa: E402  pylint: disable=import-error,wrong-import-position
+
+POSITIVE_ACTIONS = ("like", "save")
+Ranker = Callable[[Sequence[Dict[str, Any]], Dict[str, Any], Sequence[str], Dict[str, float]], List[Dict[str, Any]]]
+
+
+def iter_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield events one line at a time (rotated segments first); malformed lines are skipped."""
+    for line in iter_event_lines(path):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line.decode("utf-8"))
+        except Exception:
+            continue
+        if isinstance(row, dict):
+            yield row
+
+
+def event_item(event: Dict[str, Any]) -> Dict[str, Any]:
+    tags = event.get("tags", [])
+    return {
+        "item_key": str(event.get("item_id", "") or ""),
+        "title": str(event.get("item_title", "") or ""),
+        "summary": "",
+        "source": str(event.get("source", "") or ""),
+        "tags": [str(tag) for tag in tags] if isinstance(tags, list) else [],
+        "category": str(event.get("category", "") or ""),
+    }
+
+
+def resolve_ranker(name: str, k: int) -> Ranker:
+    if name == "rank_items":
+        return rank_items
+    if name == "top_k":
+        return lambda items, profile, recent_sources, weights: top_k_items(items, profile, recent_sources, weights, k)
+    module_name, _, attr = name.partition(":")
+    if not module_name or not attr:
+        raise ValueError("ranker must be rank_items, top_k or module:function, got {0!r}".format(name))
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LatencyReservoir:
+    """Uniform sample of ranking latencies (Algorithm R) for percentile estimates."""
+
+    def __init__(self, capacity: int, seed: int = 0) -> None:
+        self.capacity = max(1, int(capacity))
+        self.samples: List[float] = []
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._random = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        if len(self.samples) < self.capacity:
+            self.samples.append(value)
+            return
+        slot = self._random.randrange(self.count)
+        if slot < self.capacity:
+            self.samples[slot] = value
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        position = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+        return ordered[position]
+
+
+class ReplayState:
+    def __init__(self, max_items: int, max_users: int) -> None:
+        self.max_items = max(1, int(max_items))
+        self.max_users = max(1, int(max_users))
+        self.items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # user_id -> {item_key: rank} of the latest unjudged ranking.
+        self.pending: Dict[str, Dict[str, int]] = {}
+
+    def seed_pool(self, pool_path: Path) -> int:
+        with pool_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        articles = data.get("articles", []) if isinstance(data, dict) else []
+        for article in articles:
+            if isinstance(article, dict):
+                self.remember_item(main.pool_item(article))
+        return len(self.items)
+
+    def remember_item(self, item: Dict[str, Any]) -> None:
+        key = item.get("item_key", "")
+        if not key:
+            return
+        known = self.items.pop(key, None)
+        if known is not None:
+            # Events carry less than the pool; keep whatever fields the first copy had.
+            item = dict(item, **{field: value for field, value in known.items() if value and not item.get(field)})
+        self.items[key] = item
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def profile(self, user_id: str) -> Dict[str, Any]:
+        profile = self.profiles.pop(user_id, None)
+        if profile is None:
+            profile = main.new_profile()
+        self.profiles[user_id] = profile
+        while len(self.profiles) > self.max_users:
+            evicted, _ = self.profiles.popitem(last=False)
+            self.pending.pop(evicted, None)
+        return profile
+
+
+def replay(
+    events_path: Path,
+    ranker: Ranker,
+    k: int = 10,
+    pool_path: Optional[Path] = None,
+    max_items: int = 5000,
+    max_users: int = 10000,
+    max_views: int = 0,
+    latency_samples: int = 100000,
+) -> Dict[str, Any]:
+    state = ReplayState(max_items=max_items, max_users=max_users)
+    seeded = state.seed_pool(pool_path) if pool_path else 0
+    latencies = LatencyReservoir(latency_samples)
+    weights = dict(main.BASE_RECOMMEND_WEIGHTS)
+
+    events = 0
+    views = 0
+    judged = 0
+    hits = 0
+    reciprocal_rank_sum = 0.0
+    started = time.perf_counter()
+
+    for event in iter_events(events_path):
+        events += 1
+        action = str(event.get("action", "") or "")
+        user_id = str(event.get("user_id", "") or "")
+        item = event_item(event)
+        if not user_id or not item["item_key"]:
+            continue
+        now = event_time(event) or time.time()
+        state.remember_item(item)
+        profile = state.profile(user_id)
+
+        if action == "view":
+            read = set(profile.get("read_history", []))
+            candidates = [value for key, value in state.items.items() if key not in read]
+            rank_profile = main.ranking_profile(profile, now=now)
+            recent_sources = profile.get("source_history", [])[-5:]
+
+            tick = time.perf_counter()
+            ranked = ranker(candidates, rank_profile, recent_sources, weights)
+            latencies.add(time.perf_counter() - tick)
+
+            state.pending[user_id] = {
+                str(value.get("item_key", "")): position for position, value in enumerate(ranked[:k], start=1)
+            }
+            main.apply_feedback(profile, action, item, now=now)
+            views += 1
+            if max_views and views >= max_views:
+                break
+        elif action in POSITIVE_ACTIONS:
+            ranking = state.pending.pop(user_id, None)
+            if ranking is not None:
+                judged += 1
+                position = ranking.get(item["item_key"])
+                if position is not None:
+                    hits += 1
+                    reciprocal_rank_sum += 1.0 / position
+            main.apply_feedback(profile, action, item, now=now)
+        elif action == "skip":
+            main.apply_feedback(profile, action, item, now=now)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "events": events,
+        "views_ranked": views,
+        "seeded_items": seeded,
+        "elapsed_sec": round(elapsed, 3),
+        "events_per_sec": round(events / elapsed, 1) if elapsed > 0 else 0.0,
+        "rankings_per_sec": round(latencies.count / latencies.total, 1) if latencies.total > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(1000.0 * latencies.total / latencies.count, 3) if latencies.count else 0.0,
+            "p50": round(1000.0 * latencies.percentile(50), 3),
+            "p90": round(1000.0 * latencies.percentile(90), 3),
+            "p99": round(1000.0 * latencies.percentile(99), 3),
+            "max": round(1000.0 * latencies.maximum, 3),
+        },
+        "k": k,
+        "judged_views": judged,
+        "hit_rate_at_k": round(hits / judged, 4) if judged else 0.0,
+        "mrr_at_k": round(reciprocal_rank_sum / judged, 4) if judged else 0.0,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay behavior events against a ranker")
+    parser.add_argument("--events", default=str(DEFAULT_EVENTS_FILE), help="behavior events jsonl")
+    parser.add_argument("--pool", default="", help="optional content pool JSON to seed the snapshot")
+    parser.add_argument("--ranker", default="rank_items", help="rank_items, top_k or module:function")
+    parser.add_argument("--k", type=int, default=10, help="cutoff for hit rate and MRR")
+    parser.add_argument("--max-items", type=int, default=5000, help="items kept in the pool snapshot")
+    parser.add_argument("--max-users", type=int, default=10000, help="profiles kept in memory")
+    parser.add_argument("--max-views", type=int, default=0, help="stop after this many rankings (0 = all)")
+    parser.add_argument("--latency-samples", type=int, default=100000, help="reservoir size for percentiles")
+    return parser.parse_args()
+
+
+def _run() -> None:
+    args = _parse_args()
+    events_path = Path(args.events)
+    # Right after a rotation only the segments (and their manifest) exist.
+    if not events_path.exists() and not manifest_path(events_path).exists():
+        raise SystemExit("events file not found: {0}".format(events_path))
+    k = max(1, args.k)
+    report = replay(
+        events_path,
+        resolve_ranker(args.ranker, k),
+        k=k,
+        pool_path=Path(args.pool) if args.pool else None,
+        max_items=args.max_items,
+        max_users=args.max_users,
+        max_views=args.max_views,
+        latency_samples=args.latency_samples,
+    )
+    report["ranker"] = args.ranker
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    _run()
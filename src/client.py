@@ -0,0 +1,105 @@
+"""
+刷博客 Skill - 常驻服务的轻量客户端
+
+用法与 main.py 相同，输出也相同（卡片正文 + POOL_* 状态行 + 按钮行）：
+    python3 src/client.py /brush like
+
+服务在线时只做一次 Unix socket 往返，不导入抓取/推荐等重模块；
+服务不可用时回退为进程内执行 main.handle_command。
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from interaction.telegram import render_cli_output
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SOCKET_PATH = os.getenv("BRUSH_SERVER_SOCKET", "") or str(ROOT_DIR / "shared" / "brush.sock")
+CLIENT_TIMEOUT_SECONDS = 30
+MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+
+def send_request(payload: Dict[str, Any], socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = CLIENT_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Send one JSON request line to the server and return its decoded JSON reply.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        write_message(sock, payload)
+        return read_message(sock)
+    finally:
+        sock.close()
+
+
+def write_message(sock: socket.socket, payload: Dict[str, Any]) -> None:
+    sock.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def read_message(sock: socket.socket) -> Dict[str, Any]:
+    chunks: List[bytes] = []
+    received = 0
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        received += len(chunk)
+        if chunk.endswith(b"\n"):
+            break
+        if received > MAX_MESSAGE_BYTES:
+            raise ValueError("message too large")
+    raw = b"".join(chunks).strip()
+    if not raw:
+        raise ConnectionError("empty message")
+    data = json.loads(raw.decode("utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError("message must be a JSON object")
+    return data
+
+
+def run_command(command: str, args: List[str], user_id: str, socket_path: str = DEFAULT_SOCKET_PATH) -> Dict[str, Any]:
+    """
+    Run one skill command through the server, falling back to in-process handling.
+    """
+    try:
+        reply = send_request(
+            {"command": command, "args": args, "user_id": user_id, "context": {}},
+            socket_path=socket_path,
+        )
+    except (FileNotFoundError, ConnectionRefusedError):
+        # 服务未启动：回退为进程内执行，仅此路径导入重模块。
+        from main import handle_command
+
+        return handle_command(command, args, user_id, {})
+    except (OSError, ValueError) as exc:
+        return {"message": "服务响应异常：{0}".format(exc)}
+
+    result = reply.get("result", {})
+    if not reply.get("ok") or not isinstance(result, dict):
+        # 服务端已处理过该命令，不在本地重放，避免重复写入。
+        return {"message": "服务处理失败：{0}".format(reply.get("error", "unknown"))}
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Brush blog skill client")
+    parser.add_argument("command", nargs="?", default="/brush", help="skill command, e.g. /brush")
+    parser.add_argument("args", nargs="*", help="command args")
+    parser.add_argument("--user", default="cli-user", help="user id, default cli-user")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="server unix socket path")
+    args = parser.parse_args()
+
+    result = run_command(args.command, args.args, args.user, socket_path=args.socket)
+    sys.stdout.write(render_cli_output(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,6 +2,7 @@
 import html
 import re
 from typing import List
+from urllib.parse import urlsplit, urlunsplit
 
 
 def clean_text(text: str) -> str:
@@ -35,3 +36,22 @@ def summarize_text(text: str, max_sentences: int = 3, max_chars: int = 220) -> s
         summary = summary[: max_chars - 1].rstrip() + "…"
 
     return summary or "暂无摘要"
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL: lower-cased scheme and host, no trailing
+    slash or fragment. Used for pool dedup and as the deep-read cache key.
+    """
+    text = (url or "").strip()
+    if not text:
+        return ""
+    try:
+        parsed = urlsplit(text)
+        scheme = (parsed.scheme or "https").lower()
+        netloc = parsed.netloc.lower()
+        path = parsed.path or "/"
+        normalized = urlunsplit((scheme, netloc, path.rstrip("/") or "/", parsed.query, ""))
+        return normalized
+    except Exception:
+        return text
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 2
+
+
+class _DeadlineExceeded(Exception):
+    """A job gave up because the overall deadline passed before it could start."""
+
+
+def fetch_concurrently(
+    jobs: Sequence[Any],
+    fetch_fn: Callable[[Any], Any],
+    url_of: Callable[[Any], str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+    deadline_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Run fetch_fn over jobs with a global worker cap, a per-host cap and an overall deadline.
+
+    Results keep the input order: results[i] belongs to jobs[i] and is None when the job
+    failed, raised, or did not finish before the deadline.
+    """
+    total = len(jobs)
+    results: List[Any] = [None] * total
+    stats = {"attempted": total, "completed": 0, "failed": 0, "timed_out": 0}
+    if total == 0:
+        return {"results": results, "stats": stats}
+
+    started_at = time.monotonic()
+    deadline_at = started_at + deadline_seconds if deadline_seconds and deadline_seconds > 0 else None
+    host_slots: Dict[str, threading.BoundedSemaphore] = {}
+    for job in jobs:
+        host = _host_of(url_of(job))
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(max(1, int(per_host_limit)))
+
+    def _run(job: Any) -> Any:
+        slot = host_slots[_host_of(url_of(job))]
+        wait_timeout = -1.0
+        if deadline_at is not None:
+            wait_timeout = max(0.0, deadline_at - time.monotonic())
+        if not slot.acquire(timeout=wait_timeout):
+            raise _DeadlineExceeded("per-host slot wait exceeded refresh deadline")
+        try:
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                raise _DeadlineExceeded("refresh deadline reached before fetch started")
+            return fetch_fn(job)
+        finally:
+            slot.release()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), total)))
+    try:
+        future_to_index = {executor.submit(_run, job): index for index, job in enumerate(jobs)}
+        pending = set(future_to_index)
+        while pending:
+            remaining = None
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = future_to_index[future]
+                try:
+                    results[index] = future.result()
+                except _DeadlineExceeded:
+                    # Socket read timeouts are TimeoutError too; those count as failed below.
+                    stats["timed_out"] += 1
+                    continue
+                except Exception:
+                    stats["failed"] += 1
+                    continue
+                stats["completed"] += 1
+
+        for future in pending:
+            future.cancel()
+        stats["timed_out"] += len(pending)
+    finally:
+        # Do not block on stragglers; their sockets time out on their own.
+        executor.shutdown(wait=False)
+
+    stats["duration_sec"] = round(time.monotonic() - started_at, 3)
+    return {"results": results, "stats": stats}
+
+
+def _host_of(url: str) -> str:
+    try:
+        return urlsplit(url or "").netloc.lower()
+    except Exception:
+        return ""
@@ -0,0 +1,53 @@
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+
+FEED_CACHE_VERSION = 1
+
+
+def load_feed_cache(cache_path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load per-feed validator cache (ETag / Last-Modified / body hash / parsed entries).
+    """
+    path = Path(cache_path)
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return {}
+
+    if not isinstance(data, dict) or data.get("version") != FEED_CACHE_VERSION:
+        return {}
+    feeds = data.get("feeds", {})
+    if not isinstance(feeds, dict):
+        return {}
+    return {str(url): entry for url, entry in feeds.items() if isinstance(entry, dict)}
+
+
+def save_feed_cache(
+    cache_path: Union[str, Path],
+    cache: Dict[str, Dict[str, Any]],
+    keep_urls: Iterable[str] = (),
+) -> None:
+    """
+    Persist validator cache atomically, dropping feeds no longer configured.
+    """
+    keep = set(keep_urls)
+    feeds = {url: entry for url, entry in cache.items() if not keep or url in keep}
+    payload = {
+        "version": FEED_CACHE_VERSION,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "feeds": feeds,
+    }
+
+    path = Path(cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(str(tmp_path), str(path))
@@ -0,0 +1,302 @@
+"""
+Disk-backed deep-read cache.
+
+Entries are keyed by the sha1 of the normalized article URL and stored one per
+file, zlib-compressed JSON, under <cache_dir>/<first 2 hex>/<sha1>.z. Any
+process (CLI or resident server, any user) reuses a page another one already
+downloaded and extracted. An entry holds the extracted body text plus the
+explanation / excerpt derived from it (see build_cache_entry); entries are
+written both by /brush read on a miss and by the pool_manager prefetch stage.
+
+Entries expire ttl_sec after they were stored (entries without text, i.e.
+failed fetches, after negative_ttl_sec). A hit touches the file mtime, which
+drives LRU eviction: once the files exceed max_bytes, the least recently used
+are deleted until the cache is back under EVICT_TARGET_RATIO of the limit.
+
+/brush read and the prefetch stage both go through get_shared_read_cache(), so
+they use the same directory and honour the same BRUSH_READ_CACHE_TTL_HOURS /
+BRUSH_READ_CACHE_MAX_MB limits.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fetcher.cleaner import normalize_url
+from fetcher.reader import DEEP_READ_EXCERPT_CHARS, build_deep_read_snippet, build_plain_language_explanation
+
+READ_CACHE_VERSION = 1
+READ_CACHE_TTL_SEC = 72 * 3600
+READ_CACHE_NEGATIVE_TTL_SEC = 600
+READ_CACHE_MAX_BYTES = 64 * 1024 * 1024
+EVICT_TARGET_RATIO = 0.9
+ENTRY_SUFFIX = ".z"
+READ_CACHE_DIR = Path(__file__).resolve().parents[2] / "shared" / "read_cache"
+READ_CACHE_TTL_HOURS_ENV = "BRUSH_READ_CACHE_TTL_HOURS"
+READ_CACHE_MAX_MB_ENV = "BRUSH_READ_CACHE_MAX_MB"
+
+_CACHES: Dict[str, "ReadCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class ReadCache:
+    """
+    Content-addressed body cache with TTL, LRU eviction and hit/miss counters.
+
+    Counters are per process; the byte total is seeded by one directory scan
+    and then tracked on writes, so eviction only rescans when it is due.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        ttl_sec: float = READ_CACHE_TTL_SEC,
+        max_bytes: int = READ_CACHE_MAX_BYTES,
+        negative_ttl_sec: float = READ_CACHE_NEGATIVE_TTL_SEC,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl_sec = max(1.0, float(ttl_sec))
+        self.max_bytes = max(1, int(max_bytes))
+        self.negative_ttl_sec = max(0.0, float(negative_ttl_sec))
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def get(self, url: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for url, or None on a miss (absent, expired or unreadable)."""
+        key = cache_key(url)
+        if not key:
+            return None
+        now = time.time() if now is None else now
+        path = self._entry_path(key)
+        try:
+            entry = self._load(path)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception:
+            self._count("errors")
+            self._count("misses")
+            self._discard(path)
+            return None
+
+        if not isinstance(entry, dict) or entry.get("version") != READ_CACHE_VERSION:
+            self._count("misses")
+            self._discard(path)
+            return None
+        if self._expired(entry, now):
+            self._count("expired")
+            self._count("misses")
+            self._discard(path)
+            return None
+
+        try:
+            os.utime(str(path), None)
+        except OSError:
+            pass
+        self._count("hits")
+        return entry
+
+    def contains(self, url: str, now: Optional[float] = None) -> bool:
+        """
+        Whether a valid entry exists for url. Unlike get() this leaves the
+        counters, the LRU mtime and expired files alone.
+        """
+        key = cache_key(url)
+        if not key:
+            return False
+        now = time.time() if now is None else now
+        try:
+            entry = self._load(self._entry_path(key))
+        except Exception:
+            return False
+        if not isinstance(entry, dict) or entry.get("version") != READ_CACHE_VERSION:
+            return False
+        return not self._expired(entry, now)
+
+    def put(
+        self, url: str, entry: Dict[str, Any], now: Optional[float] = None, stored_at: Optional[float] = None
+    ) -> bool:
+        """
+        Store entry (text / explain / excerpt / status ...) for url; False if url is
+        empty or the write failed. stored_at (default now) is what the TTL counts
+        from: pass the old entry's value when rewriting it without a new fetch.
+        """
+        normalized = normalize_url(url)
+        if not normalized:
+            return False
+        now = time.time() if now is None else now
+        record = dict(entry)
+        record.update(
+            {"version": READ_CACHE_VERSION, "url": normalized, "stored_at": now if stored_at is None else stored_at}
+        )
+        payload = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+        path = self._entry_path(cache_key(normalized))
+        try:
+            previous = path.stat().st_size
+        except OSError:
+            previous = 0
+        tmp_path = path.with_name("{0}.{1}.{2}.tmp".format(path.name, os.getpid(), threading.get_ident()))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("wb") as f:
+                f.write(payload)
+            os.replace(str(tmp_path), str(path))
+        except OSError:
+            self._count("errors")
+            self._discard(tmp_path)
+            return False
+
+        with self._lock:
+            self._counters["stores"] += 1
+            due = self._bytes is not None and self._bytes + len(payload) - previous > self.max_bytes
+            if self._bytes is not None:
+                self._bytes += len(payload) - previous
+        if self._bytes is None or due:
+            self.evict(now)
+        return True
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """
+        Delete expired entries, then least recently used ones until under the
+        target size; returns how many files were removed.
+        """
+        now = time.time() if now is None else now
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * EVICT_TARGET_RATIO) if total > self.max_bytes else total
+        removed = 0
+        for mtime, size, path in sorted(files):
+            # Not touched for a full TTL means it was also stored before that: expired either way.
+            if now - mtime < self.ttl_sec and total <= target:
+                break
+            if self._discard(path):
+                total -= size
+                removed += 1
+        with self._lock:
+            self._bytes = total
+            self._counters["evictions"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _load(self, path: Path) -> Any:
+        with path.open("rb") as f:
+            return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        ttl = self.ttl_sec if entry.get("text") else self.negative_ttl_sec
+        return now - float(entry.get("stored_at", 0) or 0) >= ttl
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / (key + ENTRY_SUFFIX)
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        files: List[Tuple[float, int, Path]] = []
+        try:
+            shards = list(os.scandir(str(self.cache_dir)))
+        except FileNotFoundError:
+            return files
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                entries = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        return files
+
+    def _discard(self, path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except OSError:
+            return False
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+def cache_key(url: str) -> str:
+    """sha1 hex of the normalized URL, or "" for an empty URL."""
+    normalized = normalize_url(url)
+    if not normalized:
+        return ""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def derived_fingerprint(title: str, summary: str) -> str:
+    """Identifies the title/summary an entry's explanation was built from."""
+    return hashlib.sha1("{0}\n{1}".format(title, summary).encode("utf-8")).hexdigest()[:16]
+
+
+def build_cache_entry(title: str, summary: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cache entry for a fetch_full_article_text result: the body text, and when
+    there is one, the explanation and excerpt /brush read shows.
+    """
+    body_text = str(result.get("text", "") or "")
+    entry: Dict[str, Any] = {"text": body_text, "status": str(result.get("status", "") or "fetch_failed")}
+    if body_text:
+        entry["explain"] = build_plain_language_explanation(title, summary, body_text)
+        entry["excerpt"] = build_deep_read_snippet(body_text, max_chars=DEEP_READ_EXCERPT_CHARS)
+        entry["derived_for"] = derived_fingerprint(title, summary)
+    return entry
+
+
+def get_read_cache(
+    cache_dir: Union[str, Path],
+    ttl_sec: float = READ_CACHE_TTL_SEC,
+    max_bytes: int = READ_CACHE_MAX_BYTES,
+) -> ReadCache:
+    """
+    Return the process-wide cache for cache_dir (ttl_sec / max_bytes apply on first creation).
+    """
+    key = "{0}:{1}".format(os.getpid(), os.path.abspath(str(cache_dir)))
+    cache = _CACHES.get(key)
+    if cache is not None:
+        return cache
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = ReadCache(cache_dir, ttl_sec=ttl_sec, max_bytes=max_bytes)
+            _CACHES[key] = cache
+    return cache
+
+
+def get_shared_read_cache(cache_dir: Union[str, Path] = READ_CACHE_DIR) -> ReadCache:
+    """
+    Return the deep-read cache with the TTL / size limit configured through
+    BRUSH_READ_CACHE_TTL_HOURS and BRUSH_READ_CACHE_MAX_MB.
+    """
+    ttl_hours = _env_int(READ_CACHE_TTL_HOURS_ENV, READ_CACHE_TTL_SEC // 3600)
+    max_mb = _env_int(READ_CACHE_MAX_MB_ENV, READ_CACHE_MAX_BYTES // (1024 * 1024))
+    return get_read_cache(cache_dir, ttl_sec=ttl_hours * 3600, max_bytes=max_mb * 1024 * 1024)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, "") or default))
+    except ValueError:
+        return default
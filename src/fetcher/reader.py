@@ -8,6 +8,8 @@ from fetcher.cleaner import clean_text, summarize_text
 
 
 USER_AGENT = "brush-blog-skill/0.1 (+https://github.com/Dalaoyuan2020/brush-blog-skill)"
+DEEP_READ_MAX_CHARS = 6500
+DEEP_READ_EXCERPT_CHARS = 900
 
 
 def fetch_full_article_text(url: str, timeout: int = 6, max_chars: int = 6000) -> Dict[str, str]:
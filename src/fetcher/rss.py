@@ -1,13 +1,21 @@
+import io
 import json
 import hashlib
-import sqlite3
+import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from fetcher.cleaner import clean_text, summarize_text
+from fetcher.store import get_content_store
+
+
+USER_AGENT = "brush-blog-skill/0.1 (+https://github.com/Dalaoyuan2020/brush-blog-skill)"
+FEED_ENTRY_TAGS = ("item", "entry")
+FEED_ENTRIES_LIMIT = 10
+FEED_MAX_BYTES = 4 * 1024 * 1024
 
 
 def load_feeds(feeds_path: Union[str, Path]) -> Dict[str, List[Dict[str, Any]]]:
@@ -22,23 +30,192 @@ def load_feeds(feeds_path: Union[str, Path]) -> Dict[str, List[Dict[str, Any]]]:
     return data
 
 
-def fetch_latest_article(feed_url: str, timeout: int = 10) -> Optional[Dict[str, str]]:
+def fetch_latest_article(
+    feed_url: str,
+    timeout: int = 10,
+    cache_entry: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, str]]:
     """Fetch and parse one latest article from an RSS/Atom feed URL."""
-    request = urllib.request.Request(
+    articles = fetch_feed_articles(feed_url, timeout=timeout, limit=1, cache_entry=cache_entry)
+    return articles[0] if articles else None
+
+
+def fetch_feed_articles(
+    feed_url: str,
+    timeout: int = 10,
+    limit: Optional[int] = FEED_ENTRIES_LIMIT,
+    cache_entry: Optional[Dict[str, Any]] = None,
+    max_bytes: int = FEED_MAX_BYTES,
+) -> List[Dict[str, str]]:
+    """
+    Fetch up to limit newest articles from an RSS/Atom feed URL.
+
+    When cache_entry is given, the request is conditional (If-None-Match /
+    If-Modified-Since) and the cached articles are reused on 304 or when the body
+    hash is unchanged. cache_entry is updated in place with fresh validators,
+    and only once the body parsed: a malformed feed leaves the entry untouched,
+    so the next refresh does not get a 304 against articles it never stored.
+    """
+    entry_limit = max(1, int(limit)) if limit else 0
+    articles, validators = _fetch_feed_entries(
         feed_url,
-        headers={"User-Agent": "brush-blog-skill/0.1 (+https://github.com/Dalaoyuan2020/brush-blog-skill)"},
+        timeout=timeout,
+        cache_entry=cache_entry,
+        entry_limit=entry_limit,
+        max_bytes=max_bytes,
     )
-    with urllib.request.urlopen(request, timeout=timeout) as response:
-        payload = response.read()
+    if articles is None:
+        cached = cache_entry.get("articles", []) if cache_entry is not None else []
+        if cache_entry is not None:
+            cache_entry.update(validators)
+        if entry_limit:
+            cached = cached[:entry_limit]
+        return [dict(article) for article in cached]
+
+    if cache_entry is not None:
+        cache_entry.update(validators)
+        cache_entry["articles"] = articles
+        cache_entry["entry_limit"] = entry_limit
+    return articles
 
-    root = ET.fromstring(payload)
 
-    item = root.find(".//channel/item")
-    if item is None:
-        item = root.find(".//{*}entry")
-    if item is None:
-        return None
+def parse_feed_articles(payload: bytes, limit: Optional[int] = None) -> List[Dict[str, str]]:
+    """Parse feed bytes into article dicts, newest first (feed document order)."""
+    return list(iter_feed_articles(io.BytesIO(payload), limit=limit))
+
 
+def iter_feed_articles(stream: BinaryIO, limit: Optional[int] = None) -> Iterator[Dict[str, str]]:
+    """
+    Incrementally yield articles from an RSS/Atom stream.
+
+    Each <item>/<entry> is released as soon as it is parsed, and parsing stops once
+    limit entries are read. A truncated document yields the entries parsed so far.
+    """
+    emitted = 0
+    parents: List[ET.Element] = []
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                parents.append(elem)
+                continue
+
+            parents.pop()
+            if _local_name(elem.tag) not in FEED_ENTRY_TAGS:
+                continue
+
+            article = _article_from_entry(elem)
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+            yield article
+            emitted += 1
+            if limit and emitted >= limit:
+                return
+    except ET.ParseError:
+        # Byte budget cut the document short; keep what was parsed.
+        if emitted == 0:
+            raise
+
+
+class _BudgetedStream:
+    """
+    Read-through wrapper for the HTTP response: serves at most max_bytes in
+    total (then reports EOF) and hashes every byte handed to the parser.
+    """
+
+    def __init__(self, raw: BinaryIO, max_bytes: int) -> None:
+        self._raw = raw
+        self._remaining = max(1, int(max_bytes))
+        self.digest = hashlib.sha1()
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        chunk = self._raw.read(size)
+        self._remaining -= len(chunk)
+        self.digest.update(chunk)
+        return chunk
+
+
+def _fetch_feed_entries(
+    feed_url: str,
+    timeout: int,
+    cache_entry: Optional[Dict[str, Any]] = None,
+    entry_limit: int = 0,
+    max_bytes: int = FEED_MAX_BYTES,
+) -> Tuple[Optional[List[Dict[str, str]]], Dict[str, Any]]:
+    """
+    Return (parsed articles, or None when the cached entries are still current;
+    cache fields to apply once the caller has used them). cache_entry itself is
+    only read here.
+
+    Cold fetches (no cached content_hash to compare against) parse straight off
+    the response through a _BudgetedStream, and the connection is closed as soon
+    as entry_limit entries are parsed, so the rest of the feed is never
+    downloaded; their content_hash covers only the bytes consumed. When a cached
+    hash exists, the body (up to max_bytes) is read and hashed first, so an
+    unchanged feed is never parsed. That costs the full download, and the first
+    such refresh after a cold fetch sees a different hash (whole body vs.
+    prefix) and parses once more.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    has_cached_articles = _cache_covers(cache_entry, entry_limit)
+    if cache_entry is not None and has_cached_articles:
+        if cache_entry.get("etag"):
+            headers["If-None-Match"] = str(cache_entry["etag"])
+        if cache_entry.get("last_modified"):
+            headers["If-Modified-Since"] = str(cache_entry["last_modified"])
+    cached_hash = str(cache_entry.get("content_hash", "") or "") if cache_entry and has_cached_articles else ""
+
+    request = urllib.request.Request(feed_url, headers=headers)
+    checked_at = datetime.now(timezone.utc).isoformat()
+    articles: Optional[List[Dict[str, str]]] = None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            etag = response.headers.get("ETag", "")
+            last_modified = response.headers.get("Last-Modified", "")
+            stream = _BudgetedStream(response, max_bytes)
+            if cached_hash:
+                payload = stream.read()
+            else:
+                articles = list(iter_feed_articles(stream, limit=entry_limit or None))
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and cache_entry is not None and has_cached_articles:
+            return None, {"checked_at": checked_at, "last_status": "not_modified"}
+        raise
+
+    content_hash = stream.digest.hexdigest()
+    unchanged = bool(cached_hash) and cached_hash == content_hash
+    if articles is None and not unchanged:
+        articles = parse_feed_articles(payload, limit=entry_limit or None)
+    if cache_entry is None:
+        return articles, {}
+
+    validators = {
+        "etag": etag or "",
+        "last_modified": last_modified or "",
+        "content_hash": content_hash,
+        "checked_at": checked_at,
+        "last_status": "unchanged" if unchanged else "fetched",
+    }
+    if unchanged:
+        return None, validators
+    return articles, validators
+
+
+def _cache_covers(cache_entry: Optional[Dict[str, Any]], entry_limit: int) -> bool:
+    if not cache_entry or not cache_entry.get("articles"):
+        return False
+    cached_limit = int(cache_entry.get("entry_limit", 1) or 0)
+    if cached_limit == 0:
+        # 0 means the cached parse was unbounded.
+        return True
+    return entry_limit != 0 and entry_limit <= cached_limit
+
+
+def _article_from_entry(item: ET.Element) -> Dict[str, str]:
     title = _first_text(item, ["title", "{*}title"]) or "Untitled"
     link = _extract_link(item)
     raw_summary = _first_text(
@@ -54,6 +231,12 @@ def fetch_latest_article(feed_url: str, timeout: int = 10) -> Optional[Dict[str,
     }
 
 
+def _local_name(tag: Any) -> str:
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+
 def collect_latest_articles(
     feeds: Dict[str, List[Dict[str, Any]]],
     priority_category: str = "priority_hn_popular_2025",
@@ -109,37 +292,9 @@ def collect_latest_articles(
 
 def init_content_db(db_path: Union[str, Path]) -> None:
     """
-    Initialize content pool schema for M2.
+    Initialize content pool schema for M2 (runs once per process).
     """
-    path = str(db_path)
-    conn = sqlite3.connect(path)
-    try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS content_pool (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_key TEXT NOT NULL UNIQUE,
-                link TEXT,
-                title TEXT NOT NULL,
-                summary TEXT NOT NULL,
-                category TEXT,
-                source TEXT,
-                feed_name TEXT,
-                feed_url TEXT,
-                tags_json TEXT,
-                fetched_at TEXT NOT NULL
-            )
-            """
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_content_pool_category ON content_pool(category)"
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_content_pool_fetched_at ON content_pool(fetched_at DESC)"
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    get_content_store(db_path)
 
 
 def upsert_articles(db_path: Union[str, Path], articles: Sequence[Dict[str, Any]]) -> int:
@@ -148,42 +303,7 @@ def upsert_articles(db_path: Union[str, Path], articles: Sequence[Dict[str, Any]
     """
     if not articles:
         return 0
-
-    init_content_db(db_path)
-    path = str(db_path)
-    fetched_at = datetime.utcnow().isoformat() + "Z"
-    upserted = 0
-
-    conn = sqlite3.connect(path)
-    try:
-        for article in articles:
-            normalized = _normalize_article(article)
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO content_pool(
-                    item_key, link, title, summary, category,
-                    source, feed_name, feed_url, tags_json, fetched_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    normalized["item_key"],
-                    normalized.get("link", ""),
-                    normalized["title"],
-                    normalized["summary"],
-                    normalized.get("category", ""),
-                    normalized.get("source", ""),
-                    normalized.get("feed_name", ""),
-                    normalized.get("feed_url", ""),
-                    json.dumps(normalized.get("tags", []), ensure_ascii=False),
-                    fetched_at,
-                ),
-            )
-            upserted += 1
-        conn.commit()
-    finally:
-        conn.close()
-
-    return upserted
+    return get_content_store(db_path).upsert_articles(articles)
 
 
 def refresh_content_pool(
@@ -231,36 +351,20 @@ def list_articles_from_pool(
     priority_category: str = "priority_hn_popular_2025",
     exclude_item_keys: Optional[Sequence[str]] = None,
     limit: int = 50,
+    after: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     """
     List candidate articles from content pool.
-    """
-    init_content_db(db_path)
-    path = str(db_path)
-    exclude = set(exclude_item_keys or [])
 
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    try:
-        rows = conn.execute(
-            """
-            SELECT item_key, link, title, summary, category, source, feed_name, feed_url, tags_json, fetched_at
-            FROM content_pool
-            ORDER BY (category = ?) DESC, fetched_at DESC
-            LIMIT ?
-            """,
-            (priority_category, max(1, int(limit))),
-        ).fetchall()
-    finally:
-        conn.close()
-
-    candidates = []
-    for row in rows:
-        item_key = row["item_key"]
-        if item_key in exclude:
-            continue
-        candidates.append(_row_to_article(dict(row)))
-    return candidates
+    Excluded keys are filtered inside SQLite, so up to limit unread rows come back.
+    Pass the last article of a page as after to continue from it.
+    """
+    return get_content_store(db_path).list_articles(
+        priority_category,
+        limit,
+        exclude_item_keys=exclude_item_keys,
+        after=after,
+    )
 
 
 def list_articles_by_category(
@@ -268,58 +372,37 @@ def list_articles_by_category(
     category: str,
     exclude_item_keys: Optional[Sequence[str]] = None,
     limit: int = 20,
+    after: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     """
     List candidate articles filtered by category.
     """
-    init_content_db(db_path)
-    path = str(db_path)
-    exclude = set(exclude_item_keys or [])
+    return get_content_store(db_path).list_by_category(
+        category,
+        limit,
+        exclude_item_keys=exclude_item_keys,
+        after=after,
+    )
 
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    try:
-        rows = conn.execute(
-            """
-            SELECT item_key, link, title, summary, category, source, feed_name, feed_url, tags_json, fetched_at
-            FROM content_pool
-            WHERE category = ?
-            ORDER BY fetched_at DESC
-            LIMIT ?
-            """,
-            (category, max(1, int(limit))),
-        ).fetchall()
-    finally:
-        conn.close()
-
-    candidates = []
-    for row in rows:
-        item_key = row["item_key"]
-        if item_key in exclude:
-            continue
-        candidates.append(_row_to_article(dict(row)))
-    return candidates
+
+def list_articles_by_categories(
+    db_path: Union[str, Path],
+    categories: Sequence[str],
+    limit_per_category: int = 1,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    List newest articles for several categories with one query.
+    """
+    return get_content_store(db_path).list_by_categories(categories, limit_per_category)
 
 
 def get_content_pool_stats(db_path: Union[str, Path]) -> Dict[str, Any]:
     """
     Return quick stats for refresh throttling decisions.
     """
-    init_content_db(db_path)
-    path = str(db_path)
-    conn = sqlite3.connect(path)
-    try:
-        row = conn.execute(
-            """
-            SELECT COUNT(*) AS total_count, MAX(fetched_at) AS latest_fetched_at
-            FROM content_pool
-            """
-        ).fetchone()
-    finally:
-        conn.close()
-
-    total_count = int(row[0] if row and row[0] is not None else 0)
-    latest_raw = row[1] if row else None
+    stats = get_content_store(db_path).stats()
+    total_count = stats["total_count"]
+    latest_raw = stats["latest_fetched_at"]
     latest_dt = _parse_iso_datetime(latest_raw)
     age_seconds = None
     if latest_dt is not None:
@@ -363,54 +446,6 @@ def _ordered_categories(feeds: Dict[str, List[Dict[str, Any]]], priority_categor
     return categories
 
 
-def _normalize_article(article: Dict[str, Any]) -> Dict[str, Any]:
-    title = clean_text(article.get("title", "")) or "Untitled"
-    summary = summarize_text(article.get("summary", ""))
-    link = article.get("link", "") or ""
-    source = article.get("source", "") or ""
-    feed_url = article.get("feed_url", "") or ""
-    feed_name = article.get("feed_name", "") or ""
-    category = article.get("category", "") or ""
-    tags = article.get("tags", []) or []
-
-    item_key_base = link or "{0}|{1}|{2}".format(title, source, feed_url)
-    item_key = hashlib.sha1(item_key_base.encode("utf-8")).hexdigest()
-
-    return {
-        "item_key": item_key,
-        "link": link,
-        "title": title,
-        "summary": summary,
-        "category": category,
-        "source": source,
-        "feed_name": feed_name,
-        "feed_url": feed_url,
-        "tags": tags,
-    }
-
-
-def _row_to_article(row: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        tags = json.loads(row.get("tags_json", "[]") or "[]")
-        if not isinstance(tags, list):
-            tags = []
-    except Exception:
-        tags = []
-
-    return {
-        "item_key": row.get("item_key", ""),
-        "link": row.get("link", ""),
-        "title": row.get("title", "Untitled"),
-        "summary": row.get("summary", "暂无摘要"),
-        "category": row.get("category", ""),
-        "source": row.get("source", "unknown"),
-        "feed_name": row.get("feed_name", ""),
-        "feed_url": row.get("feed_url", ""),
-        "tags": tags,
-        "fetched_at": row.get("fetched_at", ""),
-    }
-
-
 def _parse_iso_datetime(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from fetcher.cleaner import clean_text, summarize_text
+
+
+CONTENT_SCHEMA_VERSION = 2
+ARTICLE_COLUMNS = "item_key, link, title, summary, category, source, feed_name, feed_url, tags_json, fetched_at"
+
+# Statement texts are module constants so sqlite3's per-connection statement
+# cache keeps them prepared across calls.
+UPSERT_ARTICLE_SQL = """
+    INSERT INTO content_pool(
+        item_key, link, title, summary, category,
+        source, feed_name, feed_url, tags_json, fetched_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(item_key) DO UPDATE SET
+        link = excluded.link,
+        title = excluded.title,
+        summary = excluded.summary,
+        category = excluded.category,
+        source = excluded.source,
+        feed_name = excluded.feed_name,
+        feed_url = excluded.feed_url,
+        tags_json = excluded.tags_json,
+        fetched_at = excluded.fetched_at
+"""
+# Read-history exclusion runs inside SQLite: the json_each() subquery is
+# materialized once per statement, so LIMIT always counts unread rows only.
+# Later pages continue from the (fetched_at, id) keyset of the previous page's
+# last row. First and later pages are separate statements: a bare row-value
+# bound lets SQLite seek into the (..., fetched_at DESC, id DESC) index, while an
+# optional "? IS NULL OR ..." bound would only filter rows after the scan.
+_EXCLUDE_CLAUSE = "item_key NOT IN (SELECT value FROM json_each(?))"
+_AFTER_CLAUSE = "AND (fetched_at, id) < (?, ?)"
+_PRIORITY_PAGE_SQL = """
+    SELECT id, {0}
+    FROM content_pool
+    WHERE category = ?
+        AND {1}
+        {{0}}
+    ORDER BY fetched_at DESC, id DESC
+    LIMIT ?
+""".format(ARTICLE_COLUMNS, _EXCLUDE_CLAUSE)
+_OTHERS_PAGE_SQL = """
+    SELECT id, {0}
+    FROM content_pool
+    WHERE (category IS NULL OR category != ?)
+        AND {1}
+        {{0}}
+    ORDER BY fetched_at DESC, id DESC
+    LIMIT ?
+""".format(ARTICLE_COLUMNS, _EXCLUDE_CLAUSE)
+LIST_PRIORITY_FIRST_PAGE_SQL = _PRIORITY_PAGE_SQL.format("")
+LIST_PRIORITY_AFTER_PAGE_SQL = _PRIORITY_PAGE_SQL.format(_AFTER_CLAUSE)
+LIST_OTHERS_FIRST_PAGE_SQL = _OTHERS_PAGE_SQL.format("")
+LIST_OTHERS_AFTER_PAGE_SQL = _OTHERS_PAGE_SQL.format(_AFTER_CLAUSE)
+LIST_BY_CATEGORY_FIRST_PAGE_SQL = LIST_PRIORITY_FIRST_PAGE_SQL
+LIST_BY_CATEGORY_AFTER_PAGE_SQL = LIST_PRIORITY_AFTER_PAGE_SQL
+LIST_BY_CATEGORIES_SQL = """
+    SELECT id, {0}
+    FROM (
+        SELECT id, {0},
+            ROW_NUMBER() OVER (PARTITION BY category ORDER BY fetched_at DESC, id DESC) AS category_rank
+        FROM content_pool
+        WHERE category IN (SELECT value FROM json_each(?))
+    )
+    WHERE category_rank <= ?
+    ORDER BY category, category_rank
+""".format(ARTICLE_COLUMNS)
+POOL_STATS_SQL = """
+    SELECT COUNT(*) AS total_count, MAX(fetched_at) AS latest_fetched_at
+    FROM content_pool
+"""
+
+_MIGRATIONS = {
+    1: [
+        """
+        CREATE TABLE IF NOT EXISTS content_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_key TEXT NOT NULL UNIQUE,
+            link TEXT,
+            title TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            category TEXT,
+            source TEXT,
+            feed_name TEXT,
+            feed_url TEXT,
+            tags_json TEXT,
+            fetched_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_content_pool_category ON content_pool(category)",
+        "CREATE INDEX IF NOT EXISTS idx_content_pool_fetched_at ON content_pool(fetched_at DESC)",
+    ],
+    2: [
+        # Composite keyset indexes replace the single-column ones.
+        "DROP INDEX IF EXISTS idx_content_pool_category",
+        "DROP INDEX IF EXISTS idx_content_pool_fetched_at",
+        "CREATE INDEX IF NOT EXISTS idx_content_pool_category_recency ON content_pool(category, fetched_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_content_pool_recency ON content_pool(fetched_at DESC, id DESC)",
+    ],
+}
+
+_STORES: Dict[str, "ContentStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class ContentStore:
+    """
+    Long-lived SQLite connection for the content pool.
+
+    The connection runs in WAL mode so readers never block the refresher, the
+    schema is migrated once per process via PRAGMA user_version, and writes are
+    batched with executemany inside one transaction.
+    """
+
+    def __init__(self, db_path: Union[str, Path]) -> None:
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._configure()
+        self._migrate()
+
+    def _configure(self) -> None:
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-8192")
+        self._conn.execute("PRAGMA mmap_size=67108864")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+
+    def _migrate(self) -> None:
+        with self._lock:
+            current = int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+            if current >= CONTENT_SCHEMA_VERSION:
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for version in sorted(_MIGRATIONS):
+                    if version <= current:
+                        continue
+                    for statement in _MIGRATIONS[version]:
+                        self._conn.execute(statement)
+                # PRAGMA does not accept bound parameters.
+                self._conn.execute("PRAGMA user_version = {0}".format(int(CONTENT_SCHEMA_VERSION)))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def upsert_articles(self, articles: Sequence[Dict[str, Any]]) -> int:
+        if not articles:
+            return 0
+
+        fetched_at = datetime.utcnow().isoformat() + "Z"
+        rows = []
+        for article in articles:
+            normalized = normalize_article(article)
+            rows.append(
+                (
+                    normalized["item_key"],
+                    normalized.get("link", ""),
+                    normalized["title"],
+                    normalized["summary"],
+                    normalized.get("category", ""),
+                    normalized.get("source", ""),
+                    normalized.get("feed_name", ""),
+                    normalized.get("feed_url", ""),
+                    json.dumps(normalized.get("tags", []), ensure_ascii=False),
+                    fetched_at,
+                )
+            )
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(UPSERT_ARTICLE_SQL, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def list_articles(
+        self,
+        priority_category: str,
+        limit: int,
+        exclude_item_keys: Optional[Sequence[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Priority category first, then everything else, both newest first.
+        """
+        limit = max(1, int(limit))
+        exclude_json = _json_key_list(exclude_item_keys)
+        articles: List[Dict[str, Any]] = []
+        in_priority = after is None or after.get("category", "") == priority_category
+        with self._lock:
+            if in_priority:
+                articles.extend(
+                    self._page(
+                        (LIST_PRIORITY_FIRST_PAGE_SQL, LIST_PRIORITY_AFTER_PAGE_SQL),
+                        priority_category,
+                        exclude_json,
+                        after,
+                        limit,
+                    )
+                )
+                after = None
+            if len(articles) < limit:
+                articles.extend(
+                    self._page(
+                        (LIST_OTHERS_FIRST_PAGE_SQL, LIST_OTHERS_AFTER_PAGE_SQL),
+                        priority_category,
+                        exclude_json,
+                        after,
+                        limit - len(articles),
+                    )
+                )
+        return articles
+
+    def list_by_category(
+        self,
+        category: str,
+        limit: int,
+        exclude_item_keys: Optional[Sequence[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._page(
+                (LIST_BY_CATEGORY_FIRST_PAGE_SQL, LIST_BY_CATEGORY_AFTER_PAGE_SQL),
+                category,
+                _json_key_list(exclude_item_keys),
+                after,
+                max(1, int(limit)),
+            )
+
+    def _page(
+        self,
+        statements: Tuple[str, str],
+        category: str,
+        exclude_json: str,
+        after: Optional[Dict[str, Any]],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """statements is (first page SQL, after-cursor SQL); the cursor picks which one runs."""
+        after_fetched_at = after.get("fetched_at") if after else None
+        if after_fetched_at is None:
+            rows = self._conn.execute(statements[0], (category, exclude_json, limit)).fetchall()
+        else:
+            after_id = int(after.get("row_id", 0) or 0)
+            rows = self._conn.execute(
+                statements[1], (category, exclude_json, after_fetched_at, after_id, limit)
+            ).fetchall()
+        return [row_to_article(dict(row)) for row in rows]
+
+    def list_by_categories(self, categories: Sequence[str], limit_per_category: int) -> Dict[str, List[Dict[str, Any]]]:
+        grouped: Dict[str, List[Dict[str, Any]]] = {category: [] for category in categories}
+        if not categories:
+            return grouped
+        with self._lock:
+            rows = self._conn.execute(
+                LIST_BY_CATEGORIES_SQL,
+                (json.dumps(list(categories), ensure_ascii=False), max(1, int(limit_per_category))),
+            ).fetchall()
+        for row in rows:
+            article = row_to_article(dict(row))
+            grouped.setdefault(article["category"], []).append(article)
+        return grouped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(POOL_STATS_SQL).fetchone()
+        return {
+            "total_count": int(row[0] if row and row[0] is not None else 0),
+            "latest_fetched_at": row[1] if row else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_content_store(db_path: Union[str, Path]) -> ContentStore:
+    """
+    Return the process-wide store for db_path, opening it on first use.
+    """
+    key = "{0}:{1}".format(os.getpid(), os.path.abspath(str(db_path)))
+    store = _STORES.get(key)
+    if store is not None:
+        return store
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = ContentStore(db_path)
+            _STORES[key] = store
+    return store
+
+
+def _json_key_list(values: Optional[Sequence[str]]) -> str:
+    return json.dumps([str(value) for value in (values or []) if value], ensure_ascii=False)
+
+
+def normalize_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    title = clean_text(article.get("title", "")) or "Untitled"
+    summary = summarize_text(article.get("summary", ""))
+    link = article.get("link", "") or ""
+    source = article.get("source", "") or ""
+    feed_url = article.get("feed_url", "") or ""
+    feed_name = article.get("feed_name", "") or ""
+    category = article.get("category", "") or ""
+    tags = article.get("tags", []) or []
+
+    item_key_base = link or "{0}|{1}|{2}".format(title, source, feed_url)
+    item_key = hashlib.sha1(item_key_base.encode("utf-8")).hexdigest()
+
+    return {
+        "item_key": item_key,
+        "link": link,
+        "title": title,
+        "summary": summary,
+        "category": category,
+        "source": source,
+        "feed_name": feed_name,
+        "feed_url": feed_url,
+        "tags": tags,
+    }
+
+
+def row_to_article(row: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        tags = json.loads(row.get("tags_json", "[]") or "[]")
+        if not isinstance(tags, list):
+            tags = []
+    except Exception:
+        tags = []
+
+    return {
+        "row_id": row.get("id", 0),
+        "item_key": row.get("item_key", ""),
+        "link": row.get("link", ""),
+        "title": row.get("title", "Untitled"),
+        "summary": row.get("summary", "暂无摘要"),
+        "category": row.get("category", ""),
+        "source": row.get("source", "unknown"),
+        "feed_name": row.get("feed_name", ""),
+        "feed_url": row.get("feed_url", ""),
+        "tags": tags,
+        "fetched_at": row.get("fetched_at", ""),
+    }
@@ -94,3 +94,16 @@ def build_saved_message(item: Dict[str, Any]) -> str:
     """Build acknowledge message for save action."""
     title = item.get("title", "Untitled")
     return "✅ 已收藏：{0}".format(title)
+
+
+def render_cli_output(result: Dict[str, Any]) -> str:
+    """Render a command result as the stdout text the Agent parses."""
+    lines = [str(result.get("message", ""))]
+    buttons = result.get("buttons", [])
+    if buttons:
+        button_texts = []
+        for row in buttons:
+            row_labels = " ".join("[{0}]".format(btn.get("text", "")) for btn in row)
+            button_texts.append(row_labels)
+        lines.append("按钮：" + " | ".join(button_texts))
+    return "\n".join(lines)
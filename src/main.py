@@ -5,58 +5,87 @@
 
 import argparse
 import hashlib
+import itertools
 import json
 import os
-from datetime import datetime, timedelta, timezone
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from fetcher.rss import (
-    list_articles_by_category,
+    list_articles_by_categories,
     load_feeds,
 )
 from fetcher.reader import (
-    build_deep_read_snippet,
+    DEEP_READ_MAX_CHARS,
     build_plain_language_explanation,
     fetch_full_article_text,
 )
 from fetcher.cleaner import summarize_text
+from fetcher.read_cache import ReadCache, build_cache_entry, derived_fingerprint, get_shared_read_cache
 from interaction.telegram import (
     build_brush_buttons,
     build_brush_card,
     build_cold_start_buttons,
     build_deep_read_message,
     build_saved_message,
+    render_cli_output,
 )
-from recommend.scorer import rank_items
+from recommend.batch import build_columns, rank_top_k
+from recommend.embedder import pool_fingerprint, read_pool_vectors, update_user_vector
+from recommend.retrieval import read_retrieval_index, retrieve_candidates
+from recommend.knowledge import empty_knowledge_index, knowledge_index_for, update_knowledge_index
+from recommend.scorer import score_upper_bound, top_k_items
 from sink.notion import build_structured_note, save_note
-from tracker.behavior import log_behavior_event
+from tracker.behavior import BehaviorEventWriter, build_behavior_event, get_behavior_event_writer
+from tracker.engagement import EngagementCounters, get_engagement_counters
+from tracker.event_segments import SegmentPolicy
+from tracker.profile_store import ProfileStore, get_profile_store
+from tracker.read_history import SharedReadHistory, get_shared_read_history
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 FEEDS_FILE = ROOT_DIR / "data" / "feeds.json"
 CONTENT_DB = ROOT_DIR / "data" / "content.db"
+PROFILES_DB = ROOT_DIR / "data" / "profiles.db"
+# 旧版每用户一个 JSON 的画像目录，首次读取某用户时自动导入数据库。
 PROFILES_DIR = ROOT_DIR / "data" / "profiles"
 SHARED_DIR = ROOT_DIR / "shared"
 SHARED_CONTENT_POOL_FILE = SHARED_DIR / "content_pool.json"
+# pool_manager 入池时算好的文章向量（二进制，行序与内容池文章一致）。
+SHARED_CONTENT_POOL_VECTORS_FILE = SHARED_DIR / "content_pool.vec"
+# pool_manager 入池时建好的倒排索引（标签/分类/来源 → 文章位置）。
+SHARED_CONTENT_POOL_INDEX_FILE = SHARED_DIR / "content_pool.idx.json"
+# 旧版整文件重写的已读历史，仅在首次启用追加日志时导入一次。
 SHARED_READ_HISTORY_FILE = SHARED_DIR / "read_history.json"
+SHARED_READ_LOG_FILE = SHARED_DIR / "read_history.log"
 SHARED_USER_PREFS_FILE = SHARED_DIR / "user_prefs.json"
 BEHAVIOR_EVENTS_FILE = ROOT_DIR / "data" / "behavior_events.jsonl"
+# 写行为事件时顺带增量维护的文章/来源互动计数，排序的热度分从这里读。
+ENGAGEMENT_DB = ROOT_DIR / "data" / "engagement.db"
 SAVED_NOTES_FILE = ROOT_DIR / "data" / "saved_notes.jsonl"
 READ_HISTORY_LIMIT = 100
-SHARED_READ_HISTORY_LIMIT = 300
 SHARED_READ_HISTORY_EXPIRE_HOURS = 24
 SAVED_ITEMS_LIMIT = 200
 SOURCE_HISTORY_LIMIT = 50
 COLD_START_MIN_SELECTIONS = 2
 COLD_START_MAX_SELECTIONS = 3
 COLD_START_MAX_CATEGORIES = 6
-QUICK_LEARN_REBALANCE_INTERVAL = 5
+# 兴趣标签低于该权重（衰减后）时在写入时顺带清理；每次写入最多检查最旧的若干个标签。
+INTEREST_PRUNE_THRESHOLD = 0.15
+INTEREST_PRUNE_BATCH = 8
 BASE_RECOMMEND_WEIGHTS = {
-    "interest": 0.4,
-    "knowledge": 0.3,
-    "diversity": 0.2,
+    "interest": 0.35,
+    "knowledge": 0.25,
+    "diversity": 0.15,
     "popularity": 0.1,
+    "similarity": 0.15,
 }
+# 点赞 / 收藏时文章向量并入用户向量的权重。
+LIKE_VECTOR_WEIGHT = 1.0
+SAVE_VECTOR_WEIGHT = 2.0
+# 点赞 / 跳过 / 收藏对文章标签兴趣权重的调整量。
+FEEDBACK_INTEREST_DELTAS = {"like": 2, "skip": -1, "save": 5}
 COLD_START_CATEGORY_ORDER = [
     "tech_programming",
     "ai_ml",
@@ -125,8 +154,26 @@ def _env_float(name: str, default: float, min_value: float = 0.0, max_value: flo
 POOL_MIN_ITEMS = _env_int("BRUSH_POOL_MIN_ITEMS", 5)
 DEEP_READ_FETCH_TIMEOUT_SECONDS = _env_int("BRUSH_DEEP_READ_TIMEOUT_SEC", 6)
 QUICK_LEARN_INTERACTIONS = _env_int("BRUSH_QUICK_LEARN_INTERACTIONS", 20)
+RECOMMEND_QUEUE_SIZE = _env_int("BRUSH_RECOMMEND_QUEUE_SIZE", 10)
+# 内容池达到该规模时，先用倒排索引召回几百篇候选再排序。
+RETRIEVAL_MIN_POOL_SIZE = _env_int("BRUSH_RETRIEVAL_MIN_POOL_SIZE", 1000)
+# 兴趣标签相对变化超过该比例时，预排好的推荐队列作废重排。
+RECOMMEND_QUEUE_TAG_DRIFT = _env_float("BRUSH_RECOMMEND_QUEUE_TAG_DRIFT", 0.25)
 QUICK_LEARN_DIVERSITY_WEIGHT = _env_float("BRUSH_QUICK_LEARN_DIVERSITY_WEIGHT", 0.4)
+# 行为日志分段：活动文件超过大小或时长即轮转压缩，超过保留天数的分段删除（0 表示永久保留）。
+EVENT_SEGMENT_POLICY = SegmentPolicy(
+    max_bytes=_env_int("BRUSH_EVENT_SEGMENT_MAX_MB", 32) * 1024 * 1024,
+    max_age_sec=_env_int("BRUSH_EVENT_SEGMENT_MAX_HOURS", 24) * 3600,
+    retention_days=_env_int("BRUSH_EVENT_RETENTION_DAYS", 90, min_value=0),
+)
+# 互动计数的半衰期（天）。
+ENGAGEMENT_HALF_LIFE_DAYS = _env_float("BRUSH_ENGAGEMENT_HALF_LIFE_DAYS", 7.0, min_value=0.1, max_value=365.0)
+# 兴趣权重每天的衰减系数（读取时按距上次更新的时间惰性计算）。
+INTEREST_DECAY_PER_DAY = _env_float("BRUSH_INTEREST_DECAY", 0.95, min_value=0.01)
 _FEEDS_CACHE: Dict[str, Any] = {"mtime": None, "data": None}
+_POOL_CACHE: Dict[str, Any] = {"signature": None, "data": None, "snapshot": None}
+# 当前线程正在处理的命令的工作单元（常驻服务下每个连接一个线程）。
+_UNIT_STATE = threading.local()
 
 
 def _build_mock_item(feeds: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
@@ -162,6 +209,15 @@ def _load_feeds_cached() -> Dict[str, List[Dict[str, Any]]]:
     return feeds
 
 
+def _file_signature(path: Path) -> Optional[tuple]:
+    """(mtime_ns, size, inode) changes whenever the file is rewritten or replaced."""
+    try:
+        stat = path.stat()
+    except Exception:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
 def _read_json_file(path: Path, default: Any) -> Any:
     if not path.exists():
         return default
@@ -172,12 +228,6 @@ def _read_json_file(path: Path, default: Any) -> Any:
         return default
 
 
-def _write_json_file(path: Path, payload: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-
-
 def _load_shared_content_pool() -> Dict[str, Any]:
     default_pool = {
         "articles": [],
@@ -185,6 +235,10 @@ def _load_shared_content_pool() -> Dict[str, Any]:
         "pool_size": 0,
         "min_threshold": POOL_MIN_ITEMS,
     }
+    signature = _file_signature(SHARED_CONTENT_POOL_FILE)
+    if signature is not None and _POOL_CACHE.get("signature") == signature:
+        return _POOL_CACHE["data"]
+
     data = _read_json_file(SHARED_CONTENT_POOL_FILE, default_pool)
     if not isinstance(data, dict):
         return dict(default_pool)
@@ -192,75 +246,18 @@ def _load_shared_content_pool() -> Dict[str, Any]:
     data.setdefault("last_refresh", "")
     data.setdefault("pool_size", 0)
     data.setdefault("min_threshold", POOL_MIN_ITEMS)
+    _POOL_CACHE["signature"] = signature
+    _POOL_CACHE["data"] = data
+    _POOL_CACHE["snapshot"] = None
     return data
 
 
-def _parse_iso_utc(value: str) -> Optional[datetime]:
-    text = str(value or "").strip()
-    if not text:
-        return None
-    if text.endswith("Z"):
-        text = text[:-1] + "+00:00"
-    try:
-        parsed = datetime.fromisoformat(text)
-    except Exception:
-        return None
-    if parsed.tzinfo is None:
-        parsed = parsed.replace(tzinfo=timezone.utc)
-    return parsed.astimezone(timezone.utc)
-
-
-def _normalize_history_entry(value: Any) -> Optional[Dict[str, str]]:
-    if isinstance(value, dict):
-        url = str(value.get("url", "") or "").strip()
-        read_at = str(value.get("read_at", "") or "").strip()
-    elif isinstance(value, str):
-        # 兼容旧格式（字符串列表），无法确认是否 URL，按 URL 兜底读入。
-        url = value.strip()
-        read_at = ""
-    else:
-        return None
-    if not url:
-        return None
-    if not read_at:
-        read_at = datetime.now(timezone.utc).isoformat()
-    if _parse_iso_utc(read_at) is None:
-        return None
-    return {"url": url, "read_at": read_at}
-
-
-def _load_shared_read_history() -> List[Dict[str, str]]:
-    data = _read_json_file(SHARED_READ_HISTORY_FILE, [])
-    if not isinstance(data, list):
-        data = []
-    now = datetime.now(timezone.utc)
-    expires_before = now - timedelta(hours=SHARED_READ_HISTORY_EXPIRE_HOURS)
-
-    normalized: List[Dict[str, str]] = []
-    for value in data:
-        entry = _normalize_history_entry(value)
-        if not entry:
-            continue
-        read_at_dt = _parse_iso_utc(entry["read_at"])
-        if read_at_dt is None:
-            continue
-        if read_at_dt < expires_before:
-            continue
-        normalized.append(entry)
-
-    # 历史记录做去重（URL）并限制最大长度。
-    deduped: List[Dict[str, str]] = []
-    seen_urls = set()
-    for entry in reversed(normalized):
-        url = entry["url"]
-        if url in seen_urls:
-            continue
-        seen_urls.add(url)
-        deduped.append(entry)
-        if len(deduped) >= SHARED_READ_HISTORY_LIMIT:
-            break
-    deduped.reverse()
-    return deduped
+def _shared_read_history() -> SharedReadHistory:
+    return get_shared_read_history(
+        SHARED_READ_LOG_FILE,
+        window_hours=SHARED_READ_HISTORY_EXPIRE_HOURS,
+        legacy_path=SHARED_READ_HISTORY_FILE,
+    )
 
 
 def _load_shared_user_prefs() -> Dict[str, Any]:
@@ -280,10 +277,6 @@ def _load_shared_user_prefs() -> Dict[str, Any]:
     return data
 
 
-def _save_shared_read_history(history: List[Dict[str, str]]) -> None:
-    _write_json_file(SHARED_READ_HISTORY_FILE, history)
-
-
 def _normalize_pool_tags(raw_tags: Any) -> List[str]:
     if not isinstance(raw_tags, list):
         return []
@@ -332,15 +325,107 @@ def _normalize_pool_article(article: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _build_pool_snapshot(pool_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pre-normalize pool articles once per pool file version, with lookup indexes.
+    """
+    raw_articles = pool_data.get("articles", [])
+    if not isinstance(raw_articles, list):
+        raw_articles = []
+    pool_articles = [article for article in raw_articles if isinstance(article, dict)]
+    candidates = [_normalize_pool_article(article) for article in pool_articles]
+    fingerprint = pool_fingerprint(pool_articles)
+    _attach_pool_embeddings(candidates, fingerprint)
+
+    index_by_url: Dict[str, List[int]] = {}
+    index_by_key: Dict[str, List[int]] = {}
+    for index, item in enumerate(candidates):
+        if item["url"]:
+            index_by_url.setdefault(item["url"], []).append(index)
+        index_by_key.setdefault(item["item_key"], []).append(index)
+
+    declared_pool_size = pool_data.get("pool_size", 0)
+    try:
+        declared_pool_size = int(declared_pool_size)
+    except Exception:
+        declared_pool_size = 0
+
+    min_threshold = pool_data.get("min_threshold", POOL_MIN_ITEMS)
+    try:
+        min_threshold = max(1, int(min_threshold))
+    except Exception:
+        min_threshold = POOL_MIN_ITEMS
+
+    return {
+        "candidates": candidates,
+        # 列式编码随快照缓存，每个内容池版本只构建一次。
+        "columns": build_columns(candidates),
+        "retrieval": _load_retrieval_index(len(candidates), fingerprint),
+        "index_by_url": index_by_url,
+        "index_by_key": index_by_key,
+        "pool_size": max(len(candidates), max(0, declared_pool_size)),
+        "min_threshold": min_threshold,
+        "version": _pool_version(_POOL_CACHE.get("signature")),
+    }
+
+
+def _attach_pool_embeddings(candidates: List[Dict[str, Any]], fingerprint: bytes) -> None:
+    """挂上入池时算好的向量；边车文件缺失或与当前内容池不匹配时跳过（相似度记 0）。"""
+    vectors = read_pool_vectors(SHARED_CONTENT_POOL_VECTORS_FILE)
+    if vectors is None or len(vectors["rows"]) != len(candidates):
+        return
+    if vectors["fingerprint"] != fingerprint:
+        return
+    for candidate, row in zip(candidates, vectors["rows"]):
+        candidate["embedding"] = row
+
+
+def _load_retrieval_index(size: int, fingerprint: bytes) -> Optional[Dict[str, Any]]:
+    """倒排索引缺失或与当前内容池不匹配时返回 None，推荐退回全量打分。"""
+    index = read_retrieval_index(SHARED_CONTENT_POOL_INDEX_FILE)
+    if index is None or index.get("size") != size or index.get("fingerprint") != fingerprint.hex():
+        return None
+    return index
+
+
+def _update_user_vector_from_item(profile: Dict[str, Any], item: Dict[str, Any], weight: float) -> Dict[str, Any]:
+    item_key = str(item.get("item_key", "") or "")
+    if not item_key:
+        return profile
+    snapshot = _load_pool_snapshot()
+    for index in snapshot["index_by_key"].get(item_key, ()):
+        embedding = snapshot["candidates"][index].get("embedding")
+        if embedding is not None:
+            return update_user_vector(profile, embedding, weight)
+    return profile
+
+
+def _pool_version(signature: Optional[tuple]) -> str:
+    """可写入画像的内容池版本号（与文件签名一一对应）。"""
+    if not signature:
+        return ""
+    return "-".join(str(value) for value in signature)
+
+
+def _load_pool_snapshot() -> Dict[str, Any]:
+    pool_data = _load_shared_content_pool()
+    if _POOL_CACHE.get("data") is pool_data and _POOL_CACHE.get("snapshot") is not None:
+        return _POOL_CACHE["snapshot"]
+    snapshot = _build_pool_snapshot(pool_data)
+    if _POOL_CACHE.get("data") is pool_data:
+        _POOL_CACHE["snapshot"] = snapshot
+    return snapshot
+
+
 def _record_shared_read_history(item_url: str) -> None:
     item_url = str(item_url or "").strip()
     if not item_url:
         return
-    history = _load_shared_read_history()
-    history = [value for value in history if value.get("url", "") != item_url]
-    history.append({"url": item_url, "read_at": datetime.now(timezone.utc).isoformat()})
-    history = history[-SHARED_READ_HISTORY_LIMIT:]
-    _save_shared_read_history(history)
+    unit = _active_unit()
+    if unit is not None:
+        unit["shared_urls"].append(item_url)
+        return
+    _shared_read_history().record(item_url)
 
 
 def _append_pool_status(message: str, pool_size: int, pool_low: bool, pool_empty: bool) -> str:
@@ -362,27 +447,11 @@ def _build_recommended_item(
     This path is read-only and performs no network requests.
     """
     card_item = _build_mock_item(feeds)
-    pool_data = _load_shared_content_pool()
-    raw_articles = pool_data.get("articles", [])
-    if not isinstance(raw_articles, list):
-        raw_articles = []
-    candidates = [_normalize_pool_article(article) for article in raw_articles if isinstance(article, dict)]
-
-    declared_pool_size = pool_data.get("pool_size", 0)
-    try:
-        declared_pool_size = int(declared_pool_size)
-    except Exception:
-        declared_pool_size = 0
-    pool_size = max(len(candidates), max(0, declared_pool_size))
-
-    min_threshold = pool_data.get("min_threshold", POOL_MIN_ITEMS)
-    try:
-        min_threshold = max(1, int(min_threshold))
-    except Exception:
-        min_threshold = POOL_MIN_ITEMS
-
+    snapshot = _load_pool_snapshot()
+    candidates = snapshot["candidates"]
+    pool_size = snapshot["pool_size"]
     pool_empty = pool_size == 0
-    pool_low = pool_size < min_threshold
+    pool_low = pool_size < snapshot["min_threshold"]
 
     if not candidates:
         card_item["item_key"] = ""
@@ -392,47 +461,44 @@ def _build_recommended_item(
         card_item["_pool_empty"] = pool_empty
         return card_item
 
-    shared_history = _load_shared_read_history()
+    shared_read_urls = _shared_read_history().recent_urls()
     profile_history = profile.get("read_history", [])
     if not isinstance(profile_history, list):
         profile_history = []
-    read_urls = set()
-    for entry in shared_history:
-        if not isinstance(entry, dict):
-            continue
-        url = str(entry.get("url", "") or "").strip()
-        if url:
-            read_urls.add(url)
-
-    profile_keys = set(str(value) for value in profile_history if isinstance(value, str))
-    filtered = [
-        item
-        for item in candidates
-        if item.get("url", "") not in read_urls and item.get("item_key", "") not in profile_keys
-    ]
-    if not filtered:
-        card_item["item_key"] = ""
-        card_item["url"] = ""
-        card_item["_pool_size"] = pool_size
-        card_item["_pool_low"] = pool_low
-        card_item["_pool_empty"] = pool_empty
-        return card_item
+
+    # 用预建索引定位已读文章，开销与历史长度相关而不是池子大小。
+    excluded = set()
+    index_by_url = snapshot["index_by_url"]
+    index_by_key = snapshot["index_by_key"]
+    for url in shared_read_urls:
+        excluded.update(index_by_url.get(url, ()))
+    for value in profile_history:
+        if isinstance(value, str):
+            excluded.update(index_by_key.get(value, ()))
 
     shared_prefs = _load_shared_user_prefs()
-    rank_profile = dict(profile)
+    rank_profile = ranking_profile(profile)
     if not isinstance(rank_profile.get("interest_tags", {}), dict) or not rank_profile.get("interest_tags", {}):
         if isinstance(shared_prefs.get("interest_tags", {}), dict):
             rank_profile["interest_tags"] = dict(shared_prefs.get("interest_tags", {}))
 
-    ranked = rank_items(
-        filtered,
-        profile=rank_profile,
+    top_article = _pop_recommend_queue(
+        profile,
+        snapshot,
+        excluded,
+        rank_profile=rank_profile,
         recent_sources=profile.get("source_history", [])
         if isinstance(profile.get("source_history", []), list)
         else [],
         weights=weights or BASE_RECOMMEND_WEIGHTS,
     )
-    top_article = ranked[0] if ranked else filtered[0]
+    if top_article is None:
+        card_item["item_key"] = ""
+        card_item["url"] = ""
+        card_item["_pool_size"] = pool_size
+        card_item["_pool_low"] = pool_low
+        card_item["_pool_empty"] = pool_empty
+        return card_item
 
     card_item.update(
         {
@@ -440,6 +506,7 @@ def _build_recommended_item(
             "summary": top_article.get("summary", card_item["summary"]),
             "tags": top_article.get("tags", card_item["tags"]),
             "source": top_article.get("source", card_item["source"]),
+            "category": top_article.get("category", card_item.get("category", "")),
             "url": top_article.get("url", top_article.get("link", "")),
             "link": top_article.get("link", ""),
             "item_key": top_article.get("item_key", ""),
@@ -451,26 +518,145 @@ def _build_recommended_item(
     return card_item
 
 
+def _pop_recommend_queue(
+    profile: Dict[str, Any],
+    snapshot: Dict[str, Any],
+    excluded: set,
+    rank_profile: Dict[str, Any],
+    recent_sources: List[str],
+    weights: Dict[str, float],
+) -> Optional[Dict[str, Any]]:
+    """
+    从用户的预排队列里取下一篇：队列有效时只对队列中的 K 篇按当前状态重打分，
+    队列失效（内容池换版 / 兴趣明显漂移 / 权重变化 / 取空）时才对整个池子排序一次。
+    """
+    candidates = snapshot["candidates"]
+    interest_tags = rank_profile.get("interest_tags", {})
+    if not isinstance(interest_tags, dict):
+        interest_tags = {}
+
+    counters = _engagement_counters()
+    popularity = counters.popularity
+    queue = profile.get("recommend_queue", {})
+    queued: List[Dict[str, Any]] = []
+    if _recommend_queue_valid(queue, snapshot["version"], interest_tags, weights):
+        seen = set()
+        for item_key in queue.get("item_keys", []):
+            for index in snapshot["index_by_key"].get(item_key, ()):
+                if index not in excluded and index not in seen:
+                    seen.add(index)
+                    queued.append(candidates[index])
+                    break
+
+    if queued:
+        ranked = top_k_items(
+            queued,
+            profile=rank_profile,
+            recent_sources=recent_sources,
+            weights=weights,
+            k=1,
+            upper_bound=lambda item: score_upper_bound(item, recent_sources, weights, popularity),
+            popularity=popularity,
+        )
+        queue_keys = [item["item_key"] for item in queued]
+    else:
+        retrieved = None
+        if snapshot["retrieval"] is not None and len(candidates) >= RETRIEVAL_MIN_POOL_SIZE:
+            retrieved = retrieve_candidates(snapshot["retrieval"], interest_tags, excluded=excluded)
+        ranked = rank_top_k(
+            snapshot["columns"],
+            profile=rank_profile,
+            recent_sources=recent_sources,
+            weights=weights,
+            k=RECOMMEND_QUEUE_SIZE,
+            excluded=excluded,
+            candidates=retrieved,
+            popularity_many=counters.popularity_many,
+        )
+        if not ranked and retrieved is not None:
+            ranked = rank_top_k(
+                snapshot["columns"],
+                profile=rank_profile,
+                recent_sources=recent_sources,
+                weights=weights,
+                k=RECOMMEND_QUEUE_SIZE,
+                excluded=excluded,
+                popularity_many=counters.popularity_many,
+            )
+        if not ranked:
+            profile.pop("recommend_queue", None)
+            return None
+        queue_keys = [item["item_key"] for item in ranked[:RECOMMEND_QUEUE_SIZE]]
+        queue = {
+            "pool_version": snapshot["version"],
+            "interest_tags": {str(tag): float(value) for tag, value in interest_tags.items() if _is_number(value)},
+            "weights": {str(key): float(value) for key, value in weights.items()},
+        }
+
+    top_article = ranked[0]
+    queue["item_keys"] = [key for key in queue_keys if key != top_article["item_key"]]
+    profile["recommend_queue"] = queue
+    return top_article
+
+
+def _recommend_queue_valid(
+    queue: Any,
+    pool_version: str,
+    interest_tags: Dict[str, Any],
+    weights: Dict[str, float],
+) -> bool:
+    if not isinstance(queue, dict) or not queue.get("item_keys"):
+        return False
+    if queue.get("pool_version") != pool_version:
+        return False
+    if queue.get("weights") != {str(key): float(value) for key, value in weights.items()}:
+        return False
+    return _interest_drift(queue.get("interest_tags", {}), interest_tags) <= RECOMMEND_QUEUE_TAG_DRIFT
+
+
+def _interest_drift(old_tags: Any, new_tags: Dict[str, Any]) -> float:
+    """兴趣标签的相对变化量：sum|Δ| / sum|旧值|。"""
+    if not isinstance(old_tags, dict):
+        old_tags = {}
+    old_values = {tag: float(value) for tag, value in old_tags.items() if _is_number(value)}
+    new_values = {tag: float(value) for tag, value in new_tags.items() if _is_number(value)}
+    change = sum(abs(new_values.get(tag, 0.0) - old_values.get(tag, 0.0)) for tag in set(old_values) | set(new_values))
+    base = sum(abs(value) for value in old_values.values())
+    return change / max(base, 1.0)
+
+
+def _is_number(value: Any) -> bool:
+    try:
+        float(value)
+    except Exception:
+        return False
+    return True
+
+
+def _profile_store() -> ProfileStore:
+    return get_profile_store(PROFILES_DB, legacy_dir=PROFILES_DIR)
+
+
 def _load_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """Load user profile if exists."""
-    profile_path = PROFILES_DIR / f"{user_id}.json"
-    if profile_path.exists():
-        with profile_path.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+    # 返回副本，命令处理中途失败不会污染存储层的快照。
+    return _profile_store().load(user_id)
 
 
 def _save_profile(user_id: str, profile: Dict[str, Any]) -> None:
-    """Save user profile."""
-    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
-    profile_path = PROFILES_DIR / f"{user_id}.json"
-    with profile_path.open("w", encoding="utf-8") as f:
-        json.dump(profile, f, ensure_ascii=False, indent=2)
+    """Save user profile（只写入与上次快照相比变化的行，单事务提交）。"""
+    unit = _active_unit()
+    if unit is not None:
+        # 工作单元内只记录最终要落盘的画像，命令结束时统一写入一次。
+        unit["profiles"][user_id] = profile
+        return
+    _profile_store().save(user_id, profile)
 
 
 def _default_profile() -> Dict[str, Any]:
     return {
         "interest_tags": {},
+        "interest_updated_at": {},
         "read_history": [],
         "source_history": [],
         "saved_items": [],
@@ -479,7 +665,6 @@ def _default_profile() -> Dict[str, Any]:
             "phase": "cold_start",
             "interaction_count": 0,
             "quick_limit": QUICK_LEARN_INTERACTIONS,
-            "last_rebalanced_at": 0,
         },
         "cold_start": {
             "active": True,
@@ -521,11 +706,17 @@ def _record_saved_item(profile: Dict[str, Any], item: Dict[str, Any]) -> Dict[st
         "summary": item.get("summary", "暂无摘要"),
     }
 
+    # 收藏的词频索引随收藏增量维护，知识相关度打分只需查表。
+    index = knowledge_index_for(profile) or empty_knowledge_index()
+    removed = []
     if item_key:
-        saved_items = [entry for entry in saved_items if entry.get("item_key", "") != item_key]
+        removed = [entry for entry in saved_items if isinstance(entry, dict) and entry.get("item_key", "") == item_key]
+        saved_items = [entry for entry in saved_items if not (isinstance(entry, dict) and entry.get("item_key", "") == item_key)]
     saved_items.append(normalized_item)
+    evicted = saved_items[:-SAVED_ITEMS_LIMIT]
     saved_items = saved_items[-SAVED_ITEMS_LIMIT:]
     profile["saved_items"] = saved_items
+    profile["knowledge_index"] = update_knowledge_index(index, added=[normalized_item], removed=removed + evicted)
     return profile
 
 
@@ -541,44 +732,81 @@ def _record_source_history(profile: Dict[str, Any], source: str) -> Dict[str, An
     return profile
 
 
-def _update_interest_tags(profile: Dict[str, Any], tags: List[str], delta: int) -> Dict[str, Any]:
+def _interest_state(profile: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     interest = profile.get("interest_tags", {})
     if not isinstance(interest, dict):
         interest = {}
+    stamps = profile.get("interest_updated_at", {})
+    if not isinstance(stamps, dict):
+        stamps = {}
+    profile["interest_tags"] = interest
+    profile["interest_updated_at"] = stamps
+    return interest, stamps
 
-    for tag in tags:
-        if not tag:
-            continue
-        old_value = float(interest.get(tag, 0.0))
-        interest[tag] = round(old_value + float(delta), 2)
 
-    profile["interest_tags"] = interest
-    return profile
+def _decayed_interest(value: Any, updated_at: Any, now: float) -> float:
+    """按距上次更新的天数做指数衰减；没有时间戳的旧数据视为刚更新。"""
+    try:
+        numeric = float(value)
+    except Exception:
+        return 0.0
+    try:
+        elapsed_days = max(0.0, now - float(updated_at)) / 86400.0
+    except Exception:
+        elapsed_days = 0.0
+    if elapsed_days <= 0:
+        return numeric
+    return numeric * (INTEREST_DECAY_PER_DAY ** elapsed_days)
 
 
-def _recalibrate_interest_tags(profile: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Light rebalance for quick-learning phase:
-    keep strong tags and suppress noisy weak signals.
-    """
+def _effective_interest_tags(profile: Dict[str, Any], now: Optional[float] = None) -> Dict[str, float]:
+    """读取时的兴趣权重：存储值按时间衰减，不回写画像。"""
     interest = profile.get("interest_tags", {})
     if not isinstance(interest, dict) or not interest:
-        return profile
+        return {}
+    stamps = profile.get("interest_updated_at", {})
+    if not isinstance(stamps, dict):
+        stamps = {}
+    now = time.time() if now is None else now
+    return {tag: round(_decayed_interest(value, stamps.get(tag, now), now), 4) for tag, value in interest.items()}
 
-    rebalanced: Dict[str, float] = {}
-    for tag, value in interest.items():
-        try:
-            numeric = float(value)
-        except Exception:
+
+def _update_interest_tags(
+    profile: Dict[str, Any], tags: List[str], delta: int, now: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    只改动涉及的标签：先把衰减结算到当前时间，再加上 delta 并记下更新时间。
+    标签按更新先后排列（刚更新的移到末尾），清理时只看最前面的几个旧标签。
+    """
+    now = time.time() if now is None else now
+    interest, stamps = _interest_state(profile)
+
+    touched = set()
+    for tag in tags:
+        if not tag:
             continue
-        adjusted = round(numeric * 0.95, 3)
-        if adjusted >= 0.15 or adjusted <= -0.15:
-            rebalanced[tag] = adjusted
+        current = _decayed_interest(interest.pop(tag, 0.0), stamps.pop(tag, now), now)
+        interest[tag] = round(current + float(delta), 4)
+        stamps[tag] = now
+        touched.add(tag)
 
-    profile["interest_tags"] = rebalanced
+    _prune_interest_tags(interest, stamps, now, skip=touched)
     return profile
 
 
+def _prune_interest_tags(interest: Dict[str, Any], stamps: Dict[str, Any], now: float, skip: Set[str]) -> None:
+    """摊还清理：每次写入只检查最久未更新的 INTEREST_PRUNE_BATCH 个标签。"""
+    stale = []
+    for tag in list(itertools.islice(interest, INTEREST_PRUNE_BATCH)):
+        if tag in skip:
+            continue
+        if abs(_decayed_interest(interest[tag], stamps.get(tag, now), now)) < INTEREST_PRUNE_THRESHOLD:
+            stale.append(tag)
+    for tag in stale:
+        interest.pop(tag, None)
+        stamps.pop(tag, None)
+
+
 def _ensure_learning_state(profile: Dict[str, Any]) -> Dict[str, Any]:
     state = profile.get("learning", {})
     if not isinstance(state, dict):
@@ -587,7 +815,6 @@ def _ensure_learning_state(profile: Dict[str, Any]) -> Dict[str, Any]:
     phase = state.get("phase", "")
     interaction_count = state.get("interaction_count", 0)
     quick_limit = state.get("quick_limit", QUICK_LEARN_INTERACTIONS)
-    last_rebalanced_at = state.get("last_rebalanced_at", 0)
 
     try:
         interaction_count = max(0, int(interaction_count))
@@ -597,10 +824,6 @@ def _ensure_learning_state(profile: Dict[str, Any]) -> Dict[str, Any]:
         quick_limit = max(1, int(quick_limit))
     except Exception:
         quick_limit = QUICK_LEARN_INTERACTIONS
-    try:
-        last_rebalanced_at = max(0, int(last_rebalanced_at))
-    except Exception:
-        last_rebalanced_at = 0
 
     if phase not in ("cold_start", "quick", "stable"):
         cold_state = _ensure_cold_start_state(profile)
@@ -614,7 +837,6 @@ def _ensure_learning_state(profile: Dict[str, Any]) -> Dict[str, Any]:
         "phase": phase,
         "interaction_count": interaction_count,
         "quick_limit": quick_limit,
-        "last_rebalanced_at": last_rebalanced_at,
     }
     profile["learning"] = normalized
     return normalized
@@ -625,7 +847,6 @@ def _activate_quick_learning(profile: Dict[str, Any]) -> Dict[str, Any]:
     state["phase"] = "quick"
     state["interaction_count"] = 0
     state["quick_limit"] = QUICK_LEARN_INTERACTIONS
-    state["last_rebalanced_at"] = 0
     profile["learning"] = state
     return state
 
@@ -651,19 +872,20 @@ def _resolve_recommend_weights(profile: Dict[str, Any]) -> Dict[str, float]:
 
     diversity = QUICK_LEARN_DIVERSITY_WEIGHT
     remaining = max(0.0, 1.0 - diversity)
-    ratio_total = BASE_RECOMMEND_WEIGHTS["interest"] + BASE_RECOMMEND_WEIGHTS["knowledge"] + BASE_RECOMMEND_WEIGHTS["popularity"]
+    ratio_total = sum(value for key, value in BASE_RECOMMEND_WEIGHTS.items() if key != "diversity")
     if ratio_total <= 0:
         return dict(BASE_RECOMMEND_WEIGHTS)
 
-    interest = round(remaining * (BASE_RECOMMEND_WEIGHTS["interest"] / ratio_total), 4)
-    knowledge = round(remaining * (BASE_RECOMMEND_WEIGHTS["knowledge"] / ratio_total), 4)
-    popularity = round(max(0.0, 1.0 - diversity - interest - knowledge), 4)
-    return {
-        "interest": interest,
-        "knowledge": knowledge,
-        "diversity": round(diversity, 4),
-        "popularity": popularity,
-    }
+    # 其余分量按基础权重的比例分摊剩余权重，popularity 吸收舍入误差。
+    weights = {}
+    for key, value in BASE_RECOMMEND_WEIGHTS.items():
+        if key == "diversity":
+            weights[key] = round(diversity, 4)
+        elif key != "popularity":
+            weights[key] = round(remaining * (value / ratio_total), 4)
+    assigned = sum(value for key, value in weights.items())
+    weights["popularity"] = round(max(0.0, 1.0 - assigned), 4)
+    return {key: weights[key] for key in BASE_RECOMMEND_WEIGHTS}
 
 
 def _build_card_message(item: Dict[str, Any]) -> str:
@@ -754,12 +976,12 @@ def _pick_cold_start_categories(feeds: Dict[str, List[Dict[str, Any]]]) -> List[
     return categories
 
 
-def _build_seed_item(feeds: Dict[str, List[Dict[str, Any]]], category: str) -> Dict[str, Any]:
+def _build_seed_item(
+    feeds: Dict[str, List[Dict[str, Any]]],
+    category: str,
+    pooled: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
     article = None
-    try:
-        pooled = list_articles_by_category(CONTENT_DB, category=category, limit=1)
-    except Exception:
-        pooled = []
     if pooled:
         article = pooled[0]
 
@@ -788,8 +1010,12 @@ def _build_seed_item(feeds: Dict[str, List[Dict[str, Any]]], category: str) -> D
 def _build_seed_items(feeds: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
     seeds = []
     categories = _pick_cold_start_categories(feeds)
+    try:
+        pooled_by_category = list_articles_by_categories(CONTENT_DB, categories, limit_per_category=1)
+    except Exception:
+        pooled_by_category = {}
     for category in categories:
-        seeds.append(_build_seed_item(feeds, category))
+        seeds.append(_build_seed_item(feeds, category, pooled_by_category.get(category, [])))
     return seeds
 
 
@@ -1054,6 +1280,8 @@ def _next_item_response(
 
     # V2 bugfix: empty pool should not fall back to any mock/article card.
     if pool_empty and pool_size <= 0:
+        # like/skip 的标签更新随本次命令一并落盘（每个命令只写一次画像）。
+        _save_profile(user_id, profile)
         return {
             "message": _append_pool_status(
                 "📭 内容池为空，请等待刷新...",
@@ -1065,9 +1293,8 @@ def _next_item_response(
         }
 
     profile["last_item"] = card_item
-    profile = _record_read_history(profile, card_item.get("item_key", ""))
+    profile = apply_feedback(profile, "view", card_item)
     _record_shared_read_history(card_item.get("url", card_item.get("link", "")))
-    profile = _record_source_history(profile, card_item.get("source", ""))
 
     quick_hint = ""
     if learning.get("phase") == "quick":
@@ -1075,16 +1302,6 @@ def _next_item_response(
         current_count = int(learning["interaction_count"])
         quick_limit = int(learning.get("quick_limit", QUICK_LEARN_INTERACTIONS))
 
-        if current_count % QUICK_LEARN_REBALANCE_INTERVAL == 0 and current_count > int(learning.get("last_rebalanced_at", 0)):
-            profile = _recalibrate_interest_tags(profile)
-            learning["last_rebalanced_at"] = current_count
-            _safe_log_event(
-                user_id,
-                "quick_learn_rebalance",
-                card_item,
-                metadata={"interaction_count": current_count},
-            )
-
         if current_count >= quick_limit:
             learning["phase"] = "stable"
             quick_hint = "🎯 已进入稳定推荐模式。\n\n"
@@ -1128,18 +1345,70 @@ def _safe_log_event(
 ) -> None:
     """Log behavior event safely without affecting main command flow."""
     try:
-        log_behavior_event(
-            events_path=BEHAVIOR_EVENTS_FILE,
-            user_id=user_id,
-            action=action,
-            item=item,
-            metadata=metadata,
+        unit = _active_unit()
+        event = build_behavior_event(
+            user_id=user_id, action=action, item=item, metadata=metadata, phase=_live_learning_phase(unit, user_id)
         )
+        if unit is not None:
+            unit["events"].append(event)
+            return
+        _event_writer().submit([event])
     except Exception:
         # Behavior logging should not break command handling.
         return
 
 
+def _event_writer() -> BehaviorEventWriter:
+    """行为事件写入器：单次命令进程里同步写；常驻服务启动后台线程后改为入队批量写。"""
+    return get_behavior_event_writer(
+        BEHAVIOR_EVENTS_FILE, segment_policy=EVENT_SEGMENT_POLICY, counters=_engagement_counters()
+    )
+
+
+def _engagement_counters() -> EngagementCounters:
+    return get_engagement_counters(ENGAGEMENT_DB, half_life_days=ENGAGEMENT_HALF_LIFE_DAYS)
+
+
+def _live_learning_phase(unit: Optional[Dict[str, Any]], user_id: str) -> str:
+    """事件发生时用户所处的学习阶段（取本次命令正在处理的画像）。"""
+    if unit is None:
+        return ""
+    profile = unit["live_profiles"].get(user_id)
+    learning = profile.get("learning", {}) if isinstance(profile, dict) else {}
+    return str(learning.get("phase", "") or "") if isinstance(learning, dict) else ""
+
+
+def _active_unit() -> Optional[Dict[str, Any]]:
+    return getattr(_UNIT_STATE, "unit", None)
+
+
+def _new_unit() -> Dict[str, Any]:
+    """
+    单个命令的工作单元：画像、共享已读、行为事件先收集在内存里，
+    命令结束后按固定顺序一次性落盘；命令中途异常则整体丢弃，不会留下半写状态。
+    """
+    return {"profiles": {}, "live_profiles": {}, "shared_urls": [], "events": []}
+
+
+def _flush_unit(unit: Dict[str, Any]) -> None:
+    """按 画像 → 共享已读 → 行为事件 的顺序落盘，每类各一次写入。"""
+    store = _profile_store()
+    for user_id, profile in unit["profiles"].items():
+        store.save(user_id, profile)
+    if unit["shared_urls"]:
+        _shared_read_history().record_many(unit["shared_urls"])
+    if unit["events"]:
+        try:
+            _event_writer().submit(unit["events"])
+        except Exception:
+            # Behavior logging should not break command handling.
+            pass
+    unit["profiles"] = {}
+    unit["live_profiles"] = {}
+    unit["shared_urls"] = []
+    unit["events"] = []
+
+
 def _is_true(value: Any) -> bool:
     if isinstance(value, bool):
         return value
@@ -1191,6 +1460,8 @@ def _build_save_feedback(sink_result: Dict[str, Any]) -> str:
 def _build_deep_read_payload(item: Dict[str, Any]) -> Dict[str, str]:
     """
     Build deep-read payload from full article content with fallback.
+    The extracted text and derived explain/excerpt are cached by URL, so repeat
+    reads (by any user) skip the network.
     """
     title = str(item.get("title", "Untitled"))
     summary = str(item.get("summary", "暂无摘要"))
@@ -1202,35 +1473,125 @@ def _build_deep_read_payload(item: Dict[str, Any]) -> Dict[str, str]:
             "explain": explain,
             "excerpt": summarize_text(summary, max_sentences=3, max_chars=420),
             "status": "no_link_fallback",
+            "cache": "",
         }
 
-    try:
-        result = fetch_full_article_text(
-            link,
-            timeout=DEEP_READ_FETCH_TIMEOUT_SECONDS,
-            max_chars=6500,
-        )
-        body_text = result.get("text", "")
-        if body_text:
-            explain = build_plain_language_explanation(title, summary, body_text)
-            excerpt = build_deep_read_snippet(body_text, max_chars=900)
-            return {
-                "explain": explain,
-                "excerpt": excerpt,
-                "status": result.get("status", "ok"),
-            }
-    except Exception:
-        pass
+    cache = _read_cache()
+    cache_state = "hit"
+    entry = cache.get(link)
+    if entry is None:
+        cache_state = "miss"
+        try:
+            result = fetch_full_article_text(
+                link,
+                timeout=DEEP_READ_FETCH_TIMEOUT_SECONDS,
+                max_chars=DEEP_READ_MAX_CHARS,
+            )
+        except Exception:
+            result = {"text": "", "status": "fetch_failed"}
+        # 失败也缓存（有效期较短），避免同一坏链接反复等满超时。
+        entry = build_cache_entry(title, summary, result)
+        cache.put(link, entry)
+    elif entry.get("text") and entry.get("derived_for") != derived_fingerprint(title, summary):
+        # 同一 URL 换了标题/摘要：用缓存正文重新生成解读，不再联网；正文没重新抓，保留原入库时间。
+        stored_at = entry.get("stored_at")
+        entry = build_cache_entry(title, summary, entry)
+        cache.put(link, entry, stored_at=float(stored_at) if stored_at is not None else None)
+
+    if entry.get("text"):
+        return {
+            "explain": str(entry.get("explain", "")),
+            "excerpt": str(entry.get("excerpt", "")),
+            "status": str(entry.get("status", "ok") or "ok"),
+            "cache": cache_state,
+        }
 
     explain = build_plain_language_explanation(title, summary, summary)
     return {
         "explain": explain,
         "excerpt": summarize_text(summary, max_sentences=3, max_chars=420),
         "status": "fetch_failed_fallback",
+        "cache": cache_state,
     }
 
 
+def _read_cache() -> ReadCache:
+    return get_shared_read_cache()
+
+
+def new_profile() -> Dict[str, Any]:
+    """新用户的默认画像。"""
+    return _default_profile()
+
+
+def reset_profile(user_id: str) -> None:
+    """删除用户画像（存储层记录和旧版 JSON 文件），下次命令按新用户处理。"""
+    legacy_path = PROFILES_DIR / "{0}.json".format(user_id)
+    if legacy_path.exists():
+        legacy_path.unlink()
+    _profile_store().delete(user_id)
+
+
+def pool_item(article: Dict[str, Any]) -> Dict[str, Any]:
+    """把内容池 JSON 里的一篇文章规整成排序用的卡片字段。"""
+    return _normalize_pool_article(article)
+
+
+def ranking_profile(profile: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """排序用的画像副本：兴趣权重换成按 now 衰减后的值，不回写原画像。"""
+    rank_profile = dict(profile)
+    rank_profile["interest_tags"] = _effective_interest_tags(profile, now=now)
+    return rank_profile
+
+
+def apply_feedback(
+    profile: Dict[str, Any], action: str, item: Dict[str, Any], now: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    把一次用户行为记进画像，命令处理和离线回放共用这套规则：
+    - view：记入阅读历史和来源历史
+    - like / skip / save：按 FEEDBACK_INTEREST_DELTAS 调整文章标签的兴趣权重，save 另记入收藏
+    其他行为不改画像。用户向量依赖当前内容池，由命令处理另行更新。
+    """
+    if action == "view":
+        profile = _record_read_history(profile, str(item.get("item_key", "") or ""))
+        return _record_source_history(profile, str(item.get("source", "") or ""))
+    delta = FEEDBACK_INTEREST_DELTAS.get(action)
+    if delta is None:
+        return profile
+    if action == "save":
+        profile = _record_saved_item(profile, item)
+    tags = item.get("tags", []) if isinstance(item.get("tags", []), list) else []
+    return _update_interest_tags(profile, tags, delta=delta, now=now)
+
+
 def handle_command(command: str, args: List[str], user_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    处理用户命令，返回前完成全部落盘。参数与返回值见 _handle_command。
+    """
+    response, flush = handle_command_deferred(command, args, user_id, context)
+    flush()
+    return response
+
+
+def handle_command_deferred(
+    command: str, args: List[str], user_id: str, context: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Callable[[], None]]:
+    """
+    处理用户命令，但把落盘推迟到调用方执行 flush() 时（例如先把回复发出去）。
+    同一用户的下一条命令必须在 flush() 之后处理。
+    """
+    previous = _active_unit()
+    unit = _new_unit()
+    _UNIT_STATE.unit = unit
+    try:
+        response = _handle_command(command, args, user_id, context)
+    finally:
+        _UNIT_STATE.unit = previous
+    return response, lambda: _flush_unit(unit)
+
+
+def _handle_command(command: str, args: List[str], user_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
     """
     处理用户命令
     
@@ -1250,6 +1611,10 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
     profile = _load_profile(user_id) or _default_profile()
     _ensure_cold_start_state(profile)
     _ensure_learning_state(profile)
+    unit = _active_unit()
+    if unit is not None:
+        # 行为事件按这份画像当时的学习阶段打标。
+        unit["live_profiles"][user_id] = profile
 
     # 主命令：开始刷博客
     if command == "/brush":
@@ -1303,9 +1668,8 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
         if _is_cold_start_active(profile):
             return _advance_cold_start(user_id, profile, feeds, action="like")
         last_item = profile.get("last_item", {}) if isinstance(profile.get("last_item", {}), dict) else {}
-        tags = last_item.get("tags", []) if isinstance(last_item.get("tags", []), list) else []
-        profile = _update_interest_tags(profile, tags, delta=2)
-        _save_profile(user_id, profile)
+        profile = apply_feedback(profile, "like", last_item)
+        profile = _update_user_vector_from_item(profile, last_item, LIKE_VECTOR_WEIGHT)
         _safe_log_event(user_id, "like", last_item)
         response = _next_item_response(user_id, profile, feeds)
         response["message"] = "✅ 已记录偏好（+2）\n\n" + response["message"]
@@ -1316,9 +1680,7 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
         if _is_cold_start_active(profile):
             return _advance_cold_start(user_id, profile, feeds, action="skip")
         last_item = profile.get("last_item", {}) if isinstance(profile.get("last_item", {}), dict) else {}
-        tags = last_item.get("tags", []) if isinstance(last_item.get("tags", []), list) else []
-        profile = _update_interest_tags(profile, tags, delta=-1)
-        _save_profile(user_id, profile)
+        profile = apply_feedback(profile, "skip", last_item)
         _safe_log_event(user_id, "skip", last_item)
         response = _next_item_response(user_id, profile, feeds)
         response["message"] = "⏭️ 已跳过（-1）\n\n" + response["message"]
@@ -1331,7 +1693,15 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
             _safe_log_event(user_id, "read_miss", metadata={"reason": "no_last_item"})
             return {"message": "还没有可展开的文章，先试试 /brush", "buttons": action_buttons}
         deep_read_payload = _build_deep_read_payload(last_item)
-        _safe_log_event(user_id, "read", last_item, metadata={"deep_read_status": deep_read_payload.get("status", "")})
+        _safe_log_event(
+            user_id,
+            "read",
+            last_item,
+            metadata={
+                "deep_read_status": deep_read_payload.get("status", ""),
+                "deep_read_cache": deep_read_payload.get("cache", ""),
+            },
+        )
         return {
             "message": build_deep_read_message(
                 last_item,
@@ -1352,12 +1722,8 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
         if not last_item:
             _safe_log_event(user_id, "save_miss", metadata={"reason": "no_last_item"})
             return {"message": "还没有可收藏的文章，先试试 /brush", "buttons": build_brush_buttons()}
-        profile = _record_saved_item(profile, last_item)
-        profile = _update_interest_tags(
-            profile,
-            last_item.get("tags", []) if isinstance(last_item.get("tags", []), list) else [],
-            delta=5,
-        )
+        profile = apply_feedback(profile, "save", last_item)
+        profile = _update_user_vector_from_item(profile, last_item, SAVE_VECTOR_WEIGHT)
         _save_profile(user_id, profile)
         try:
             sink_result = _save_knowledge_note(user_id, last_item, context)
@@ -1396,14 +1762,7 @@ def handle_command(command: str, args: List[str], user_id: str, context: Dict[st
 def run_brush() -> int:
     """Handle /brush command with priority RSS source and fallback."""
     result = handle_command("/brush", [], "cli-user", {})
-    print(result.get("message", ""))
-    buttons = result.get("buttons", [])
-    if buttons:
-        button_texts = []
-        for row in buttons:
-            row_labels = " ".join("[{0}]".format(btn.get("text", "")) for btn in row)
-            button_texts.append(row_labels)
-        print("按钮：" + " | ".join(button_texts))
+    print(render_cli_output(result))
     return 0
 
 
@@ -1417,14 +1776,7 @@ def main() -> int:
         return run_brush()
 
     result = handle_command(args.command, args.args, "cli-user", {})
-    print(result.get("message", ""))
-    buttons = result.get("buttons", [])
-    if buttons:
-        button_texts = []
-        for row in buttons:
-            row_labels = " ".join("[{0}]".format(btn.get("text", "")) for btn in row)
-            button_texts.append(row_labels)
-        print("按钮：" + " | ".join(button_texts))
+    print(render_cli_output(result))
     return 0
 
 
@@ -4,27 +4,50 @@ V2.0 内容池管理器
 用途：
 1) 后台刷新 RSS 内容池（可由子代理异步执行）
 2) 将去重后的文章写入 shared/content_pool.json
+3) 入池时计算文章向量，写入同名 .vec 边车文件（推荐时只需点积）
+4) 入池时构建 标签/分类/来源 → 文章 的倒排索引（.idx.json），读路径只加载不重建
+5) 刷新后预取文章正文与解读写入深读缓存，/brush read 基本只需本地读取
 """
 
 import argparse
+import hashlib
 import json
+import math
+import sys
 import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
-from urllib.parse import urlsplit, urlunsplit
 
-from fetcher.rss import fetch_latest_article, load_feeds
+from fetcher.cleaner import normalize_url
+from fetcher.engine import fetch_concurrently
+from fetcher.feed_cache import load_feed_cache, save_feed_cache
+from fetcher.read_cache import READ_CACHE_DIR, build_cache_entry, get_shared_read_cache
+from fetcher.reader import DEEP_READ_MAX_CHARS, fetch_full_article_text
+from fetcher.rss import fetch_feed_articles, load_feeds
+from recommend.embedder import pool_fingerprint, write_pool_vectors
+from recommend.retrieval import build_retrieval_index, write_retrieval_index
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 FEEDS_FILE = ROOT_DIR / "data" / "feeds.json"
 SHARED_POOL_FILE = ROOT_DIR / "shared" / "content_pool.json"
 SHARED_POOL_LOG_FILE = ROOT_DIR / "shared" / "pool_log.jsonl"
+FEED_CACHE_FILE = ROOT_DIR / "shared" / "feed_cache.json"
 
 POOL_MIN = 10
 POOL_MAX = 20
 FETCH_TIMEOUT_SECONDS = 8
+FETCH_MAX_WORKERS = 8
+FETCH_PER_HOST_LIMIT = 2
+REFRESH_DEADLINE_SECONDS = 20
+ENTRIES_PER_FEED = 5
 CLEANUP_DAYS_DEFAULT = 7
+PREFETCH_TIMEOUT_SECONDS = 6
+PREFETCH_MAX_WORKERS = 8
+PREFETCH_PER_HOST_LIMIT = 2
+PREFETCH_DEADLINE_SECONDS = 30
+# 每个分类最多预取的篇数（按池内顺序），0 表示整池预取。
+PREFETCH_PER_CATEGORY = 0
 
 
 def _now_iso_utc() -> str:
@@ -47,6 +70,25 @@ def _write_json(path: Path, payload: Any) -> None:
         json.dump(payload, f, ensure_ascii=False, indent=2)
 
 
+def _pool_vectors_file(pool_file: Path) -> Path:
+    return pool_file.with_suffix(".vec")
+
+
+def _pool_index_file(pool_file: Path) -> Path:
+    return pool_file.with_suffix(".idx.json")
+
+
+def _write_pool(path: Path, payload: Dict[str, Any]) -> None:
+    """先写向量与倒排索引边车再写内容池，读取方按指纹校验它们是否匹配。"""
+    articles = payload.get("articles", [])
+    if not isinstance(articles, list):
+        articles = []
+    write_pool_vectors(_pool_vectors_file(path), articles)
+    fingerprint = pool_fingerprint([article for article in articles if isinstance(article, dict)]).hex()
+    write_retrieval_index(_pool_index_file(path), build_retrieval_index(articles, fingerprint=fingerprint))
+    _write_json(path, payload)
+
+
 def _append_pool_log(action: str, **fields: Any) -> None:
     record = {"action": action, "timestamp": _now_iso_utc()}
     record.update(fields)
@@ -78,29 +120,18 @@ def _article_datetime(article: Dict[str, Any]) -> Optional[datetime]:
     return None
 
 
-def _normalize_url(url: str) -> str:
-    text = (url or "").strip()
-    if not text:
-        return ""
-    try:
-        parsed = urlsplit(text)
-        scheme = (parsed.scheme or "https").lower()
-        netloc = parsed.netloc.lower()
-        path = parsed.path or "/"
-        normalized = urlunsplit((scheme, netloc, path.rstrip("/") or "/", parsed.query, ""))
-        return normalized
-    except Exception:
-        return text
-
-
 def _article_from_feed(category: str, source: Dict[str, Any], article: Dict[str, str]) -> Dict[str, Any]:
     title = str(article.get("title", "Untitled") or "Untitled").strip()
     summary = str(article.get("summary", "暂无摘要") or "暂无摘要").strip()
-    url = _normalize_url(str(article.get("link", "") or ""))
+    url = normalize_url(str(article.get("link", "") or ""))
     tags = [value for value in category.split("_") if value]
 
     return {
-        "id": "{0}:{1}".format(category, source.get("name", source.get("site", "unknown"))),
+        "id": "{0}:{1}:{2}".format(
+            category,
+            source.get("name", source.get("site", "unknown")),
+            hashlib.sha1(url.encode("utf-8")).hexdigest()[:12],
+        ),
         "title": title,
         "summary": summary,
         "url": url,
@@ -129,47 +160,93 @@ def _existing_articles_for_fallback() -> List[Dict[str, Any]]:
     return output
 
 
+def _feed_jobs(feeds: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按 feeds.json 的分类顺序展开抓取任务，顺序即入池优先级。"""
+    jobs: List[Dict[str, Any]] = []
+    for category, sources in feeds.items():
+        if not isinstance(sources, list):
+            continue
+        for source in sources:
+            if not isinstance(source, dict):
+                continue
+            feed_url = str(source.get("url", "") or "").strip()
+            if not feed_url:
+                continue
+            jobs.append({"category": category, "source": source, "url": feed_url})
+    return jobs
+
+
 def refresh_pool(
     feeds_file: Path = FEEDS_FILE,
     output_file: Path = SHARED_POOL_FILE,
     pool_min: int = POOL_MIN,
     pool_max: int = POOL_MAX,
     timeout: int = FETCH_TIMEOUT_SECONDS,
+    max_workers: int = FETCH_MAX_WORKERS,
+    per_host_limit: int = FETCH_PER_HOST_LIMIT,
+    deadline_seconds: float = REFRESH_DEADLINE_SECONDS,
+    feed_cache_file: Optional[Path] = FEED_CACHE_FILE,
+    entries_per_feed: int = ENTRIES_PER_FEED,
 ) -> Dict[str, Any]:
     """
     刷新 shared 内容池。
     规则：
-    - 遍历 feeds.json 的 RSS 源
-    - URL 去重
+    - 并发抓取 feeds.json 的 RSS 源（全局并发上限 + 单域名上限 + 整体截止时间）
+    - 条件请求（ETag / Last-Modified），未变化的源直接复用上次解析结果
+    - 按分类顺序组装，URL 去重
     - 最多写入 pool_max 篇
     """
     feeds = load_feeds(feeds_file)
+    jobs = _feed_jobs(feeds)
+    feed_cache = load_feed_cache(feed_cache_file) if feed_cache_file else {}
+    for job in jobs:
+        # 每个任务独占自己的缓存条目副本，线程间不共享可变状态。
+        job["cache"] = dict(feed_cache.get(job["url"], {}))
+        job["cache"].pop("last_status", None)
+    fetched = fetch_concurrently(
+        jobs,
+        fetch_fn=lambda job: fetch_feed_articles(
+            job["url"],
+            timeout=timeout,
+            limit=entries_per_feed,
+            cache_entry=job["cache"],
+        ),
+        url_of=lambda job: job["url"],
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        deadline_seconds=deadline_seconds,
+    )
+    fetch_stats = fetched["stats"]
+    # 截止时间后仍在运行的线程还会改自己的条目：只收录已完成任务的条目（拷贝），其余沿用旧缓存。
+    completed_jobs = [job for job, entries in zip(jobs, fetched["results"]) if entries is not None]
+    for job in completed_jobs:
+        feed_cache[job["url"]] = dict(job["cache"])
+    cache_hits = sum(1 for job in completed_jobs if job["cache"].get("last_status") in ("not_modified", "unchanged"))
+    if feed_cache_file:
+        try:
+            save_feed_cache(feed_cache_file, feed_cache, keep_urls=[job["url"] for job in jobs])
+        except Exception as exc:
+            sys.stderr.write("feed cache save failed: {0}\n".format(exc))
+
     articles: List[Dict[str, Any]] = []
     seen_urls = set()
-    attempted = 0
     succeeded = 0
 
-    for category, sources in feeds.items():
-        if not isinstance(sources, list):
-            continue
-        for source in sources:
+    # 结果与任务一一对应。按“条目名次”轮转组装：先取每个源的最新一篇，再取第二篇……
+    # 这样既保持分类优先级，又能用多条目补足抓取失败的源。
+    per_job_entries = [entries or [] for entries in fetched["results"]]
+    fetched_sources = sum(1 for entries in per_job_entries if entries)
+    max_rank = max((len(entries) for entries in per_job_entries), default=0)
+    for rank in range(max_rank):
+        if len(articles) >= pool_max:
+            break
+        for job, entries in zip(jobs, per_job_entries):
             if len(articles) >= pool_max:
                 break
-            if not isinstance(source, dict):
-                continue
-            feed_url = str(source.get("url", "") or "").strip()
-            if not feed_url:
+            if rank >= len(entries):
                 continue
 
-            attempted += 1
-            try:
-                latest = fetch_latest_article(feed_url, timeout=timeout)
-            except Exception:
-                latest = None
-            if not latest:
-                continue
-
-            item = _article_from_feed(category, source, latest)
+            item = _article_from_feed(job["category"], job["source"], entries[rank])
             url = item.get("url", "")
             if not url:
                 continue
@@ -179,15 +256,12 @@ def refresh_pool(
             articles.append(item)
             succeeded += 1
 
-        if len(articles) >= pool_max:
-            break
-
     # 如果这次抓取不足最小阈值，用历史池子补齐（仍然 URL 去重）。
     if len(articles) < pool_min:
         for old in _existing_articles_for_fallback():
             if len(articles) >= pool_min:
                 break
-            url = _normalize_url(str(old.get("url", "") or ""))
+            url = normalize_url(str(old.get("url", "") or ""))
             if not url or url in seen_urls:
                 continue
             merged = dict(old)
@@ -203,12 +277,17 @@ def refresh_pool(
         "pool_size": min(len(articles), pool_max),
         "min_threshold": 5,
         "stats": {
-            "attempted_sources": attempted,
-            "successful_fetches": succeeded,
+            "attempted_sources": len(jobs),
+            "successful_fetches": fetched_sources,
+            "fetched_articles": succeeded,
+            "failed_fetches": int(fetch_stats.get("failed", 0)),
+            "timed_out_fetches": int(fetch_stats.get("timed_out", 0)),
+            "feed_cache_hits": cache_hits,
+            "fetch_duration_sec": fetch_stats.get("duration_sec", 0.0),
             "deduped_articles": min(len(articles), pool_max),
         },
     }
-    _write_json(output_file, payload)
+    _write_pool(output_file, payload)
 
     return payload
 
@@ -249,7 +328,7 @@ def cleanup_pool(
     data["pool_size"] = len(kept)
     data["last_cleanup"] = _now_iso_utc()
     data.setdefault("min_threshold", 5)
-    _write_json(output_file, data)
+    _write_pool(output_file, data)
 
     return {
         "articles_removed": removed,
@@ -258,6 +337,89 @@ def cleanup_pool(
     }
 
 
+def prefetch_bodies(
+    pool_file: Path = SHARED_POOL_FILE,
+    cache_dir: Path = READ_CACHE_DIR,
+    per_category: int = PREFETCH_PER_CATEGORY,
+    timeout: int = PREFETCH_TIMEOUT_SECONDS,
+    max_workers: int = PREFETCH_MAX_WORKERS,
+    per_host_limit: int = PREFETCH_PER_HOST_LIMIT,
+    deadline_seconds: float = PREFETCH_DEADLINE_SECONDS,
+) -> Dict[str, Any]:
+    """
+    预取内容池文章正文，抽取后连同解读写入深读缓存。
+    规则：
+    - 按池内顺序挑选文章，per_category > 0 时每个分类只取前 N 篇
+    - 缓存里仍有效的文章跳过，不重复下载
+    - 并发抓取（全局并发上限 + 单域名上限 + 整体截止时间），超时未完成的不写缓存
+    """
+    data = _read_json(pool_file, {})
+    articles = data.get("articles", []) if isinstance(data, dict) else []
+    cache = get_shared_read_cache(cache_dir)
+
+    jobs: List[Dict[str, Any]] = []
+    seen_urls = set()
+    per_category_count: Dict[str, int] = {}
+    cached = 0
+    for article in articles:
+        if not isinstance(article, dict):
+            continue
+        url = str(article.get("url", article.get("link", "")) or "").strip()
+        if not url or url in seen_urls:
+            continue
+        category = str(article.get("category", "") or "")
+        if per_category > 0 and per_category_count.get(category, 0) >= per_category:
+            continue
+        seen_urls.add(url)
+        per_category_count[category] = per_category_count.get(category, 0) + 1
+        # contains() 不计命中、不刷新 LRU 时间，预取检查不会干扰缓存统计和淘汰顺序。
+        if cache.contains(url):
+            cached += 1
+            continue
+        jobs.append(
+            {
+                "url": url,
+                # 与 /brush read 看到的卡片字段一致，缓存的解读才能直接命中。
+                "title": str(article.get("title", "Untitled") or "Untitled").strip(),
+                "summary": str(article.get("summary", "暂无摘要") or "暂无摘要").strip(),
+            }
+        )
+
+    # 单次请求的 socket 超时不超过整体预算，截止后仍在跑的线程也能尽快结束。
+    fetch_timeout = max(1, min(int(timeout), int(math.ceil(deadline_seconds)))) if deadline_seconds > 0 else timeout
+
+    def _fetch(job: Dict[str, Any]) -> Dict[str, str]:
+        try:
+            return fetch_full_article_text(job["url"], timeout=fetch_timeout, max_chars=DEEP_READ_MAX_CHARS)
+        except Exception:
+            return {"text": "", "status": "fetch_failed"}
+
+    fetched = fetch_concurrently(
+        jobs,
+        fetch_fn=_fetch,
+        url_of=lambda job: job["url"],
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        deadline_seconds=deadline_seconds,
+    )
+    # 只写入截止前返回的结果；超时任务的线程即使稍后完成也不会落进缓存。
+    results = []
+    for job, result in zip(jobs, fetched["results"]):
+        if result is None:
+            continue
+        entry = build_cache_entry(job["title"], job["summary"], result)
+        cache.put(job["url"], entry)
+        results.append(entry)
+    return {
+        "selected": len(seen_urls),
+        "already_cached": cached,
+        "fetched": sum(1 for entry in results if entry.get("text")),
+        "failed": sum(1 for entry in results if not entry.get("text")),
+        "timed_out": int(fetched["stats"].get("timed_out", 0)),
+        "duration_sec": fetched["stats"].get("duration_sec", 0.0),
+    }
+
+
 def _print_refresh_summary(payload: Dict[str, Any]) -> None:
     articles = payload.get("articles", [])
     if not isinstance(articles, list):
@@ -281,15 +443,58 @@ def _print_cleanup_summary(result: Dict[str, Any]) -> None:
     )
 
 
+def _print_prefetch_summary(result: Dict[str, Any]) -> None:
+    print(
+        "正文预取: 新抓取 {0} 篇，已在缓存 {1} 篇，失败 {2} 篇，超时 {3} 篇".format(
+            int(result.get("fetched", 0) or 0),
+            int(result.get("already_cached", 0) or 0),
+            int(result.get("failed", 0) or 0),
+            int(result.get("timed_out", 0) or 0),
+        )
+    )
+
+
+def _run_prefetch(args: argparse.Namespace) -> None:
+    result = prefetch_bodies(
+        per_category=max(0, args.prefetch_per_category),
+        deadline_seconds=max(1.0, args.prefetch_budget),
+    )
+    _print_prefetch_summary(result)
+    _append_pool_log(action="prefetch", **result)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="V2 content pool manager")
-    parser.add_argument("action", nargs="?", default="refresh", choices=["refresh", "cleanup"], help="pool action")
+    parser.add_argument("action", nargs="?", default="refresh", choices=["refresh", "cleanup", "prefetch"], help="pool action")
     parser.add_argument("--days", type=int, default=CLEANUP_DAYS_DEFAULT, help="cleanup threshold days, default 7")
+    parser.add_argument("--pool-max", type=int, default=POOL_MAX, help="max articles kept in pool, default 20")
+    parser.add_argument(
+        "--entries-per-feed",
+        type=int,
+        default=ENTRIES_PER_FEED,
+        help="newest entries parsed per feed, default 5",
+    )
+    parser.add_argument("--no-prefetch", action="store_true", help="skip prefetching article bodies after refresh")
+    parser.add_argument(
+        "--prefetch-budget",
+        type=float,
+        default=PREFETCH_DEADLINE_SECONDS,
+        help="time budget of the prefetch stage in seconds, default 30",
+    )
+    parser.add_argument(
+        "--prefetch-per-category",
+        type=int,
+        default=PREFETCH_PER_CATEGORY,
+        help="bodies prefetched per category in pool order, default 0 (whole pool)",
+    )
     args = parser.parse_args()
 
     if args.action == "refresh":
         started_at = time.perf_counter()
-        payload = refresh_pool()
+        payload = refresh_pool(
+            pool_max=max(1, args.pool_max),
+            entries_per_feed=max(1, args.entries_per_feed),
+        )
         duration_sec = round(time.perf_counter() - started_at, 3)
         _print_refresh_summary(payload)
         articles = payload.get("articles", [])
@@ -301,6 +506,12 @@ def main() -> int:
             pool_size=int(payload.get("pool_size", 0) or 0),
             duration_sec=duration_sec,
         )
+        if not args.no_prefetch:
+            _run_prefetch(args)
+        return 0
+
+    if args.action == "prefetch":
+        _run_prefetch(args)
         return 0
 
     if args.action == "cleanup":
@@ -0,0 +1,450 @@
+"""
+Batch scoring over a columnar view of the candidate pool.
+
+build_columns() turns the candidate list into flat tag-id / source-id / category
+arrays once per pool version; rank_top_k() then scores every candidate against a
+profile in one pass and selects the top k without sorting the whole pool. Scores
+match recommend.scorer.score_item (same component formulas, rounded to 6 places).
+
+NumPy is used when installed; otherwise the same columns are scored in pure
+Python, which still avoids the per-item dict copies of rank_items().
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the skill runs without numpy, just slower on huge pools
+    np = None
+
+from recommend.embedder import dot, user_vector_values
+from recommend.knowledge import knowledge_index_for
+
+POPULAR_CATEGORY = "priority_hn_popular_2025"
+
+# Engagement popularity of many items from parallel item_key / source lists; None entries use the category heuristic.
+BulkPopularity = Callable[[Sequence[str], Sequence[str]], Sequence[Optional[float]]]
+
+
+def build_columns(items: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Encode candidates as columns: per-item tag ids (with and without duplicates),
+    source ids, item keys, popularity flags and embeddings, plus the tag/source
+    vocabularies.
+    """
+    tag_vocab: Dict[str, int] = {}
+    source_vocab: Dict[str, int] = {}
+    tag_ids: List[List[int]] = []
+    unique_tag_ids: List[List[int]] = []
+    source_ids: List[int] = []
+    item_keys: List[str] = []
+    popular: List[bool] = []
+    embeddings: List[Any] = []
+
+    for item in items:
+        tags = item.get("tags", [])
+        if not isinstance(tags, list):
+            tags = []
+        ids = [tag_vocab.setdefault(tag, len(tag_vocab)) for tag in tags]
+        tag_ids.append(ids)
+        unique_tag_ids.append(sorted(set(ids)))
+        source = item.get("source", "")
+        source_ids.append(source_vocab.setdefault(source, len(source_vocab)) if source else -1)
+        item_keys.append(str(item.get("item_key", "") or ""))
+        popular.append(item.get("category", "") == POPULAR_CATEGORY)
+        embeddings.append(item.get("embedding"))
+
+    columns = {
+        "items": items,
+        "size": len(items),
+        "tag_vocab": tag_vocab,
+        "tag_names": sorted(tag_vocab, key=tag_vocab.get),
+        "source_vocab": source_vocab,
+        "source_names": sorted(source_vocab, key=source_vocab.get),
+        "tag_ids": tag_ids,
+        "unique_tag_ids": unique_tag_ids,
+        "source_ids": source_ids,
+        "item_keys": item_keys,
+        "popular": popular,
+        "embeddings": embeddings,
+    }
+    if np is not None:
+        columns["np"] = _build_numpy_columns(tag_ids, unique_tag_ids, source_ids, popular, embeddings)
+    return columns
+
+
+def rank_top_k(
+    columns: Dict[str, Any],
+    profile: Dict[str, Any],
+    recent_sources: Sequence[str],
+    weights: Dict[str, float],
+    k: int,
+    excluded: Optional[Iterable[int]] = None,
+    candidates: Optional[Sequence[int]] = None,
+    popularity_many: Optional[BulkPopularity] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Return the top k candidates (decorated like rank_items output), best first.
+    Ties keep pool order, as the stable sort in rank_items does. candidates
+    restricts scoring to those pool positions (e.g. a retrieval stage's output).
+    popularity_many is called once, for the positions being scored.
+    """
+    size = int(columns["size"])
+    k = max(0, min(int(k), size))
+    if k == 0:
+        return []
+    excluded_set = set(excluded or ())
+
+    interest_weights, has_interest = _interest_vector(columns, profile)
+    tag_hits, saved_count = _knowledge_vector(columns, profile)
+    recent_mask = _recent_source_mask(columns, recent_sources)
+    user_vector = user_vector_values(profile)
+    w = (
+        float(weights.get("interest", 0.4)),
+        float(weights.get("knowledge", 0.3)),
+        float(weights.get("diversity", 0.2)),
+        float(weights.get("popularity", 0.1)),
+        float(weights.get("similarity", 0.0)),
+    )
+
+    indices = range(size) if candidates is None else sorted(set(int(index) for index in candidates))
+    live_indices = [index for index in indices if index not in excluded_set]
+    engagement = _popularity_overrides(columns, live_indices, popularity_many) if popularity_many else ([], [])
+
+    if np is not None and "np" in columns:
+        # 有候选集时只取候选行打分，胜出的行再映射回池内位置。
+        rows = None if candidates is None else np.asarray(live_indices, dtype=np.int64)
+        components = _score_numpy(
+            columns["np"] if rows is None else _take_rows(columns["np"], rows),
+            interest_weights,
+            has_interest,
+            tag_hits,
+            saved_count,
+            recent_mask,
+            user_vector,
+            w,
+            engagement,
+            rows,
+        )
+        if rows is None:
+            order = _top_k_numpy(components["total"], k, excluded_set)
+            return [_decorate(columns["items"][index], index, components) for index in order]
+        # rows is sorted, so ties on row number still resolve by pool order.
+        order = _top_k_numpy(components["total"], k, set())
+        return [_decorate(columns["items"][int(rows[row])], row, components) for row in order]
+
+    components = _score_python(
+        columns,
+        live_indices,
+        interest_weights,
+        has_interest,
+        tag_hits,
+        saved_count,
+        recent_mask,
+        user_vector,
+        w,
+        dict(zip(*engagement)),
+    )
+    totals = components["total"]
+    live = iter(live_indices)
+    order = heapq.nsmallest(k, live, key=lambda index: (-totals[index], index))
+    return [_decorate(columns["items"][index], index, components) for index in order]
+
+
+def _interest_vector(columns: Dict[str, Any], profile: Dict[str, Any]) -> tuple:
+    """Per-vocab-tag interest weight, or None where the tag is not an interest."""
+    interest_tags = profile.get("interest_tags", {})
+    if not isinstance(interest_tags, dict) or not interest_tags:
+        return [], False
+    vector: List[Optional[float]] = []
+    for tag in columns["tag_names"]:
+        vector.append(float(interest_tags.get(tag, 0.0)) if tag in interest_tags else None)
+    return vector, True
+
+
+def _knowledge_vector(columns: Dict[str, Any], profile: Dict[str, Any]) -> tuple:
+    """Per-vocab-tag count of saved items that mention it, read from the token index."""
+    index = knowledge_index_for(profile)
+    if index is None or int(index.get("doc_count", 0) or 0) <= 0:
+        return [], 0
+    counts = index.get("token_counts", {})
+    hits = [int(counts.get(str(tag).lower(), 0)) for tag in columns["tag_names"]]
+    return hits, int(index["doc_count"])
+
+
+def _recent_source_mask(columns: Dict[str, Any], recent_sources: Sequence[str]) -> List[bool]:
+    mask = [False] * len(columns["source_vocab"])
+    for source in recent_sources:
+        source_id = columns["source_vocab"].get(source)
+        if source_id is not None:
+            mask[source_id] = True
+    return mask
+
+
+def _score_python(
+    columns: Dict[str, Any],
+    indices: Sequence[int],
+    interest_weights: List[Optional[float]],
+    has_interest: bool,
+    tag_hits: List[int],
+    saved_count: int,
+    recent_mask: List[bool],
+    user_vector: Optional[List[float]],
+    w: tuple,
+    engagement: Dict[int, float],
+) -> Dict[str, Dict[int, float]]:
+    """Components keyed by pool position, for the given positions only."""
+    interest: Dict[int, float] = {}
+    knowledge: Dict[int, float] = {}
+    diversity: Dict[int, float] = {}
+    popularity: Dict[int, float] = {}
+    similarity: Dict[int, float] = {}
+    total: Dict[int, float] = {}
+
+    for index in indices:
+        ids = columns["tag_ids"][index]
+        if not ids:
+            interest_score = 0.0
+        elif not has_interest:
+            interest_score = 0.2
+        else:
+            matched = [interest_weights[tag_id] for tag_id in ids if interest_weights[tag_id] is not None]
+            interest_score = min(1.0, (sum(matched) / len(matched)) / 5.0) if matched else 0.1
+
+        unique_ids = columns["unique_tag_ids"][index]
+        if not unique_ids:
+            knowledge_score = 0.0
+        elif saved_count == 0:
+            knowledge_score = 0.2
+        else:
+            matched_hits = sum(tag_hits[tag_id] for tag_id in unique_ids)
+            knowledge_score = min(1.0, float(matched_hits) / float(len(unique_ids) * saved_count))
+
+        source_id = columns["source_ids"][index]
+        if source_id < 0:
+            diversity_score = 0.5
+        else:
+            diversity_score = 0.1 if recent_mask[source_id] else 1.0
+
+        popularity_score = engagement.get(index)
+        if popularity_score is None:
+            popularity_score = 1.0 if columns["popular"][index] else 0.6
+
+        embedding = columns["embeddings"][index]
+        if embedding is None or user_vector is None or len(embedding) != len(user_vector):
+            similarity_score = 0.0
+        else:
+            similarity_score = min(1.0, max(0.0, dot(user_vector, embedding)))
+
+        interest[index] = interest_score
+        knowledge[index] = knowledge_score
+        diversity[index] = diversity_score
+        popularity[index] = popularity_score
+        similarity[index] = similarity_score
+        total[index] = round(
+            interest_score * w[0]
+            + knowledge_score * w[1]
+            + diversity_score * w[2]
+            + popularity_score * w[3]
+            + similarity_score * w[4],
+            6,
+        )
+
+    return {
+        "interest": interest,
+        "knowledge": knowledge,
+        "diversity": diversity,
+        "popularity": popularity,
+        "similarity": similarity,
+        "total": total,
+    }
+
+
+def _build_numpy_columns(
+    tag_ids: List[List[int]],
+    unique_tag_ids: List[List[int]],
+    source_ids: List[int],
+    popular: List[bool],
+    embeddings: List[Any],
+) -> Dict[str, Any]:
+    size = len(tag_ids)
+    tag_counts = np.array([len(ids) for ids in tag_ids], dtype=np.int64)
+    unique_counts = np.array([len(ids) for ids in unique_tag_ids], dtype=np.int64)
+    dims = {len(vector) for vector in embeddings if vector is not None}
+    dim = dims.pop() if len(dims) == 1 else 0
+    # float64 keeps the dot products in step with the pure-Python scorer.
+    vectors = np.zeros((size, dim), dtype=np.float64)
+    has_vector = np.zeros(size, dtype=bool)
+    if dim:
+        for index, vector in enumerate(embeddings):
+            if vector is not None:
+                vectors[index] = vector
+                has_vector[index] = True
+    return {
+        "vectors": vectors,
+        "has_vector": has_vector,
+        "size": size,
+        "tag_rows": np.repeat(np.arange(size), [len(ids) for ids in tag_ids]),
+        "tag_flat": np.fromiter((tag_id for ids in tag_ids for tag_id in ids), dtype=np.int64),
+        "tag_counts": tag_counts,
+        "tag_starts": np.cumsum(tag_counts) - tag_counts,
+        "unique_rows": np.repeat(np.arange(size), [len(ids) for ids in unique_tag_ids]),
+        "unique_flat": np.fromiter((tag_id for ids in unique_tag_ids for tag_id in ids), dtype=np.int64),
+        "unique_counts": unique_counts,
+        "unique_starts": np.cumsum(unique_counts) - unique_counts,
+        "source_ids": np.array(source_ids, dtype=np.int64),
+        "popular": np.array(popular, dtype=bool),
+    }
+
+
+def _take_rows(arrays: Dict[str, Any], rows: Any) -> Dict[str, Any]:
+    """The numpy columns restricted to rows (pool positions), renumbered 0..len(rows)-1."""
+    size = len(rows)
+    tag_flat, tag_counts = _take_ragged(arrays["tag_flat"], arrays["tag_starts"], arrays["tag_counts"], rows)
+    unique_flat, unique_counts = _take_ragged(
+        arrays["unique_flat"], arrays["unique_starts"], arrays["unique_counts"], rows
+    )
+    return {
+        "vectors": arrays["vectors"][rows],
+        "has_vector": arrays["has_vector"][rows],
+        "size": size,
+        "tag_rows": np.repeat(np.arange(size), tag_counts),
+        "tag_flat": tag_flat,
+        "tag_counts": tag_counts,
+        "unique_rows": np.repeat(np.arange(size), unique_counts),
+        "unique_flat": unique_flat,
+        "unique_counts": unique_counts,
+        "source_ids": arrays["source_ids"][rows],
+        "popular": arrays["popular"][rows],
+    }
+
+
+def _take_ragged(flat: Any, starts: Any, counts: Any, rows: Any) -> tuple:
+    """Concatenate the flat[starts[row]:starts[row] + counts[row]] slices of the given rows."""
+    row_counts = counts[rows]
+    out_starts = np.cumsum(row_counts) - row_counts
+    positions = np.arange(int(row_counts.sum())) + np.repeat(starts[rows] - out_starts, row_counts)
+    return flat[positions], row_counts
+
+
+def _score_numpy(
+    arrays: Dict[str, Any],
+    interest_weights: List[Optional[float]],
+    has_interest: bool,
+    tag_hits: List[int],
+    saved_count: int,
+    recent_mask: List[bool],
+    user_vector: Optional[List[float]],
+    w: tuple,
+    engagement: Tuple[List[int], List[float]],
+    rows: Any = None,
+) -> Dict[str, Any]:
+    """
+    Components for every row of arrays. engagement holds (pool positions,
+    popularity) overrides; rows maps rows to pool positions.
+    """
+    size = arrays["size"]
+    has_tags = arrays["tag_counts"] > 0
+
+    if has_interest:
+        weight_vec = np.array([value if value is not None else 0.0 for value in interest_weights], dtype=np.float64)
+        match_vec = np.array([value is not None for value in interest_weights], dtype=np.float64)
+        matched_sum = np.bincount(arrays["tag_rows"], weights=weight_vec[arrays["tag_flat"]], minlength=size)
+        matched_cnt = np.bincount(arrays["tag_rows"], weights=match_vec[arrays["tag_flat"]], minlength=size)
+        average = np.divide(matched_sum, matched_cnt, out=np.zeros(size), where=matched_cnt > 0)
+        interest = np.where(matched_cnt > 0, np.minimum(1.0, average / 5.0), 0.1)
+        interest = np.where(has_tags, interest, 0.0)
+    else:
+        interest = np.where(has_tags, 0.2, 0.0)
+
+    has_unique = arrays["unique_counts"] > 0
+    if saved_count > 0:
+        hits_vec = np.array(tag_hits, dtype=np.float64)
+        matched = np.bincount(arrays["unique_rows"], weights=hits_vec[arrays["unique_flat"]], minlength=size)
+        denominator = arrays["unique_counts"].astype(np.float64) * float(saved_count)
+        knowledge = np.divide(matched, denominator, out=np.zeros(size), where=has_unique)
+        knowledge = np.minimum(1.0, knowledge)
+    else:
+        knowledge = np.where(has_unique, 0.2, 0.0)
+
+    source_ids = arrays["source_ids"]
+    recent = np.array(recent_mask + [False], dtype=bool)[source_ids]  # -1 lands on the padding slot
+    diversity = np.where(source_ids < 0, 0.5, np.where(recent, 0.1, 1.0))
+
+    popularity = np.where(arrays["popular"], 1.0, 0.6)
+    if engagement[0]:
+        positions = np.asarray(engagement[0], dtype=np.int64)
+        popularity[positions if rows is None else np.searchsorted(rows, positions)] = np.asarray(
+            engagement[1], dtype=np.float64
+        )
+
+    vectors = arrays["vectors"]
+    if user_vector is not None and vectors.shape[1] == len(user_vector):
+        similarity = np.clip(vectors @ np.asarray(user_vector, dtype=np.float64), 0.0, 1.0)
+        similarity = np.where(arrays["has_vector"], similarity, 0.0)
+    else:
+        similarity = np.zeros(size)
+
+    total = np.round(
+        interest * w[0] + knowledge * w[1] + diversity * w[2] + popularity * w[3] + similarity * w[4],
+        6,
+    )
+    return {
+        "interest": interest,
+        "knowledge": knowledge,
+        "diversity": diversity,
+        "popularity": popularity,
+        "similarity": similarity,
+        "total": total,
+    }
+
+
+def _top_k_numpy(total: Any, k: int, excluded: set) -> List[int]:
+    scores = total.copy()
+    if excluded:
+        scores[np.fromiter(excluded, dtype=np.int64)] = -np.inf
+    live = int(np.count_nonzero(scores > -np.inf))
+    k = min(k, live)
+    if k == 0:
+        return []
+    kth = np.argpartition(-scores, k - 1)[k - 1]
+    # Everything scoring at least the k-th value; ties then resolve by pool index.
+    pool = np.flatnonzero(scores >= scores[kth])
+    order = pool[np.lexsort((pool, -scores[pool]))]
+    return [int(index) for index in order[:k]]
+
+
+def _popularity_overrides(
+    columns: Dict[str, Any], indices: Sequence[int], popularity_many: BulkPopularity
+) -> Tuple[List[int], List[float]]:
+    """Pool positions the counters know, and their engagement popularity (one bulk lookup)."""
+    source_names = columns["source_names"]
+    source_ids = columns["source_ids"]
+    item_keys = columns["item_keys"]
+    values = popularity_many(
+        [item_keys[index] for index in indices],
+        [source_names[source_ids[index]] if source_ids[index] >= 0 else "" for index in indices],
+    )
+    positions: List[int] = []
+    overrides: List[float] = []
+    for index, value in zip(indices, values):
+        if value is not None:
+            positions.append(index)
+            overrides.append(min(1.0, max(0.0, float(value))))
+    return positions, overrides
+
+
+def _decorate(item: Dict[str, Any], index: int, components: Dict[str, Any]) -> Dict[str, Any]:
+    decorated = dict(item)
+    score = float(components["total"][index])
+    decorated["score"] = score
+    decorated["score_breakdown"] = {
+        "interest": round(float(components["interest"][index]), 6),
+        "knowledge": round(float(components["knowledge"][index]), 6),
+        "diversity": round(float(components["diversity"][index]), 6),
+        "popularity": round(float(components["popularity"][index]), 6),
+        "similarity": round(float(components["similarity"][index]), 6),
+        "total": score,
+    }
+    return decorated
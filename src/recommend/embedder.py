@@ -1,9 +1,177 @@
+"""
+CPU-only hashed TF-IDF text embeddings.
 
+Features are lowercase word tokens plus character trigrams of each token, hashed
+(crc32, signed) into a fixed number of buckets. Term frequencies are
+log-scaled and weighted by IDF computed over the pool at ingest, and each
+vector is L2-normalized so a dot product is a cosine similarity.
 
-from typing import List
+Pool vectors are stored next to the content pool in a compact binary sidecar:
+    magic "BVEC" | version u16 | dim u16 | count u32 | fingerprint 8 bytes
+    followed by count * dim little-endian float32 values, one row per article.
+The fingerprint ties the rows to the pool's article order.
+"""
 
+import hashlib
+import math
+import operator
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 
-def embed_text(text: str) -> List[float]:
-    """Generate a toy embedding based on text length for M1."""
-    size = max(1, min(len(text), 32))
-    return [float(size)]
+EMBEDDING_DIM = 128
+VECTOR_FILE_MAGIC = b"BVEC"
+VECTOR_FILE_VERSION = 1
+USER_VECTOR_DECAY = 0.9
+
+_HEADER = struct.Struct("<4sHHI8s")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def text_features(text: str) -> Counter:
+    """Word tokens and their character trigrams (with word-boundary markers)."""
+    features: Counter = Counter()
+    for word in _WORD_RE.findall(str(text or "").lower()):
+        features["w:" + word] += 1
+        padded = "<{0}>".format(word)
+        for start in range(max(1, len(padded) - 2)):
+            features["c:" + padded[start : start + 3]] += 1
+    return features
+
+
+def build_idf(feature_sets: Sequence[Counter]) -> Dict[str, float]:
+    """Smoothed IDF per feature over a corpus of feature counters."""
+    doc_freq: Counter = Counter()
+    for features in feature_sets:
+        doc_freq.update(features.keys())
+    total = len(feature_sets)
+    return {feature: math.log((1.0 + total) / (1.0 + count)) + 1.0 for feature, count in doc_freq.items()}
+
+
+def embed_features(features: Counter, idf: Optional[Dict[str, float]] = None, dim: int = EMBEDDING_DIM) -> array:
+    vector = array("f", [0.0]) * dim
+    for feature, count in features.items():
+        weight = (1.0 + math.log(count)) * (idf.get(feature, 1.0) if idf else 1.0)
+        digest = zlib.crc32(feature.encode("utf-8"))
+        bucket = digest % dim
+        vector[bucket] += weight if (digest >> 31) & 1 else -weight
+    return normalize_vector(vector)
+
+
+def embed_text(text: str, idf: Optional[Dict[str, float]] = None, dim: int = EMBEDDING_DIM) -> array:
+    """Embed one text into an L2-normalized float32 vector."""
+    return embed_features(text_features(text), idf=idf, dim=dim)
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    tags = article.get("tags", [])
+    if not isinstance(tags, list):
+        tags = []
+    return " ".join(
+        [str(article.get("title", "") or ""), str(article.get("summary", "") or "")] + [str(tag) for tag in tags]
+    )
+
+
+def embed_articles(articles: Sequence[Dict[str, Any]], dim: int = EMBEDDING_DIM) -> List[array]:
+    """Embed a pool at ingest: IDF is fitted on the same articles."""
+    feature_sets = [text_features(article_text(article)) for article in articles]
+    idf = build_idf(feature_sets)
+    return [embed_features(features, idf=idf, dim=dim) for features in feature_sets]
+
+
+def pool_fingerprint(articles: Iterable[Dict[str, Any]]) -> bytes:
+    digest = hashlib.sha1()
+    for article in articles:
+        key = article.get("url") or article.get("link") or article.get("id") or article.get("title", "")
+        digest.update(str(key).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.digest()[:8]
+
+
+def write_pool_vectors(path: Union[str, Path], articles: Sequence[Dict[str, Any]], dim: int = EMBEDDING_DIM) -> int:
+    """
+    Embed dict articles (in pool order) and write the sidecar atomically.
+    """
+    rows = [article for article in articles if isinstance(article, dict)]
+    vectors = embed_articles(rows, dim=dim)
+    payload = array("f")
+    for vector in vectors:
+        payload.extend(vector)
+    if sys.byteorder != "little":
+        payload.byteswap()
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(_HEADER.pack(VECTOR_FILE_MAGIC, VECTOR_FILE_VERSION, dim, len(vectors), pool_fingerprint(rows)))
+        f.write(payload.tobytes())
+    os.replace(str(tmp_path), str(target))
+    return len(vectors)
+
+
+def read_pool_vectors(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Return {"dim", "fingerprint", "rows"} or None if the sidecar is missing/corrupt.
+    """
+    try:
+        with Path(path).open("rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, dim, count, fingerprint = _HEADER.unpack(header)
+            if magic != VECTOR_FILE_MAGIC or version != VECTOR_FILE_VERSION or dim <= 0:
+                return None
+            values = array("f")
+            values.frombytes(f.read(count * dim * values.itemsize))
+    except (OSError, ValueError):
+        return None
+    if len(values) != count * dim:
+        return None
+    if sys.byteorder != "little":
+        values.byteswap()
+    rows = [values[index * dim : (index + 1) * dim] for index in range(count)]
+    return {"dim": dim, "fingerprint": fingerprint, "rows": rows}
+
+
+def normalize_vector(vector: array) -> array:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm > 0:
+        for index in range(len(vector)):
+            vector[index] /= norm
+    return vector
+
+
+def dot(left: Sequence[float], right: Sequence[float]) -> float:
+    return sum(map(operator.mul, left, right))
+
+
+def user_vector_values(profile: Dict[str, Any], dim: int = EMBEDDING_DIM) -> Optional[List[float]]:
+    raw = profile.get("user_vector", {})
+    values = raw.get("values") if isinstance(raw, dict) else None
+    if not isinstance(values, list) or len(values) != dim:
+        return None
+    return values
+
+
+def update_user_vector(profile: Dict[str, Any], item_vector: Sequence[float], weight: float) -> Dict[str, Any]:
+    """
+    Running user vector: decay the previous direction, add the item, renormalize.
+    """
+    dim = len(item_vector)
+    current = user_vector_values(profile, dim=dim) or [0.0] * dim
+    blended = array("f", [USER_VECTOR_DECAY * old + float(weight) * new for old, new in zip(current, item_vector)])
+    normalize_vector(blended)
+    previous = profile.get("user_vector", {}) if isinstance(profile.get("user_vector", {}), dict) else {}
+    profile["user_vector"] = {
+        "dim": dim,
+        "updates": int(previous.get("updates", 0) or 0) + 1,
+        "values": [round(value, 6) for value in blended],
+    }
+    return profile
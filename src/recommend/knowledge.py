@@ -0,0 +1,104 @@
+"""
+Saved-items token index for the knowledge score.
+
+The index counts, per lowercase token, how many saved items mention it in their
+title or summary (document frequency). It is updated incrementally as items are
+saved or evicted, so scoring a candidate is one dict lookup per tag no matter
+how many saved items the window covers.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+KNOWLEDGE_INDEX_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[\w+#.-]+", re.UNICODE)
+
+
+def tokenize(text: str) -> Set[str]:
+    """Lowercase word tokens; punctuation-only edges are stripped (e.g. 'ai,' -> 'ai')."""
+    tokens = set()
+    for raw in _TOKEN_RE.findall(str(text or "").lower()):
+        token = raw.strip(".-")
+        if token:
+            tokens.add(token)
+    return tokens
+
+
+def saved_item_tokens(saved: Any) -> Set[str]:
+    if not isinstance(saved, dict):
+        return set()
+    return tokenize("{0} {1}".format(saved.get("title", ""), saved.get("summary", "")))
+
+
+def empty_knowledge_index() -> Dict[str, Any]:
+    return {"version": KNOWLEDGE_INDEX_VERSION, "doc_count": 0, "token_counts": {}}
+
+
+def build_knowledge_index(saved_items: Iterable[Any]) -> Dict[str, Any]:
+    index = empty_knowledge_index()
+    update_knowledge_index(index, added=saved_items)
+    return index
+
+
+def update_knowledge_index(
+    index: Dict[str, Any],
+    added: Iterable[Any] = (),
+    removed: Iterable[Any] = (),
+) -> Dict[str, Any]:
+    """
+    Apply saved items entering (added) and leaving (removed) the window in place.
+    """
+    counts = index.setdefault("token_counts", {})
+    doc_count = int(index.get("doc_count", 0) or 0)
+    for saved in removed:
+        doc_count -= 1
+        for token in saved_item_tokens(saved):
+            remaining = int(counts.get(token, 0)) - 1
+            if remaining > 0:
+                counts[token] = remaining
+            else:
+                counts.pop(token, None)
+    for saved in added:
+        doc_count += 1
+        for token in saved_item_tokens(saved):
+            counts[token] = int(counts.get(token, 0)) + 1
+    index["doc_count"] = max(0, doc_count)
+    index["version"] = KNOWLEDGE_INDEX_VERSION
+    return index
+
+
+def knowledge_index_for(profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Return the profile's index, rebuilding it when missing or out of step with
+    saved_items (legacy profiles, manual edits). None means nothing is saved.
+    """
+    saved_items = profile.get("saved_items", [])
+    if not isinstance(saved_items, list) or not saved_items:
+        return None
+    index = profile.get("knowledge_index")
+    if (
+        isinstance(index, dict)
+        and index.get("version") == KNOWLEDGE_INDEX_VERSION
+        and int(index.get("doc_count", -1) or 0) == len(saved_items)
+        and isinstance(index.get("token_counts"), dict)
+    ):
+        return index
+    return build_knowledge_index(saved_items)
+
+
+def knowledge_score(tags: Iterable[Any], index: Optional[Dict[str, Any]]) -> float:
+    """
+    Share of (tag, saved item) pairs where the saved item mentions the tag.
+    """
+    unique_tags: List[str] = list({str(tag) for tag in tags})
+    if not unique_tags:
+        return 0.0
+    if index is None:
+        return 0.2
+    doc_count = int(index.get("doc_count", 0) or 0)
+    if doc_count <= 0:
+        return 0.2
+    counts = index.get("token_counts", {})
+    matched = sum(int(counts.get(tag.lower(), 0)) for tag in unique_tags)
+    return min(1.0, float(matched) / float(len(unique_tags) * doc_count))
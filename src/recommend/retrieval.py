@@ -0,0 +1,170 @@
+"""
+Candidate generation ahead of ranking.
+
+build_retrieval_index() maps tag / category / source to article positions in the
+pool, each posting list ordered freshest first. It is built by pool_manager when
+the pool is written and stored next to it, so the read path only loads it once
+per pool version. retrieve_candidates() then pulls a few hundred unread articles
+matching the user's top interest tags, plus an exploration slice taken
+round-robin from the freshest articles of every source.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Union
+
+RETRIEVAL_INDEX_VERSION = 1
+RETRIEVAL_LIMIT = 300
+RETRIEVAL_TOP_TAGS = 5
+RETRIEVAL_EXPLORATION_RATIO = 0.2
+
+
+def index_tags(raw_tags: Any) -> List[str]:
+    """Same normalization the read path applies to pool tags."""
+    if not isinstance(raw_tags, list):
+        return []
+    tags: List[str] = []
+    for value in raw_tags:
+        if not isinstance(value, str):
+            continue
+        tag = value.strip().lstrip("#")
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def build_retrieval_index(articles: Sequence[Dict[str, Any]], fingerprint: str = "") -> Dict[str, Any]:
+    """
+    Build posting lists over dict articles (positions match the read-path candidates).
+    """
+    rows = [article for article in articles if isinstance(article, dict)]
+    # Freshest first; equal timestamps keep pool order (newest entries are ranked first per feed).
+    order = sorted(range(len(rows)), key=lambda index: (-_freshness(rows[index]), index))
+
+    by_tag: Dict[str, List[int]] = {}
+    by_category: Dict[str, List[int]] = {}
+    by_source: Dict[str, List[int]] = {}
+    for index in order:
+        article = rows[index]
+        for tag in index_tags(article.get("tags", [])):
+            by_tag.setdefault(tag, []).append(index)
+        category = str(article.get("category", "") or "")
+        if category:
+            by_category.setdefault(category, []).append(index)
+        source = str(article.get("source", "") or "")
+        if source:
+            by_source.setdefault(source, []).append(index)
+
+    return {
+        "version": RETRIEVAL_INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "size": len(rows),
+        "by_tag": by_tag,
+        "by_category": by_category,
+        "by_source": by_source,
+    }
+
+
+def write_retrieval_index(path: Union[str, Path], index: Dict[str, Any]) -> None:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(str(tmp_path), str(target))
+
+
+def read_retrieval_index(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    try:
+        with Path(path).open("r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != RETRIEVAL_INDEX_VERSION:
+        return None
+    return index
+
+
+def retrieve_candidates(
+    index: Dict[str, Any],
+    interest_tags: Dict[str, Any],
+    excluded: Optional[Iterable[int]] = None,
+    limit: int = RETRIEVAL_LIMIT,
+    top_tags: int = RETRIEVAL_TOP_TAGS,
+    exploration_ratio: float = RETRIEVAL_EXPLORATION_RATIO,
+) -> List[int]:
+    """
+    Return up to limit unread article positions (sorted, i.e. pool order).
+
+    The interest share is filled round-robin from the posting lists of the user's
+    strongest positive tags (tags or categories), the rest from per-source
+    freshness lists so new sources and topics still get a chance.
+    """
+    limit = max(1, int(limit))
+    excluded_set: Set[int] = set(excluded or ())
+    chosen: Set[int] = set()
+
+    ranked_tags = sorted(
+        ((float(weight), str(tag)) for tag, weight in (interest_tags or {}).items() if _positive(weight)),
+        reverse=True,
+    )[: max(0, int(top_tags))]
+    interest_lists = []
+    for _, tag in ranked_tags:
+        postings = index["by_tag"].get(tag) or index["by_category"].get(tag)
+        if postings:
+            interest_lists.append(postings)
+
+    interest_quota = limit - int(round(limit * max(0.0, min(1.0, exploration_ratio))))
+    if not interest_lists:
+        interest_quota = 0
+    _round_robin(interest_lists, interest_quota, chosen, excluded_set)
+    # Exploration also absorbs any interest quota the tags could not fill.
+    _round_robin(list(index["by_source"].values()), limit - len(chosen), chosen, excluded_set)
+    return sorted(chosen)
+
+
+def _round_robin(lists: List[List[int]], quota: int, chosen: Set[int], excluded: Set[int]) -> None:
+    if quota <= 0 or not lists:
+        return
+    target = len(chosen) + quota
+    cursors = [0] * len(lists)
+    active = True
+    while active and len(chosen) < target:
+        active = False
+        for position, postings in enumerate(lists):
+            cursor = cursors[position]
+            while cursor < len(postings) and (postings[cursor] in chosen or postings[cursor] in excluded):
+                cursor += 1
+            if cursor < len(postings):
+                chosen.add(postings[cursor])
+                cursor += 1
+                active = True
+            cursors[position] = cursor
+            if len(chosen) >= target:
+                return
+
+
+def _positive(value: Any) -> bool:
+    try:
+        return float(value) > 0
+    except Exception:
+        return False
+
+
+def _freshness(article: Dict[str, Any]) -> float:
+    for key in ("published_at", "fetched_at", "created_at"):
+        text = str(article.get(key, "") or "").strip()
+        if not text:
+            continue
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return 0.0
@@ -1,4 +1,11 @@
-from typing import Any, Dict, List, Sequence, Tuple
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from recommend.embedder import dot, user_vector_values
+from recommend.knowledge import knowledge_index_for, knowledge_score
+
+# Engagement-based popularity of an item in [0, 1], or None to use the category heuristic.
+Popularity = Callable[[Dict[str, Any]], Optional[float]]
 
 
 def score_item(
@@ -6,28 +13,21 @@ def score_item(
     profile: Dict[str, Any],
     recent_sources: Sequence[str],
     weights: Dict[str, float],
+    popularity: Optional[Popularity] = None,
 ) -> Tuple[float, Dict[str, float]]:
     """
     Score one candidate item with weighted components.
     """
-    interest_score = _interest_component(item, profile)
-    knowledge_score = _knowledge_component(item, profile)
-    diversity_score = _diversity_component(item, recent_sources)
-    popularity_score = _popularity_component(item)
-
-    score = (
-        interest_score * float(weights.get("interest", 0.4))
-        + knowledge_score * float(weights.get("knowledge", 0.3))
-        + diversity_score * float(weights.get("diversity", 0.2))
-        + popularity_score * float(weights.get("popularity", 0.1))
-    )
-    score = round(score, 6)
+    components = _components(item, profile, recent_sources, popularity)
+    interest_score, knowledge_score, diversity_score, popularity_score, similarity_score = components
+    score = _total_score(components, _weight_values(weights))
 
     breakdown = {
         "interest": round(interest_score, 6),
         "knowledge": round(knowledge_score, 6),
         "diversity": round(diversity_score, 6),
         "popularity": round(popularity_score, 6),
+        "similarity": round(similarity_score, 6),
         "total": score,
     }
     return score, breakdown
@@ -38,13 +38,15 @@ def rank_items(
     profile: Dict[str, Any],
     recent_sources: Sequence[str],
     weights: Dict[str, float],
+    popularity: Optional[Popularity] = None,
 ) -> List[Dict[str, Any]]:
     """
     Return items sorted by recommendation score descending.
     """
+    profile = _resolve_profile(profile)
     ranked = []
     for item in items:
-        score, breakdown = score_item(item, profile, recent_sources, weights)
+        score, breakdown = score_item(item, profile, recent_sources, weights, popularity)
         decorated = dict(item)
         decorated["score"] = score
         decorated["score_breakdown"] = breakdown
@@ -54,6 +56,121 @@ def rank_items(
     return ranked
 
 
+def top_k_items(
+    items: Sequence[Dict[str, Any]],
+    profile: Dict[str, Any],
+    recent_sources: Sequence[str],
+    weights: Dict[str, float],
+    k: int,
+    upper_bound: Optional[Callable[[Dict[str, Any]], float]] = None,
+    bound_sorted: bool = False,
+    popularity: Optional[Popularity] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Return the same first k items as rank_items, without copying every candidate.
+
+    Candidates are scored as plain floats into a bounded min-heap; only the
+    winners are decorated with score and score_breakdown. With upper_bound, a
+    candidate whose bound cannot beat the current k-th score is not scored; if
+    items are ordered by non-increasing bound (bound_sorted), the scan stops there.
+    """
+    k = int(k)
+    if k <= 0:
+        return []
+    profile = _resolve_profile(profile)
+    weight_values = _weight_values(weights)
+
+    # Min-heap of (score, -index): the root is the current k-th best, and among
+    # equal scores the later item loses, matching rank_items' stable sort.
+    heap: List[Tuple[float, int]] = []
+    for index, item in enumerate(items):
+        if upper_bound is not None and len(heap) >= k and round(upper_bound(item), 6) <= heap[0][0]:
+            if bound_sorted:
+                break
+            continue
+        entry = (_total_score(_components(item, profile, recent_sources, popularity), weight_values), -index)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    winners = []
+    for _, negative_index in sorted(heap, reverse=True):
+        item = items[-negative_index]
+        score, breakdown = score_item(item, profile, recent_sources, weights, popularity)
+        decorated = dict(item)
+        decorated["score"] = score
+        decorated["score_breakdown"] = breakdown
+        winners.append(decorated)
+    return winners
+
+
+def score_upper_bound(
+    item: Dict[str, Any],
+    recent_sources: Sequence[str],
+    weights: Dict[str, float],
+    popularity: Optional[Popularity] = None,
+) -> float:
+    """
+    Cheap ceiling on score_item: diversity and popularity are exact, interest,
+    knowledge and similarity are taken at their maximum of 1.0.
+    """
+    interest_weight, knowledge_weight, diversity_weight, popularity_weight, similarity_weight = _weight_values(weights)
+    tags = item.get("tags", [])
+    tag_ceiling = 1.0 if isinstance(tags, list) and tags else 0.0
+    return (
+        tag_ceiling * interest_weight
+        + tag_ceiling * knowledge_weight
+        + _diversity_component(item, recent_sources) * diversity_weight
+        + _popularity_component(item, popularity) * popularity_weight
+        + (1.0 if item.get("embedding") is not None else 0.0) * similarity_weight
+    )
+
+
+def _resolve_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve the knowledge index and user vector once per ranking call."""
+    profile = dict(profile)
+    profile["knowledge_index"] = knowledge_index_for(profile)
+    profile["_user_vector"] = user_vector_values(profile)
+    return profile
+
+
+def _components(
+    item: Dict[str, Any],
+    profile: Dict[str, Any],
+    recent_sources: Sequence[str],
+    popularity: Optional[Popularity] = None,
+) -> Tuple[float, ...]:
+    return (
+        _interest_component(item, profile),
+        _knowledge_component(item, profile),
+        _diversity_component(item, recent_sources),
+        _popularity_component(item, popularity),
+        _similarity_component(item, profile),
+    )
+
+
+def _weight_values(weights: Dict[str, float]) -> Tuple[float, ...]:
+    return (
+        float(weights.get("interest", 0.4)),
+        float(weights.get("knowledge", 0.3)),
+        float(weights.get("diversity", 0.2)),
+        float(weights.get("popularity", 0.1)),
+        float(weights.get("similarity", 0.0)),
+    )
+
+
+def _total_score(components: Tuple[float, ...], weight_values: Tuple[float, ...]) -> float:
+    return round(
+        components[0] * weight_values[0]
+        + components[1] * weight_values[1]
+        + components[2] * weight_values[2]
+        + components[3] * weight_values[3]
+        + components[4] * weight_values[4],
+        6,
+    )
+
+
 def _interest_component(item: Dict[str, Any], profile: Dict[str, Any]) -> float:
     tags = item.get("tags", [])
     if not isinstance(tags, list) or not tags:
@@ -76,30 +193,11 @@ def _interest_component(item: Dict[str, Any], profile: Dict[str, Any]) -> float:
 
 def _knowledge_component(item: Dict[str, Any], profile: Dict[str, Any]) -> float:
     """
-    Placeholder knowledge relevance: overlap with saved item tags if available.
+    Knowledge relevance: how often saved items mention the candidate's tags,
+    looked up in the profile's saved-items token index.
     """
-    tags = set(item.get("tags", []) if isinstance(item.get("tags", []), list) else [])
-    if not tags:
-        return 0.0
-
-    saved_items = profile.get("saved_items", [])
-    if not isinstance(saved_items, list) or not saved_items:
-        return 0.2
-
-    matched = 0
-    total = 0
-    for saved in saved_items[-20:]:
-        saved_summary = saved.get("summary", "") if isinstance(saved, dict) else ""
-        saved_title = saved.get("title", "") if isinstance(saved, dict) else ""
-        corpus = "{0} {1}".format(saved_title, saved_summary).lower()
-        for tag in tags:
-            total += 1
-            if tag.lower() in corpus:
-                matched += 1
-
-    if total == 0:
-        return 0.0
-    return min(1.0, float(matched) / float(total))
+    tags = item.get("tags", []) if isinstance(item.get("tags", []), list) else []
+    return knowledge_score(tags, knowledge_index_for(profile))
 
 
 def _diversity_component(item: Dict[str, Any], recent_sources: Sequence[str]) -> float:
@@ -111,8 +209,30 @@ def _diversity_component(item: Dict[str, Any], recent_sources: Sequence[str]) ->
     return 1.0
 
 
-def _popularity_component(item: Dict[str, Any]) -> float:
+def _popularity_component(item: Dict[str, Any], popularity: Optional[Popularity] = None) -> float:
+    """
+    Engagement popularity when the counters know the item or its source,
+    otherwise the category heuristic.
+    """
+    if popularity is not None:
+        value = popularity(item)
+        if value is not None:
+            return min(1.0, max(0.0, float(value)))
     category = item.get("category", "")
     if category == "priority_hn_popular_2025":
         return 1.0
     return 0.6
+
+
+def _similarity_component(item: Dict[str, Any], profile: Dict[str, Any]) -> float:
+    """
+    Cosine similarity between the item embedding and the running user vector,
+    clipped at 0. Items or profiles without vectors score 0.
+    """
+    item_vector = item.get("embedding")
+    if item_vector is None:
+        return 0.0
+    user_vector = profile["_user_vector"] if "_user_vector" in profile else user_vector_values(profile)
+    if user_vector is None or len(user_vector) != len(item_vector):
+        return 0.0
+    return min(1.0, max(0.0, dot(user_vector, item_vector)))
@@ -0,0 +1,204 @@
+"""
+刷博客 Skill - 常驻服务模式
+
+启动后在 Unix socket 上监听命令，feeds / 内容池 / 热点画像常驻内存，
+每次点击只需一次 socket 往返，省去解释器启动与模块导入：
+    python3 src/server.py
+    python3 src/client.py /brush
+
+协议：每个连接一行 JSON 请求 {"command", "args", "user_id", "context"}，
+返回一行 JSON {"ok": true, "result": {...}} 或 {"ok": false, "error": "..."}。
+"""
+
+import argparse
+import errno
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import main as skill
+from client import DEFAULT_SOCKET_PATH, read_message, write_message
+
+_USER_LOCKS: Dict[str, threading.Lock] = {}
+_USER_LOCKS_GUARD = threading.Lock()
+
+
+def _user_lock(user_id: str) -> threading.Lock:
+    with _USER_LOCKS_GUARD:
+        lock = _USER_LOCKS.get(user_id)
+        if lock is None:
+            lock = threading.Lock()
+            _USER_LOCKS[user_id] = lock
+        return lock
+
+
+def dispatch(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one decoded request against the in-process skill and persist its writes.
+    """
+    reply, finish = dispatch_deferred(request)
+    finish()
+    return reply
+
+
+def dispatch_deferred(request: Dict[str, Any]) -> Tuple[Dict[str, Any], Callable[[], None]]:
+    """
+    Run one decoded request; writes are flushed by the returned callable.
+
+    The user's lock stays held until the callable runs, so the next command for
+    the same user always sees the flushed profile.
+    """
+    if request.get("op") == "ping":
+        return {"ok": True, "result": {"message": "pong"}}, lambda: None
+
+    command = str(request.get("command", "") or "/brush")
+    args = request.get("args", [])
+    if not isinstance(args, list):
+        args = []
+    user_id = str(request.get("user_id", "") or "cli-user")
+    context = request.get("context", {})
+    if not isinstance(context, dict):
+        context = {}
+
+    # 同一用户的命令串行执行，避免画像读改写交错；不同用户互不阻塞（如慢的 /brush read）。
+    lock = _user_lock(user_id)
+    lock.acquire()
+    try:
+        result, flush = skill.handle_command_deferred(command, [str(value) for value in args], user_id, context)
+    except BaseException:
+        lock.release()
+        raise
+
+    def _finish() -> None:
+        try:
+            flush()
+        finally:
+            lock.release()
+
+    return {"ok": True, "result": result}, _finish
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        finish: Callable[[], None] = lambda: None
+        try:
+            request = read_message(self.connection)
+            reply, finish = dispatch_deferred(request)
+        except Exception as exc:
+            reply = {"ok": False, "error": str(exc)}
+        try:
+            try:
+                write_message(self.connection, reply)
+            except OSError:
+                pass
+        finally:
+            # 回复先发出，再统一落盘本次命令的写入。
+            try:
+                finish()
+            except Exception as exc:
+                sys.stderr.write("brush server flush failed: {0}\n".format(exc))
+
+
+class SkillServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _warm_up() -> None:
+    """Load feeds and the content pool once so the first tap is already hot."""
+    try:
+        skill._load_feeds_cached()
+        skill._load_shared_content_pool()
+    except Exception:
+        return
+
+
+def _claim_socket_path(socket_path: str) -> bool:
+    """
+    Remove a socket file left behind by a dead server; False if a live server still answers on it.
+    """
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return True
+    if not stat.S_ISSOCK(mode):
+        # Not ours to delete; bind() reports the conflict.
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError as exc:
+        if exc.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+            raise
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        return True
+    finally:
+        probe.close()
+    return False
+
+
+def _remove_own_socket(socket_path: str, inode: int) -> None:
+    """Unlink the socket only if it is still the one this process bound."""
+    try:
+        current = os.stat(socket_path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISSOCK(current.st_mode) and current.st_ino == inode:
+        os.unlink(socket_path)
+
+
+def serve(socket_path: str = DEFAULT_SOCKET_PATH) -> int:
+    Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+    if not _claim_socket_path(socket_path):
+        sys.stderr.write("brush server already running on {0}\n".format(socket_path))
+        return 1
+    _warm_up()
+    # 行为事件改由后台线程批量写入，不占用命令的响应与落盘路径。
+    event_writer = skill._event_writer().start()
+
+    server = SkillServer(socket_path, _CommandHandler)
+    os.chmod(socket_path, 0o600)
+    socket_inode = os.stat(socket_path).st_ino
+
+    def _stop(signum: int, frame: Any) -> None:
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print("brush server listening on {0}".format(socket_path), flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        _remove_own_socket(socket_path, socket_inode)
+        event_writer.close()
+        stats = event_writer.stats()
+        if stats["dropped"] or stats["errors"]:
+            sys.stderr.write(
+                "brush server dropped {0} behavior events ({1} write errors)\n".format(stats["dropped"], stats["errors"])
+            )
+        cache_stats = skill._read_cache().stats()
+        if cache_stats["hits"] or cache_stats["misses"]:
+            sys.stderr.write(
+                "brush server deep-read cache: {0} hits, {1} misses\n".format(cache_stats["hits"], cache_stats["misses"])
+            )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Brush blog skill resident server")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="unix socket path")
+    args = parser.parse_args()
+    return serve(args.socket)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
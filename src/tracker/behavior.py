@@ -1,8 +1,35 @@
+import atexit
 import json
+import os
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, BinaryIO, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from tracker.engagement import EngagementCounters
+from tracker.event_segments import (
+    SegmentPolicy,
+    candidate_segments,
+    event_time,
+    lock_path,
+    maybe_rotate,
+    read_segment_lines,
+    seal_segments_async,
+)
+from tracker.filelock import file_lock
+
+READ_BLOCK_SIZE = 64 * 1024
+USER_INDEX_VERSION = 1
+USER_INDEX_BLOCK_SIZE = 64 * 1024
+EVENT_QUEUE_SIZE = 10000
+EVENT_BATCH_SIZE = 256
+EVENT_FLUSH_INTERVAL_SEC = 0.2
+
+_WRITERS: Dict[str, "BehaviorEventWriter"] = {}
+_WRITERS_LOCK = threading.Lock()
 
 
 @dataclass
@@ -13,6 +40,8 @@ class BehaviorEvent:
     item_title: str = ""
     source: str = ""
     tags: List[str] = field(default_factory=list)
+    category: str = ""
+    phase: str = ""
     metadata: Dict[str, Any] = field(default_factory=dict)
     created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -24,20 +53,23 @@ class BehaviorEvent:
             "item_title": self.item_title,
             "source": self.source,
             "tags": self.tags,
+            "category": self.category,
+            "phase": self.phase,
             "metadata": self.metadata,
             "created_at": self.created_at,
         }
 
 
-def log_behavior_event(
-    events_path: Union[str, Path],
+def build_behavior_event(
     user_id: str,
     action: str,
     item: Optional[Dict[str, Any]] = None,
     metadata: Optional[Dict[str, Any]] = None,
+    phase: str = "",
 ) -> BehaviorEvent:
     """
-    Append one behavior event into jsonl file.
+    Build one behavior event from a card item without writing it.
+    phase is the user's learning phase when the event happened.
     """
     item = item or {}
     metadata = metadata or {}
@@ -46,49 +78,494 @@ def log_behavior_event(
     if not isinstance(tags, list):
         tags = []
 
-    event = BehaviorEvent(
+    return BehaviorEvent(
         user_id=user_id,
         action=action,
         item_id=str(item_id),
         item_title=str(item.get("title", "")),
         source=str(item.get("source", "")),
         tags=[str(tag) for tag in tags],
+        category=str(item.get("category", "") or ""),
+        phase=str(phase or ""),
         metadata=metadata,
     )
-    _append_event(events_path, event)
+
+
+def log_behavior_event(
+    events_path: Union[str, Path],
+    user_id: str,
+    action: str,
+    item: Optional[Dict[str, Any]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    counters: Optional[EngagementCounters] = None,
+) -> BehaviorEvent:
+    """
+    Append one behavior event into jsonl file.
+    """
+    event = build_behavior_event(user_id, action, item=item, metadata=metadata)
+    log_behavior_events(events_path, [event], counters=counters)
     return event
 
 
+def log_behavior_events(
+    events_path: Union[str, Path],
+    events: Sequence[BehaviorEvent],
+    segment_policy: Optional[SegmentPolicy] = None,
+    counters: Optional[EngagementCounters] = None,
+) -> int:
+    """
+    Append a batch of events with a single O_APPEND write; returns the number written.
+
+    The append holds a shared lock so rotation never renames the file mid-write;
+    afterwards the active file is rotated into a segment if the policy says so
+    (compressed on a background sealer thread, not here), and the written events
+    are folded into the engagement counters, if given.
+    """
+    if not events:
+        return 0
+    payload = "".join(json.dumps(event.to_dict(), ensure_ascii=False) + "\n" for event in events)
+    path = Path(events_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(lock_path(path), exclusive=False):
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload.encode("utf-8"))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    policy = segment_policy or SegmentPolicy()
+    if maybe_rotate(path, size, policy) is not None:
+        seal_segments_async(path, policy)
+    if counters is not None:
+        try:
+            counters.record(events)
+        except Exception:
+            # Counters are derived data; the log line is already written.
+            pass
+    return len(events)
+
+
+class BehaviorEventWriter:
+    """
+    Buffered appender for the events file.
+
+    Once start() has been called, submit() only enqueues. A background thread
+    writes the queue as one O_APPEND write whenever EVENT_BATCH_SIZE events are
+    waiting or EVENT_FLUSH_INTERVAL_SEC has passed. The queue is bounded: events
+    that do not fit are dropped and counted. Before start() and after close(),
+    submit() writes synchronously instead. close() is registered with atexit so
+    buffered events are written on normal interpreter shutdown.
+    """
+
+    def __init__(
+        self,
+        events_path: Union[str, Path],
+        max_queue: int = EVENT_QUEUE_SIZE,
+        batch_size: int = EVENT_BATCH_SIZE,
+        flush_interval: float = EVENT_FLUSH_INTERVAL_SEC,
+        segment_policy: Optional[SegmentPolicy] = None,
+        counters: Optional[EngagementCounters] = None,
+    ) -> None:
+        self.events_path = Path(events_path)
+        self.segment_policy = segment_policy or SegmentPolicy()
+        self.counters = counters
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._pending: Deque[BehaviorEvent] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._in_flight = 0
+        self._flush_waiters = 0
+        self._atexit_registered = False
+        self._counters = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0, "sync_writes": 0}
+
+    def start(self) -> "BehaviorEventWriter":
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="behavior-event-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return self
+
+    def submit(self, events: Iterable[BehaviorEvent]) -> int:
+        """
+        Queue events (or write them now if the flusher is not running); returns how many were accepted.
+        """
+        events = list(events)
+        if not events:
+            return 0
+        with self._cond:
+            self._counters["submitted"] += len(events)
+            if self._running():
+                was_empty = not self._pending
+                accepted = events[: max(0, self.max_queue - len(self._pending))]
+                self._counters["dropped"] += len(events) - len(accepted)
+                self._pending.extend(accepted)
+                # Wake the flusher to start the interval, or to write a full batch now.
+                if was_empty or len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+                return len(accepted)
+            self._counters["sync_writes"] += 1
+        return self._write(events)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything submitted so far is written; False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while (self._pending or self._in_flight) and self._running():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        # Flusher gone (never started or closed): write leftovers here.
+        self._drain()
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the flusher and write whatever is still queued."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._drain()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["backlog"] = len(self._pending) + self._in_flight
+            stats["running"] = self._running()
+        return stats
+
+    def _running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._closing
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Let the batch fill up unless it is already full, a flush is waiting, or we are closing.
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.batch_size and not self._closing and not self._flush_waiters:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = list(self._pending)
+                self._pending.clear()
+                self._in_flight = len(batch)
+            self._write(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _drain(self) -> None:
+        with self._cond:
+            if self._running():
+                return
+            batch = list(self._pending)
+            self._pending.clear()
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[BehaviorEvent]) -> int:
+        try:
+            written = log_behavior_events(
+                self.events_path, batch, segment_policy=self.segment_policy, counters=self.counters
+            )
+        except Exception:
+            # Behavior logging must never take the caller down; the loss shows up in the counters.
+            with self._cond:
+                self._counters["errors"] += 1
+                self._counters["dropped"] += len(batch)
+            return 0
+        with self._cond:
+            self._counters["written"] += written
+            self._counters["batches"] += 1
+        return written
+
+
+def get_behavior_event_writer(
+    events_path: Union[str, Path],
+    segment_policy: Optional[SegmentPolicy] = None,
+    counters: Optional[EngagementCounters] = None,
+) -> BehaviorEventWriter:
+    """
+    Return the process-wide writer for events_path (not started; call start() to buffer).
+    segment_policy and counters apply when the writer is first created.
+    """
+    key = "{0}:{1}".format(os.getpid(), os.path.abspath(str(events_path)))
+    writer = _WRITERS.get(key)
+    if writer is not None:
+        return writer
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = BehaviorEventWriter(events_path, segment_policy=segment_policy, counters=counters)
+            _WRITERS[key] = writer
+    return writer
+
+
 def read_recent_events(
-    events_path: Union[str, Path], user_id: Optional[str] = None, limit: int = 50
+    events_path: Union[str, Path],
+    user_id: Optional[str] = None,
+    limit: int = 50,
+    use_index: bool = False,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Read recent events from jsonl file.
+    Read the last `limit` events (oldest first), newest data first.
+
+    The active file is scanned backwards and decoding stops once `limit` matching
+    rows are found. With use_index and a user_id, the per-user block index
+    sidecar is brought up to date and only blocks known to contain that user's
+    events are visited. If the active file runs short, rotated segments are read
+    newest first, skipping any whose manifest rules out the user or the
+    since/until window (epoch seconds, inclusive; events without a parsable
+    created_at always match).
     """
     path = Path(events_path)
-    if not path.exists():
-        return []
+    limit = max(1, int(limit))
+    needle = _user_needle(user_id)
+    rows: List[Dict[str, Any]] = []
+    if path.exists():
+        index = update_user_block_index(path) if user_id and use_index else None
+        if index is not None:
+            rows = _read_indexed_events(path, index, user_id or "", limit, since, until)
+        else:
+            rows = _read_active_events(path, user_id, limit, since, until)
 
-    rows = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                row = json.loads(line)
-            except Exception:
+    if len(rows) < limit:
+        for entry in candidate_segments(path, user_id=user_id, since=since, until=until):
+            matched: Deque[Dict[str, Any]] = deque(maxlen=limit - len(rows))
+            for line in read_segment_lines(path, entry):
+                row = _decode_event(line, user_id, needle)
+                if row is not None and _window_position(row, since, until) == 0:
+                    matched.append(row)
+            rows.extend(reversed(matched))
+            if len(rows) >= limit:
+                break
+
+    rows = rows[:limit]
+    rows.reverse()
+    return rows
+
+
+def _read_active_events(
+    path: Path, user_id: Optional[str], limit: int, since: Optional[float], until: Optional[float]
+) -> List[Dict[str, Any]]:
+    """Matching rows of the active file, newest first."""
+    needle = _user_needle(user_id)
+    rows: List[Dict[str, Any]] = []
+    with path.open("rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        for line in _reverse_lines(f, end):
+            row = _decode_event(line, user_id, needle)
+            if row is None:
                 continue
-            if user_id and row.get("user_id") != user_id:
+            position = _window_position(row, since, until)
+            if position < 0:
+                # The log is append-ordered, so everything further back is older still.
+                break
+            if position > 0:
                 continue
             rows.append(row)
-
-    rows = rows[-max(1, int(limit)) :]
+            if len(rows) >= limit:
+                break
     return rows
 
 
-def _append_event(events_path: Union[str, Path], event: BehaviorEvent) -> None:
+def user_block_index_path(events_path: Union[str, Path]) -> Path:
     path = Path(events_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+    return path.with_name(path.name + ".users.idx")
+
+
+def update_user_block_index(events_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Bring the sparse per-user block index up to date and return it.
+
+    The index maps user_id -> ascending block numbers (offset // block size) in
+    which that user's events start. Only bytes appended since the last update
+    are scanned; a truncated or replaced file triggers a rebuild. Returns None if
+    the events file cannot be read.
+    """
+    path = Path(events_path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    index_path = user_block_index_path(path)
+    index = _load_user_block_index(index_path)
+    if index is None or index["inode"] != stat.st_ino or index["indexed_size"] > stat.st_size:
+        index = {
+            "version": USER_INDEX_VERSION,
+            "block_size": USER_INDEX_BLOCK_SIZE,
+            "inode": stat.st_ino,
+            "indexed_size": 0,
+            "users": {},
+        }
+    if index["indexed_size"] >= stat.st_size:
+        return index
+
+    block_size = index["block_size"]
+    users = index["users"]
+    offset = index["indexed_size"]
+    with path.open("rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Partial line still being written; index it next time.
+                break
+            row = _decode_event(line, None, None)
+            if row is not None and row.get("user_id"):
+                blocks = users.setdefault(str(row["user_id"]), [])
+                block = offset // block_size
+                if not blocks or blocks[-1] != block:
+                    blocks.append(block)
+            offset += len(line)
+    index["indexed_size"] = offset
+
+    tmp_path = index_path.with_name("{0}.{1}.tmp".format(index_path.name, os.getpid()))
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(str(tmp_path), str(index_path))
+    except OSError:
+        # The index is only an accelerator; an unwritable sidecar just means rescanning next time.
+        pass
+    return index
+
+
+def _read_indexed_events(
+    path: Path,
+    index: Dict[str, Any],
+    user_id: str,
+    limit: int,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Matching rows of the active file via the user block index, newest first."""
+    block_size = index["block_size"]
+    needle = _user_needle(user_id)
+    rows: List[Dict[str, Any]] = []
+    with path.open("rb") as f:
+        for block in reversed(index["users"].get(user_id, [])):
+            block_rows = []
+            reached_since = False
+            for line in _block_lines(f, block * block_size, block_size, index["indexed_size"]):
+                row = _decode_event(line, user_id, needle)
+                if row is None:
+                    continue
+                position = _window_position(row, since, until)
+                reached_since = reached_since or position < 0
+                if position == 0:
+                    block_rows.append(row)
+            rows.extend(reversed(block_rows))
+            if len(rows) >= limit or reached_since:
+                break
+    return rows[:limit]
+
+
+def _block_lines(f: BinaryIO, start: int, block_size: int, end: int) -> Iterator[bytes]:
+    """Complete lines that start within [start, start + block_size), up to end."""
+    if start > 0:
+        f.seek(start - 1)
+        if f.read(1) != b"\n":
+            # Mid-line: the line belongs to the previous block.
+            f.readline()
+    else:
+        f.seek(0)
+    while f.tell() < min(start + block_size, end):
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return
+        yield line
+
+
+def _reverse_lines(f: BinaryIO, end: int, block_size: int = READ_BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield the lines of f[0:end] last first, reading fixed-size blocks backwards."""
+    position = end
+    tail = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        lines = (f.read(read_size) + tail).split(b"\n")
+        tail = lines[0]
+        for line in reversed(lines[1:]):
+            yield line
+    yield tail
+
+
+def _window_position(row: Dict[str, Any], since: Optional[float], until: Optional[float]) -> int:
+    """-1 if the event is older than since, 1 if newer than until, else 0."""
+    if since is None and until is None:
+        return 0
+    stamp = event_time(row)
+    if stamp is None:
+        return 0
+    if since is not None and stamp < since:
+        return -1
+    if until is not None and stamp > until:
+        return 1
+    return 0
+
+
+def _user_needle(user_id: Optional[str]) -> Optional[bytes]:
+    if not user_id:
+        return None
+    return json.dumps(str(user_id), ensure_ascii=False).encode("utf-8")
+
+
+def _decode_event(line: bytes, user_id: Optional[str], needle: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    # Cheap substring check before decoding lines that cannot match.
+    if needle is not None and needle not in line:
+        return None
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        row = json.loads(line.decode("utf-8"))
+    except Exception:
+        return None
+    if not isinstance(row, dict):
+        return None
+    if user_id and row.get("user_id") != user_id:
+        return None
+    return row
+
+
+def _load_user_block_index(index_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with index_path.open("r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(index, dict)
+        or index.get("version") != USER_INDEX_VERSION
+        or index.get("block_size") != USER_INDEX_BLOCK_SIZE
+        or not isinstance(index.get("users"), dict)
+        or not isinstance(index.get("indexed_size"), int)
+    ):
+        return None
+    return index
@@ -0,0 +1,292 @@
+"""
+Materialized engagement counters.
+
+Every logged view / like / save / skip updates three rows in an SQLite table:
+the article, its source and a global total. Each row keeps exponentially
+time-decayed counts (half-life ENGAGEMENT_HALF_LIFE_DAYS) plus the time they
+were last decayed to, so an update is "decay to now, then add": constant work
+per event, no log scans.
+
+Readers keep the table in memory and pick up rows changed by other processes
+through a monotonically increasing seq column, at most every
+ENGAGEMENT_REFRESH_SEC. popularity() is then a few dict lookups: the article's
+net positive rate, smoothed towards its source's rate (itself smoothed towards
+the global rate), expressed as a lift over the global rate and squashed into
+[0, 1] so that an average article scores POPULARITY_BASELINE.
+popularity_many() does the same for a whole candidate list with one refresh
+check and each source's rate computed once.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from tracker.event_segments import event_time
+
+ENGAGEMENT_SCHEMA_VERSION = 1
+ENGAGEMENT_HALF_LIFE_DAYS = 7.0
+ENGAGEMENT_REFRESH_SEC = 2.0
+# Pseudo-views of the parent rate mixed into every smoothed rate.
+PRIOR_VIEWS = 20.0
+# A skip cancels this many positives.
+SKIP_WEIGHT = 0.5
+# Score of an article whose engagement equals the global average (the old non-popular heuristic).
+POPULARITY_BASELINE = 0.6
+
+VIEW_ACTIONS = ("view",)
+POSITIVE_ACTIONS = ("like", "save")
+SKIP_ACTIONS = ("skip",)
+
+KIND_GLOBAL = "global"
+KIND_SOURCE = "source"
+KIND_ITEM = "item"
+
+_MIGRATIONS: Dict[int, List[str]] = {
+    1: [
+        """
+        CREATE TABLE IF NOT EXISTS engagement (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            views REAL NOT NULL DEFAULT 0,
+            positives REAL NOT NULL DEFAULT 0,
+            skips REAL NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS engagement_seq ON engagement(seq)",
+        "CREATE TABLE IF NOT EXISTS engagement_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID",
+        "INSERT OR IGNORE INTO engagement_meta(name, value) VALUES ('seq', 0)",
+    ],
+}
+
+# (views, positives, skips, updated_at)
+Counter = Tuple[float, float, float, float]
+
+_STORES: Dict[str, "EngagementCounters"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class EngagementCounters:
+    """
+    One WAL connection per process plus an in-memory copy of the counters.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        half_life_days: float = ENGAGEMENT_HALF_LIFE_DAYS,
+        refresh_sec: float = ENGAGEMENT_REFRESH_SEC,
+    ) -> None:
+        self.db_path = str(db_path)
+        self.half_life_sec = max(1.0, float(half_life_days) * 86400.0)
+        self.refresh_sec = max(0.0, float(refresh_sec))
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._counters: Dict[Tuple[str, str], Counter] = {}
+        self._seq = 0
+        self._refreshed_at = 0.0
+        self._migrate()
+
+    def record(self, events: Iterable[Any], now: Optional[float] = None) -> int:
+        """
+        Fold events (BehaviorEvent or dict rows) into the counters; returns how many counted.
+        """
+        now = time.time() if now is None else now
+        deltas: Dict[Tuple[str, str], List[float]] = {}
+        counted = 0
+        for event in events:
+            row = event.to_dict() if hasattr(event, "to_dict") else event
+            if not isinstance(row, dict):
+                continue
+            slot = _action_slot(str(row.get("action", "") or ""))
+            if slot is None:
+                continue
+            stamp = event_time(row)
+            stamp = now if stamp is None else min(stamp, now)
+            # Everything is accumulated as of `now`; older events enter already decayed.
+            weight = self._decay(now - stamp)
+            keys = [(KIND_GLOBAL, "")]
+            source = str(row.get("source", "") or "")
+            if source:
+                keys.append((KIND_SOURCE, source))
+            item_id = str(row.get("item_id", "") or "")
+            if item_id:
+                keys.append((KIND_ITEM, item_id))
+            for key in keys:
+                deltas.setdefault(key, [0.0, 0.0, 0.0])[slot] += weight
+            counted += 1
+        if not deltas:
+            return 0
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("UPDATE engagement_meta SET value = value + 1 WHERE name = 'seq'")
+                seq = int(self._conn.execute("SELECT value FROM engagement_meta WHERE name = 'seq'").fetchone()[0])
+                rows = []
+                for (kind, key), (views, positives, skips) in deltas.items():
+                    stored = self._conn.execute(
+                        "SELECT views, positives, skips, updated_at FROM engagement WHERE kind = ? AND key = ?",
+                        (kind, key),
+                    ).fetchone()
+                    current = self._decayed(stored, now) if stored else (0.0, 0.0, 0.0)
+                    rows.append(
+                        (kind, key, current[0] + views, current[1] + positives, current[2] + skips, now, seq)
+                    )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO engagement(kind, key, views, positives, skips, updated_at, seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for kind, key, views, positives, skips, updated_at, _ in rows:
+                self._counters[(kind, key)] = (views, positives, skips, updated_at)
+            # Rows written by other processes in between are still picked up by the next refresh.
+        return counted
+
+    def counts(self, kind: str, key: str, now: Optional[float] = None) -> Dict[str, float]:
+        """Decayed views / positives / skips of one row, as of now."""
+        now = time.time() if now is None else now
+        self._maybe_refresh()
+        views, positives, skips = self._decayed(self._counters.get((kind, key)), now)
+        return {"views": views, "positives": positives, "skips": skips}
+
+    def popularity(self, item: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+        """
+        Engagement-based popularity in [0, 1], or None when nothing is known about
+        the article or its source (callers fall back to their own heuristic).
+        """
+        item_key = str(item.get("item_key", "") or "")
+        source = str(item.get("source", "") or "")
+        return self.popularity_many([item_key], [source], now=now)[0]
+
+    def popularity_many(
+        self, item_keys: Sequence[str], sources: Sequence[str], now: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """
+        popularity() of many articles at once, given as parallel item_key / source
+        lists; the counters are refreshed at most once for the whole batch.
+        """
+        now = time.time() if now is None else now
+        self._maybe_refresh()
+        counters = self._counters
+        overall = counters.get((KIND_GLOBAL, ""))
+        global_rate = _rate(overall, 0.0, 0.0) if overall is not None else 0.0
+        if global_rate <= 0:
+            return [None] * len(item_keys)
+        squash = (1.0 - POPULARITY_BASELINE) / POPULARITY_BASELINE
+        # Decay matters only for how much weight a row carries against its prior; the raw ratio is unchanged.
+        source_rates: Dict[str, Optional[float]] = {}
+        values: List[Optional[float]] = []
+        for item_key, source in zip(item_keys, sources):
+            if source in source_rates:
+                source_rate = source_rates[source]
+            else:
+                row = counters.get((KIND_SOURCE, source))
+                source_rate = _rate(self._decayed(row, now), global_rate, PRIOR_VIEWS) if row else None
+                source_rates[source] = source_rate
+            entry = counters.get((KIND_ITEM, item_key))
+            if entry is None:
+                if source_rate is None:
+                    values.append(None)
+                    continue
+                item_rate = source_rate
+            else:
+                prior_rate = global_rate if source_rate is None else source_rate
+                item_rate = _rate(self._decayed(entry, now), prior_rate, PRIOR_VIEWS)
+            lift = item_rate / global_rate
+            values.append(lift / (lift + squash))
+        return values
+
+    def refresh(self) -> int:
+        """Load rows changed since the last refresh; returns how many."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, key, views, positives, skips, updated_at, seq FROM engagement WHERE seq > ?",
+                (self._seq,),
+            ).fetchall()
+            for kind, key, views, positives, skips, updated_at, seq in rows:
+                self._counters[(kind, key)] = (float(views), float(positives), float(skips), float(updated_at))
+                self._seq = max(self._seq, int(seq))
+            self._refreshed_at = time.monotonic()
+        return len(rows)
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._refreshed_at >= self.refresh_sec:
+            self.refresh()
+
+    def _decay(self, age: float) -> float:
+        return math.pow(0.5, max(0.0, age) / self.half_life_sec)
+
+    def _decayed(self, stored: Optional[Sequence[float]], now: float) -> Tuple[float, float, float]:
+        if not stored:
+            return (0.0, 0.0, 0.0)
+        factor = self._decay(now - float(stored[3]))
+        return (float(stored[0]) * factor, float(stored[1]) * factor, float(stored[2]) * factor)
+
+    def _migrate(self) -> None:
+        with self._lock:
+            current = int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+            if current >= ENGAGEMENT_SCHEMA_VERSION:
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for version in sorted(_MIGRATIONS):
+                    if version > current:
+                        for statement in _MIGRATIONS[version]:
+                            self._conn.execute(statement)
+                self._conn.execute("PRAGMA user_version = {0}".format(int(ENGAGEMENT_SCHEMA_VERSION)))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+def get_engagement_counters(
+    db_path: Union[str, Path], half_life_days: float = ENGAGEMENT_HALF_LIFE_DAYS
+) -> EngagementCounters:
+    """
+    Return the process-wide counter store for db_path (half_life_days applies on first creation).
+    """
+    key = "{0}:{1}".format(os.getpid(), os.path.abspath(str(db_path)))
+    store = _STORES.get(key)
+    if store is not None:
+        return store
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = EngagementCounters(db_path, half_life_days=half_life_days)
+            _STORES[key] = store
+    return store
+
+
+def _action_slot(action: str) -> Optional[int]:
+    if action in VIEW_ACTIONS:
+        return 0
+    if action in POSITIVE_ACTIONS:
+        return 1
+    if action in SKIP_ACTIONS:
+        return 2
+    return None
+
+
+def _rate(counter: Sequence[float], prior_rate: float, prior_views: float) -> float:
+    views, positives, skips = counter[0], counter[1], counter[2]
+    net = max(0.0, positives - SKIP_WEIGHT * skips)
+    denominator = views + prior_views
+    if denominator <= 0:
+        return prior_rate
+    return (net + prior_views * prior_rate) / denominator
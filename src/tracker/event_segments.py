@@ -0,0 +1,414 @@
+"""
+Segmented behavior event log.
+
+The active file (data/behavior_events.jsonl) is still appended with O_APPEND,
+under a shared lock. Once it grows past SegmentPolicy.max_bytes, or its first
+event is older than max_age_sec, it is rotated under an exclusive lock:
+renamed into <name>.segments/ as the next numbered segment and recorded in
+<name>.manifest.json. The segment is then gzip-compressed outside the lock, and
+its manifest entry is sealed with the event count, time range and user ids.
+Sealed segments older than retention_days are deleted. Rotation triggered by a
+write only renames; compression runs on a background sealer thread
+(seal_segments_async) so it never delays the append that crossed the limit.
+
+Readers consult the manifest and only open segments whose metadata can match
+the requested user and time window; unsealed segments are always read.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from tracker.filelock import file_lock
+
+MANIFEST_VERSION = 1
+SEGMENT_MAX_BYTES = 32 * 1024 * 1024
+SEGMENT_MAX_AGE_SEC = 24 * 3600
+SEGMENT_RETENTION_DAYS = 90
+
+# Active file path -> (inode, first event time), so the age check does not reread the file on every write.
+_FIRST_EVENT_CACHE: Dict[str, Tuple[int, float]] = {}
+
+# Active file path -> running sealer thread, and paths rotated again while it ran.
+_SEALERS: Dict[str, threading.Thread] = {}
+_SEAL_AGAIN: Dict[str, bool] = {}
+_SEALERS_LOCK = threading.Lock()
+
+
+@dataclass
+class SegmentPolicy:
+    max_bytes: int = SEGMENT_MAX_BYTES
+    max_age_sec: float = SEGMENT_MAX_AGE_SEC
+    # 0 keeps every segment.
+    retention_days: float = SEGMENT_RETENTION_DAYS
+
+
+def lock_path(events_path: Union[str, Path]) -> Path:
+    path = Path(events_path)
+    return path.with_name(path.name + ".lock")
+
+
+def segments_dir(events_path: Union[str, Path]) -> Path:
+    path = Path(events_path)
+    return path.with_name(path.name + ".segments")
+
+
+def manifest_path(events_path: Union[str, Path]) -> Path:
+    path = Path(events_path)
+    return path.with_name(path.name + ".manifest.json")
+
+
+def event_time(row: Dict[str, Any]) -> Optional[float]:
+    """created_at of an event as epoch seconds, or None if missing/unparsable."""
+    text = str(row.get("created_at", "") or "").strip()
+    if not text:
+        return None
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def load_manifest(events_path: Union[str, Path]) -> Dict[str, Any]:
+    try:
+        with manifest_path(events_path).open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if (
+        not isinstance(manifest, dict)
+        or manifest.get("version") != MANIFEST_VERSION
+        or not isinstance(manifest.get("segments"), list)
+    ):
+        return {"version": MANIFEST_VERSION, "next_seq": 1, "segments": []}
+    return manifest
+
+
+def maybe_rotate(
+    events_path: Union[str, Path], size: int, policy: SegmentPolicy, now: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Rotate the active file if it is due; called by the writer after each append.
+
+    Only renames: the returned entry is still unsealed, and the caller hands
+    sealing to seal_segments_async().
+    """
+    if size <= 0:
+        return None
+    now = time.time() if now is None else now
+    if size < policy.max_bytes:
+        if policy.max_age_sec <= 0:
+            return None
+        first = _first_event_time(Path(events_path))
+        if first is None or now - first < policy.max_age_sec:
+            return None
+    return rotate(events_path, policy, now=now, seal=False)
+
+
+def rotate(
+    events_path: Union[str, Path],
+    policy: SegmentPolicy,
+    now: Optional[float] = None,
+    force: bool = False,
+    seal: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Move the active file into a new segment, then (if seal) seal it: compress + describe.
+
+    Returns the segment's manifest entry, or None if nothing was rotated (empty
+    file, not due unless force, or another process rotated first).
+    """
+    path = Path(events_path)
+    now = time.time() if now is None else now
+    with file_lock(lock_path(path), exclusive=True):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        size = stat.st_size
+        if size == 0:
+            return None
+        if not force:
+            first = _first_event_time(path, refresh=True)
+            aged = policy.max_age_sec > 0 and first is not None and now - first >= policy.max_age_sec
+            if size < policy.max_bytes and not aged:
+                return None
+
+        manifest = load_manifest(path)
+        seq = int(manifest.get("next_seq", 1) or 1)
+        manifest["next_seq"] = seq + 1
+        directory = segments_dir(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        raw_name = "{0:06d}.jsonl".format(seq)
+        head = file_head(path)
+        os.replace(str(path), str(directory / raw_name))
+        # Inode + head let incremental consumers (the warehouse) match a segment to the active file they tailed.
+        manifest["segments"].append(
+            {"seq": seq, "file": raw_name, "sealed": False, "inode": stat.st_ino, "head": head}
+        )
+        _write_manifest(path, manifest)
+        _FIRST_EVENT_CACHE.pop(os.path.abspath(str(path)), None)
+
+    if seal:
+        seal_segments(path, policy, now=now)
+    return _manifest_entry(path, seq)
+
+
+def seal_segments(events_path: Union[str, Path], policy: SegmentPolicy, now: Optional[float] = None) -> int:
+    """
+    Compress and describe every unsealed segment, then apply retention.
+
+    Compression runs without the lock so writers are only blocked for the rename.
+    Also finishes segments left unsealed by a process that died mid-rotation.
+    """
+    path = Path(events_path)
+    now = time.time() if now is None else now
+    directory = segments_dir(path)
+    sealed = 0
+    for entry in load_manifest(path)["segments"]:
+        if entry.get("sealed"):
+            continue
+        raw_path = directory / str(entry.get("file", ""))
+        if not raw_path.is_file():
+            continue
+        gz_name = "{0:06d}.jsonl.gz".format(int(entry["seq"]))
+        meta = _compress_segment(raw_path, directory / gz_name)
+        with file_lock(lock_path(path), exclusive=True):
+            manifest = load_manifest(path)
+            for current in manifest["segments"]:
+                if current.get("seq") == entry["seq"] and not current.get("sealed"):
+                    current.update(meta)
+                    current["file"] = gz_name
+                    current["sealed"] = True
+                    sealed += 1
+            _apply_retention(path, manifest, policy, now)
+            _write_manifest(path, manifest)
+        try:
+            raw_path.unlink()
+        except FileNotFoundError:
+            pass
+    return sealed
+
+
+def seal_segments_async(events_path: Union[str, Path], policy: SegmentPolicy) -> threading.Thread:
+    """
+    Run seal_segments on a background thread; at most one per events file.
+
+    A rotation that lands while the sealer runs makes it go round once more.
+    The thread is not a daemon, so a single-command process still finishes the
+    gzip after its reply is out; anything left unsealed (process killed) stays
+    readable and is sealed with the next rotation.
+    """
+    key = os.path.abspath(str(events_path))
+    with _SEALERS_LOCK:
+        thread = _SEALERS.get(key)
+        if thread is not None and thread.is_alive():
+            _SEAL_AGAIN[key] = True
+            return thread
+        thread = threading.Thread(
+            target=_run_sealer, args=(key, events_path, policy), name="event-segment-sealer"
+        )
+        _SEALERS[key] = thread
+        _SEAL_AGAIN[key] = False
+        thread.start()
+    return thread
+
+
+def _run_sealer(key: str, events_path: Union[str, Path], policy: SegmentPolicy) -> None:
+    while True:
+        try:
+            seal_segments(events_path, policy)
+        except Exception:
+            # Unsealed segments are still read as plain jsonl; the next rotation retries.
+            pass
+        with _SEALERS_LOCK:
+            if not _SEAL_AGAIN.get(key):
+                _SEALERS.pop(key, None)
+                return
+            _SEAL_AGAIN[key] = False
+
+
+def candidate_segments(
+    events_path: Union[str, Path],
+    user_id: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Manifest entries that may hold events of user_id within [since, until], newest first.
+    """
+    entries = []
+    for entry in reversed(load_manifest(events_path)["segments"]):
+        if entry.get("sealed"):
+            if user_id and user_id not in entry.get("users", ()):
+                continue
+            last_at = entry.get("last_at")
+            first_at = entry.get("first_at")
+            if since is not None and last_at is not None and last_at < since:
+                continue
+            if until is not None and first_at is not None and first_at > until:
+                continue
+        entries.append(entry)
+    return entries
+
+
+def read_segment_lines(events_path: Union[str, Path], entry: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Raw lines of one segment in write order.
+
+    entry may be stale: if the raw file was sealed (replaced by its .gz) after the
+    manifest was read, the current entry for the same seq is looked up and the
+    sealed file read instead. A segment dropped by retention yields nothing.
+    """
+    name = str(entry.get("file", ""))
+    while True:
+        segment_path = segments_dir(events_path) / name
+        opener = gzip.open if name.endswith(".gz") else open
+        try:
+            f = opener(str(segment_path), "rb")
+        except FileNotFoundError:
+            current = _manifest_entry(events_path, entry.get("seq"))
+            # The manifest names the sealed file before the raw one is unlinked.
+            if current is None or str(current.get("file", "")) == name:
+                return
+            name = str(current.get("file", ""))
+            continue
+        with f:
+            for line in f:
+                yield line
+        return
+
+
+def iter_event_lines(events_path: Union[str, Path]) -> Iterator[bytes]:
+    """
+    Every event line, oldest first: the segments in order, then the active file.
+    """
+    path = Path(events_path)
+    for entry in load_manifest(path)["segments"]:
+        for line in read_segment_lines(path, entry):
+            yield line
+    try:
+        with path.open("rb") as f:
+            for line in f:
+                yield line
+    except FileNotFoundError:
+        return
+
+
+def file_head(source: Union[str, Path, BinaryIO]) -> str:
+    """
+    Short hash of the first line. Together with the inode it identifies one
+    generation of the active file even if the inode number is later reused.
+    """
+    if isinstance(source, (str, Path)):
+        try:
+            with Path(source).open("rb") as f:
+                line = f.readline()
+        except OSError:
+            return ""
+    else:
+        position = source.tell()
+        source.seek(0)
+        line = source.readline()
+        source.seek(position)
+    if not line.endswith(b"\n"):
+        return ""
+    return hashlib.sha1(line).hexdigest()[:16]
+
+
+def _manifest_entry(events_path: Union[str, Path], seq: Any) -> Optional[Dict[str, Any]]:
+    for entry in load_manifest(events_path)["segments"]:
+        if entry.get("seq") == seq:
+            return entry
+    return None
+
+
+def _first_event_time(path: Path, refresh: bool = False) -> Optional[float]:
+    key = os.path.abspath(str(path))
+    try:
+        inode = path.stat().st_ino
+    except OSError:
+        return None
+    cached = _FIRST_EVENT_CACHE.get(key)
+    if cached is not None and cached[0] == inode and not refresh:
+        return cached[1]
+    try:
+        with path.open("rb") as f:
+            line = f.readline()
+        row = json.loads(line.decode("utf-8"))
+    except Exception:
+        return None
+    first = event_time(row) if isinstance(row, dict) else None
+    if first is not None:
+        _FIRST_EVENT_CACHE[key] = (inode, first)
+    return first
+
+
+def _compress_segment(raw_path: Path, target: Path) -> Dict[str, Any]:
+    users = set()
+    count = 0
+    first_at: Optional[float] = None
+    last_at: Optional[float] = None
+    tmp_path = target.with_name("{0}.{1}.tmp".format(target.name, os.getpid()))
+    with raw_path.open("rb") as source, gzip.open(str(tmp_path), "wb", compresslevel=6) as sink:
+        for line in source:
+            sink.write(line)
+            try:
+                row = json.loads(line.decode("utf-8"))
+            except Exception:
+                continue
+            if not isinstance(row, dict):
+                continue
+            count += 1
+            if row.get("user_id"):
+                users.add(str(row["user_id"]))
+            stamp = event_time(row)
+            if stamp is not None:
+                first_at = stamp if first_at is None else min(first_at, stamp)
+                last_at = stamp if last_at is None else max(last_at, stamp)
+    os.replace(str(tmp_path), str(target))
+    return {
+        "count": count,
+        "first_at": first_at,
+        "last_at": last_at,
+        "users": sorted(users),
+        "raw_bytes": raw_path.stat().st_size,
+        "bytes": target.stat().st_size,
+    }
+
+
+def _apply_retention(path: Path, manifest: Dict[str, Any], policy: SegmentPolicy, now: float) -> None:
+    if policy.retention_days <= 0:
+        return
+    cutoff = now - policy.retention_days * 86400
+    kept = []
+    for entry in manifest["segments"]:
+        last_at = entry.get("last_at")
+        if entry.get("sealed") and last_at is not None and last_at < cutoff:
+            try:
+                (segments_dir(path) / str(entry.get("file", ""))).unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        kept.append(entry)
+    manifest["segments"] = kept
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    target = manifest_path(path)
+    tmp_path = target.with_name("{0}.{1}.tmp".format(target.name, os.getpid()))
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(str(tmp_path), str(target))
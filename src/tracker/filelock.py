@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms run without cross-process locks
+    fcntl = None
+
+
+@contextmanager
+def file_lock(lock_path: Union[str, Path], exclusive: bool = True) -> Iterator[None]:
+    """
+    Hold an advisory flock on lock_path (shared or exclusive) for the block.
+    """
+    path = Path(lock_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,505 @@
+"""
+SQLite-backed user profile store.
+
+Profiles keep the same dict shape main.py works with, but are persisted in
+normalized tables (interest tags, read/source history, saved items, learning
+state, and one row per remaining top-level field). save() diffs the profile
+against the last loaded/saved snapshot and writes only the changed rows inside
+one transaction, so write volume per tap stays constant as histories grow.
+
+Usage:
+  python3 src/tracker/profile_store.py migrate   # import data/profiles/*.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+PROFILE_SCHEMA_VERSION = 3
+STATE_FIELDS = ("learning", "cold_start", "last_item")
+LIST_FIELDS = ("read_history", "source_history", "saved_items")
+MANAGED_FIELDS = ("interest_tags", "interest_updated_at") + STATE_FIELDS + LIST_FIELDS
+
+
+def _split_extra_fields(conn: sqlite3.Connection) -> None:
+    """v2: move the single extra_json blob into per-field rows."""
+    rows = conn.execute("SELECT user_id, extra_json FROM profiles").fetchall()
+    for user_id, extra_json in rows:
+        extra = _loads(extra_json, {})
+        if not isinstance(extra, dict):
+            continue
+        conn.executemany(
+            "INSERT OR REPLACE INTO profile_fields(user_id, field, value) VALUES (?, ?, ?)",
+            [(user_id, str(field), _dumps(value)) for field, value in extra.items()],
+        )
+    conn.execute("UPDATE profiles SET extra_json = '{}'")
+
+
+_MIGRATIONS: Dict[int, List[Any]] = {
+    1: [
+        """
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            learning_json TEXT NOT NULL DEFAULT '{}',
+            cold_start_json TEXT NOT NULL DEFAULT '{}',
+            last_item_json TEXT NOT NULL DEFAULT '{}',
+            extra_json TEXT NOT NULL DEFAULT '{}',
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS interest_tags (
+            user_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (user_id, tag)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS read_history (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS source_history (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS saved_items (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        ) WITHOUT ROWID
+        """,
+    ],
+    2: [
+        """
+        CREATE TABLE IF NOT EXISTS profile_fields (
+            user_id TEXT NOT NULL,
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, field)
+        ) WITHOUT ROWID
+        """,
+        _split_extra_fields,
+    ],
+    3: [
+        # Per-tag last-update time for lazy interest decay; existing tags start decaying now.
+        "ALTER TABLE interest_tags ADD COLUMN updated_at REAL NOT NULL DEFAULT 0",
+        "UPDATE interest_tags SET updated_at = CAST(strftime('%s', 'now') AS REAL)",
+    ],
+}
+
+_STORES: Dict[str, "ProfileStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class ProfileStore:
+    """
+    One long-lived WAL connection per process; snapshots double as a hot-profile cache.
+    """
+
+    def __init__(self, db_path: Union[str, Path], legacy_dir: Optional[Union[str, Path]] = None) -> None:
+        self.db_path = str(db_path)
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._migrate()
+
+    def _migrate(self) -> None:
+        with self._lock:
+            current = int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+            if current >= PROFILE_SCHEMA_VERSION:
+                return
+            with self._transaction():
+                for version in sorted(_MIGRATIONS):
+                    if version > current:
+                        for statement in _MIGRATIONS[version]:
+                            if callable(statement):
+                                statement(self._conn)
+                            else:
+                                self._conn.execute(statement)
+                self._conn.execute("PRAGMA user_version = {0}".format(int(PROFILE_SCHEMA_VERSION)))
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the profile dict, importing a legacy JSON profile on first access.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                legacy = self._read_legacy(user_id)
+                if legacy is None:
+                    return None
+                self.save(user_id, legacy)
+                return copy.deepcopy(legacy)
+
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is None or snapshot["version"] != int(row[0]):
+                snapshot = self._read_snapshot(user_id)
+                self._snapshots[user_id] = snapshot
+            return copy.deepcopy(snapshot["profile"])
+
+    def save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """
+        Persist only what changed since the last load/save, in one transaction.
+        """
+        with self._lock:
+            with self._transaction():
+                snapshot = self._snapshots.get(user_id)
+                row = self._conn.execute("SELECT version FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+                if row is None:
+                    snapshot = _empty_snapshot()
+                    self._conn.execute(
+                        "INSERT INTO profiles(user_id, version, updated_at) VALUES (?, 0, ?)",
+                        (user_id, _now_iso()),
+                    )
+                elif snapshot is None or snapshot["version"] != int(row[0]):
+                    # Another process wrote this user since our snapshot: diff against the stored rows.
+                    snapshot = self._read_snapshot(user_id)
+
+                new_snapshot = self._write_diff(user_id, snapshot, profile)
+            self._snapshots[user_id] = new_snapshot
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            with self._transaction():
+                for table in ("profiles", "profile_fields", "interest_tags") + LIST_FIELDS:
+                    self._conn.execute("DELETE FROM {0} WHERE user_id = ?".format(table), (user_id,))
+            self._snapshots.pop(user_id, None)
+
+    def _write_diff(self, user_id: str, snapshot: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+        encoded = dict(snapshot["encoded"])
+        state_columns = {}
+        for field in STATE_FIELDS:
+            value = _dumps(profile.get(field, {}))
+            if value != encoded.get(field):
+                state_columns[field] = value
+        # Remaining top-level fields (queues, indexes, ...) are diffed per key, so a
+        # small field changing every tap does not rewrite a large one next to it.
+        fields = {str(key): _dumps(value) for key, value in profile.items() if key not in MANAGED_FIELDS}
+        old_fields = snapshot["fields"]
+        changed_fields = [(user_id, key, value) for key, value in fields.items() if old_fields.get(key) != value]
+        removed_fields = [(user_id, key) for key in old_fields if key not in fields]
+
+        interest = _normalize_interest(
+            profile.get("interest_tags", {}), profile.get("interest_updated_at", {}), snapshot["interest"]
+        )
+        old_interest = snapshot["interest"]
+        changed_tags = [
+            (user_id, tag, weight, updated_at)
+            for tag, (weight, updated_at) in interest.items()
+            if old_interest.get(tag) != (weight, updated_at)
+        ]
+        removed_tags = [(user_id, tag) for tag in old_interest if tag not in interest]
+
+        list_diffs = {}
+        for field in LIST_FIELDS:
+            values = profile.get(field, [])
+            if not isinstance(values, list):
+                values = []
+            list_diffs[field] = _diff_list(snapshot["lists"][field], [_dumps(value) for value in values])
+
+        has_list_changes = any(deleted or appended for deleted, appended, _ in list_diffs.values())
+        if not (state_columns or changed_fields or removed_fields or changed_tags or removed_tags or has_list_changes):
+            new_snapshot = dict(snapshot)
+            new_snapshot["profile"] = copy.deepcopy(profile)
+            return new_snapshot
+
+        assignments = ["version = version + 1", "updated_at = ?"]
+        params: List[Any] = [_now_iso()]
+        for field, value in state_columns.items():
+            assignments.append("{0}_json = ?".format(field))
+            params.append(value)
+        params.append(user_id)
+        self._conn.execute("UPDATE profiles SET {0} WHERE user_id = ?".format(", ".join(assignments)), params)
+
+        if changed_fields:
+            self._conn.executemany(
+                """
+                INSERT INTO profile_fields(user_id, field, value) VALUES (?, ?, ?)
+                ON CONFLICT(user_id, field) DO UPDATE SET value = excluded.value
+                """,
+                changed_fields,
+            )
+        if removed_fields:
+            self._conn.executemany("DELETE FROM profile_fields WHERE user_id = ? AND field = ?", removed_fields)
+
+        if changed_tags:
+            self._conn.executemany(
+                """
+                INSERT INTO interest_tags(user_id, tag, weight, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id, tag) DO UPDATE SET weight = excluded.weight, updated_at = excluded.updated_at
+                """,
+                changed_tags,
+            )
+        if removed_tags:
+            self._conn.executemany("DELETE FROM interest_tags WHERE user_id = ? AND tag = ?", removed_tags)
+
+        lists = {}
+        for field, (deleted, appended, rows) in list_diffs.items():
+            if deleted:
+                self._conn.executemany(
+                    "DELETE FROM {0} WHERE user_id = ? AND seq = ?".format(field),
+                    [(user_id, seq) for seq in deleted],
+                )
+            if appended:
+                self._conn.executemany(
+                    "INSERT INTO {0}(user_id, seq, value) VALUES (?, ?, ?)".format(field),
+                    [(user_id, seq, value) for seq, value in appended],
+                )
+            lists[field] = rows
+
+        encoded.update(state_columns)
+        return {
+            "version": int(snapshot["version"]) + 1,
+            "encoded": encoded,
+            "fields": fields,
+            "interest": interest,
+            "lists": lists,
+            "profile": copy.deepcopy(profile),
+        }
+
+    def _read_snapshot(self, user_id: str) -> Dict[str, Any]:
+        row = self._conn.execute(
+            """
+            SELECT version, learning_json, cold_start_json, last_item_json
+            FROM profiles WHERE user_id = ?
+            """,
+            (user_id,),
+        ).fetchone()
+        if row is None:
+            return _empty_snapshot()
+
+        encoded = {"learning": row[1], "cold_start": row[2], "last_item": row[3]}
+        fields = {
+            field: value
+            for field, value in self._conn.execute(
+                "SELECT field, value FROM profile_fields WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        }
+        profile = {field: _loads(value, None) for field, value in fields.items()}
+        for field in STATE_FIELDS:
+            profile[field] = _loads(encoded[field], {})
+
+        # Oldest updates first, so dict order doubles as the pruning order in main.
+        interest = {
+            tag: (float(weight), float(updated_at))
+            for tag, weight, updated_at in self._conn.execute(
+                "SELECT tag, weight, updated_at FROM interest_tags WHERE user_id = ? ORDER BY updated_at, tag",
+                (user_id,),
+            ).fetchall()
+        }
+        profile["interest_tags"] = {tag: value[0] for tag, value in interest.items()}
+        profile["interest_updated_at"] = {tag: value[1] for tag, value in interest.items()}
+
+        lists = {}
+        for field in LIST_FIELDS:
+            rows = self._conn.execute(
+                "SELECT seq, value FROM {0} WHERE user_id = ? ORDER BY seq".format(field), (user_id,)
+            ).fetchall()
+            lists[field] = [(int(seq), value) for seq, value in rows]
+            profile[field] = [_loads(value, None) for _, value in rows]
+
+        return {
+            "version": int(row[0]),
+            "encoded": encoded,
+            "fields": fields,
+            "interest": interest,
+            "lists": lists,
+            "profile": profile,
+        }
+
+    def _read_legacy(self, user_id: str) -> Optional[Dict[str, Any]]:
+        if self.legacy_dir is None:
+            return None
+        path = self.legacy_dir / "{0}.json".format(user_id)
+        if not path.exists():
+            return None
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+def get_profile_store(db_path: Union[str, Path], legacy_dir: Optional[Union[str, Path]] = None) -> ProfileStore:
+    """
+    Return the process-wide profile store for db_path.
+    """
+    key = "{0}:{1}".format(os.getpid(), os.path.abspath(str(db_path)))
+    store = _STORES.get(key)
+    if store is not None:
+        return store
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = ProfileStore(db_path, legacy_dir=legacy_dir)
+            _STORES[key] = store
+    return store
+
+
+def migrate_json_profiles(store: ProfileStore, profiles_dir: Union[str, Path]) -> Dict[str, int]:
+    """
+    Import every legacy data/profiles/*.json profile that is not in the store yet.
+    """
+    imported = 0
+    skipped = 0
+    for path in sorted(Path(profiles_dir).glob("*.json")):
+        user_id = path.stem
+        with store._lock:
+            exists = store._conn.execute("SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if exists:
+            skipped += 1
+            continue
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                profile = json.load(f)
+        except Exception:
+            skipped += 1
+            continue
+        if not isinstance(profile, dict):
+            skipped += 1
+            continue
+        store.save(user_id, profile)
+        imported += 1
+    return {"imported": imported, "skipped": skipped}
+
+
+def _diff_list(
+    old_rows: List[Tuple[int, str]],
+    new_values: List[str],
+) -> Tuple[List[int], List[Tuple[int, str]], List[Tuple[int, str]]]:
+    """
+    Lists only ever drop entries and append at the end (dedup + cap), so keep the
+    longest in-order prefix match and turn the rest into deletes and appends.
+    Returns (deleted seqs, appended rows, resulting rows).
+    """
+    kept: List[Tuple[int, str]] = []
+    matched = set()
+    old_index = 0
+    new_index = 0
+    while new_index < len(new_values):
+        probe = old_index
+        while probe < len(old_rows) and old_rows[probe][1] != new_values[new_index]:
+            probe += 1
+        if probe >= len(old_rows):
+            break
+        kept.append(old_rows[probe])
+        matched.add(probe)
+        old_index = probe + 1
+        new_index += 1
+
+    deleted = [seq for index, (seq, _) in enumerate(old_rows) if index not in matched]
+    next_seq = (old_rows[-1][0] + 1) if old_rows else 1
+    appended = []
+    for value in new_values[new_index:]:
+        appended.append((next_seq, value))
+        next_seq += 1
+    return deleted, appended, kept + appended
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {
+        "version": 0,
+        "encoded": {},
+        "fields": {},
+        "interest": {},
+        "lists": {field: [] for field in LIST_FIELDS},
+        "profile": {},
+    }
+
+
+def _normalize_interest(
+    raw: Any, raw_stamps: Any, previous: Dict[str, Tuple[float, float]]
+) -> Dict[str, Tuple[float, float]]:
+    """tag -> (weight, updated_at); tags without a timestamp keep the stored one, or now."""
+    if not isinstance(raw, dict):
+        return {}
+    stamps = raw_stamps if isinstance(raw_stamps, dict) else {}
+    now = time.time()
+    interest = {}
+    for tag, value in raw.items():
+        tag = str(tag)
+        try:
+            weight = float(value)
+        except Exception:
+            continue
+        try:
+            updated_at = float(stamps[tag])
+        except Exception:
+            updated_at = previous[tag][1] if tag in previous else now
+        interest[tag] = (weight, updated_at)
+    return interest
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _loads(raw: Optional[str], default: Any) -> Any:
+    try:
+        return json.loads(raw) if raw else default
+    except Exception:
+        return default
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main() -> int:
+    root_dir = Path(__file__).resolve().parent.parent.parent
+    parser = argparse.ArgumentParser(description="Brush blog profile store")
+    parser.add_argument("action", choices=["migrate"], help="store action")
+    parser.add_argument("--db", default=str(root_dir / "data" / "profiles.db"), help="profile database path")
+    parser.add_argument("--profiles-dir", default=str(root_dir / "data" / "profiles"), help="legacy JSON profiles dir")
+    args = parser.parse_args()
+
+    store = get_profile_store(args.db, legacy_dir=args.profiles_dir)
+    result = migrate_json_profiles(store, args.profiles_dir)
+    print("迁移完成：导入 {0} 个画像，跳过 {1} 个".format(result["imported"], result["skipped"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    raise SystemExit(main())
@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from tracker.filelock import file_lock
+
+
+BUCKET_SECONDS = 3600
+COMPACT_MIN_LINES = 1000
+COMPACT_GARBAGE_RATIO = 4
+
+_STORES: Dict[str, "SharedReadHistory"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class SharedReadHistory:
+    """
+    Append-only shared read log with an in-memory URL index.
+
+    Each view appends one JSON line with O_APPEND, so concurrent writers never
+    overwrite each other. The index maps URL -> last read time and is kept in
+    hourly buckets so the expiry window drops whole buckets instead of scanning.
+    New lines written by other processes are picked up by tailing from the last
+    offset; the log is compacted to live entries once it is mostly garbage.
+    """
+
+    def __init__(
+        self,
+        log_path: Union[str, Path],
+        window_hours: int = 24,
+        legacy_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.log_path = Path(log_path)
+        self.lock_path = self.log_path.with_name(self.log_path.name + ".lock")
+        self.window_seconds = max(1, int(window_hours)) * 3600
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._lock = threading.RLock()
+        self._last_read: Dict[str, float] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._log_lines = 0
+
+    def contains(self, url: str, now: Optional[float] = None) -> bool:
+        with self._lock:
+            self._sync(now)
+            read_at = self._last_read.get(url)
+        if read_at is None:
+            return False
+        return read_at >= (now if now is not None else time.time()) - self.window_seconds
+
+    def recent_urls(self, now: Optional[float] = None) -> List[str]:
+        """URLs read inside the window, oldest first."""
+        with self._lock:
+            self._sync(now)
+            cutoff = (now if now is not None else time.time()) - self.window_seconds
+            live = [(read_at, url) for url, read_at in self._last_read.items() if read_at >= cutoff]
+        live.sort()
+        return [url for _, url in live]
+
+    def entries(self, now: Optional[float] = None) -> List[Dict[str, str]]:
+        with self._lock:
+            self._sync(now)
+            cutoff = (now if now is not None else time.time()) - self.window_seconds
+            live = sorted((read_at, url) for url, read_at in self._last_read.items() if read_at >= cutoff)
+        return [{"url": url, "read_at": _iso_from_epoch(read_at)} for read_at, url in live]
+
+    def record(self, url: str, read_at: Optional[float] = None) -> None:
+        self.record_many([url], read_at=read_at)
+
+    def record_many(self, urls: Iterable[str], read_at: Optional[float] = None) -> None:
+        stamp = read_at if read_at is not None else time.time()
+        lines = []
+        for url in urls:
+            url = str(url or "").strip()
+            if url:
+                lines.append(json.dumps({"url": url, "read_at": _iso_from_epoch(stamp)}, ensure_ascii=False) + "\n")
+        if not lines:
+            return
+
+        with self._lock:
+            self._sync(stamp)
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.lock_path, exclusive=False):
+                fd = os.open(str(self.log_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, "".join(lines).encode("utf-8"))
+                finally:
+                    os.close(fd)
+            # Our own lines are applied by the next tail read, keeping one code path.
+            self._sync(stamp)
+            if self._needs_compaction():
+                self.compact(stamp)
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """Rewrite the log with live entries only (atomic replace under an exclusive lock)."""
+        with self._lock:
+            with file_lock(self.lock_path, exclusive=True):
+                self._sync(now, locked=True)
+                self._write_live_log(now)
+
+    def _needs_compaction(self) -> bool:
+        live = len(self._last_read)
+        return self._log_lines > max(COMPACT_MIN_LINES, COMPACT_GARBAGE_RATIO * live)
+
+    def _write_live_log(self, now: Optional[float]) -> None:
+        cutoff = (now if now is not None else time.time()) - self.window_seconds
+        live = sorted((read_at, url) for url, read_at in self._last_read.items() if read_at >= cutoff)
+        tmp_path = self.log_path.with_name(self.log_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for read_at, url in live:
+                f.write(json.dumps({"url": url, "read_at": _iso_from_epoch(read_at)}, ensure_ascii=False) + "\n")
+        os.replace(str(tmp_path), str(self.log_path))
+        self._reset_index()
+        self._tail(now)
+
+    def _sync(self, now: Optional[float] = None, locked: bool = False) -> None:
+        if not self.log_path.exists() and self.legacy_path is not None and self.legacy_path.exists():
+            self._import_legacy(now, locked)
+        self._tail(now)
+        self._expire(now)
+
+    def _import_legacy(self, now: Optional[float], locked: bool) -> None:
+        """Seed the log from the old rewrite-everything JSON list once."""
+        try:
+            with self.legacy_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = []
+        if not isinstance(data, list):
+            data = []
+
+        def _seed() -> None:
+            if self.log_path.exists():
+                return
+            self._reset_index()
+            for value in data:
+                parsed = _parse_entry(value)
+                if parsed is not None:
+                    self._apply(parsed[0], parsed[1])
+            self._write_live_log(now)
+
+        if locked:
+            _seed()
+        else:
+            with file_lock(self.lock_path, exclusive=True):
+                _seed()
+
+    def _tail(self, now: Optional[float]) -> None:
+        try:
+            stat = self.log_path.stat()
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset_index()
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Replaced by compaction elsewhere: rebuild from the start.
+            self._reset_index()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+
+        with self.log_path.open("rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return
+        # Only complete lines are consumed; a half-written tail is read next time.
+        self._offset += end + 1
+        for raw in chunk[: end + 1].splitlines():
+            self._log_lines += 1
+            try:
+                value = json.loads(raw.decode("utf-8"))
+            except Exception:
+                continue
+            parsed = _parse_entry(value)
+            if parsed is not None:
+                self._apply(parsed[0], parsed[1])
+
+    def _apply(self, url: str, read_at: float) -> None:
+        previous = self._last_read.get(url)
+        if previous is not None:
+            if previous >= read_at:
+                return
+            bucket = self._buckets.get(_bucket_of(previous))
+            if bucket is not None:
+                bucket.discard(url)
+        self._last_read[url] = read_at
+        self._buckets.setdefault(_bucket_of(read_at), set()).add(url)
+
+    def _expire(self, now: Optional[float]) -> None:
+        cutoff = (now if now is not None else time.time()) - self.window_seconds
+        oldest_live_bucket = _bucket_of(cutoff)
+        for bucket_id in [key for key in self._buckets if key < oldest_live_bucket]:
+            for url in self._buckets.pop(bucket_id):
+                if _bucket_of(self._last_read.get(url, 0.0)) == bucket_id:
+                    del self._last_read[url]
+
+    def _reset_index(self) -> None:
+        self._last_read = {}
+        self._buckets = {}
+        self._offset = 0
+        self._inode = None
+        self._log_lines = 0
+
+
+def get_shared_read_history(
+    log_path: Union[str, Path],
+    window_hours: int = 24,
+    legacy_path: Optional[Union[str, Path]] = None,
+) -> SharedReadHistory:
+    """
+    Return the process-wide read history for log_path.
+    """
+    key = os.path.abspath(str(log_path))
+    store = _STORES.get(key)
+    if store is not None:
+        return store
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = SharedReadHistory(log_path, window_hours=window_hours, legacy_path=legacy_path)
+            _STORES[key] = store
+    return store
+
+
+def _parse_entry(value: Any) -> Optional[Tuple[str, float]]:
+    if isinstance(value, dict):
+        url = str(value.get("url", "") or "").strip()
+        read_at = _epoch_from_iso(str(value.get("read_at", "") or ""))
+    elif isinstance(value, str):
+        # Legacy string-list format has no timestamp; treat it as read now.
+        url = value.strip()
+        read_at = time.time()
+    else:
+        return None
+    if not url or read_at is None:
+        return None
+    return url, read_at
+
+
+def _bucket_of(epoch: float) -> int:
+    return int(epoch // BUCKET_SECONDS)
+
+
+def _iso_from_epoch(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _epoch_from_iso(value: str) -> Optional[float]:
+    text = value.strip()
+    if not text:
+        return None
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except Exception:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
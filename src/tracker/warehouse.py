@@ -0,0 +1,397 @@
+"""
+Columnar SQLite warehouse for behavior events.
+
+Events are compacted into one narrow fact table of integers:
+    events(ts, user_id, action_id, item_id, source_id, category_id, phase_id)
+Users, actions, items, sources, categories, learning phases and tags are
+dictionary-encoded into small dim_* tables. Item tags live once per item in
+item_tags rather than once per event. Covering indexes let the built-in
+aggregates (CTR per tag/source/category, views per hour, like/skip ratio per
+learning phase) run as index scans over tens of millions of rows.
+
+Ingestion is incremental. Sealed log segments are ingested once each. The
+active file is tailed from the last ingested offset, and when it rotates, the
+part already read is skipped in the sealed segment (matched by inode and a
+hash of the first line).
+
+Usage:
+  python3 src/tracker/warehouse.py ingest
+  python3 src/tracker/warehouse.py ctr --by tag
+  python3 src/tracker/warehouse.py views-per-hour
+  python3 src/tracker/warehouse.py phase-ratio
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tracker.event_segments import event_time, file_head, load_manifest, read_segment_lines  # noqa: E402
+
+WAREHOUSE_SCHEMA_VERSION = 1
+INGEST_BATCH_ROWS = 50000
+WAREHOUSE_CACHE_KIB = 256 * 1024
+VIEW_ACTION = "view"
+CLICK_ACTIONS = ("read", "like", "save")
+DIMENSIONS = ("user", "action", "item", "source", "category", "phase", "tag")
+
+_SCHEMA = [
+    *[
+        "CREATE TABLE IF NOT EXISTS dim_{0} (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)".format(name)
+        for name in DIMENSIONS
+    ],
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        ts INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        action_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        source_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        phase_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS item_tags (
+        item_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        PRIMARY KEY (item_id, tag_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS events_item_action ON events(item_id, action_id)",
+    "CREATE INDEX IF NOT EXISTS events_source_action ON events(source_id, action_id)",
+    "CREATE INDEX IF NOT EXISTS events_category_action ON events(category_id, action_id)",
+    "CREATE INDEX IF NOT EXISTS events_phase_action ON events(phase_id, action_id)",
+    "CREATE INDEX IF NOT EXISTS events_action_ts ON events(action_id, ts)",
+    "CREATE TABLE IF NOT EXISTS ingest_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+
+class EventWarehouse:
+    def __init__(self, db_path: Union[str, Path]) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        # Ingest touches five indexes per row; a larger page cache keeps them off disk.
+        self._conn.execute("PRAGMA cache_size=-{0}".format(WAREHOUSE_CACHE_KIB))
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.execute("PRAGMA user_version = {0}".format(WAREHOUSE_SCHEMA_VERSION))
+        self._dims: Dict[str, Dict[str, int]] = {}
+        self._load_dims()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def ingest(self, events_path: Union[str, Path]) -> Dict[str, int]:
+        """
+        Ingest everything not seen yet: new sealed segments, then the active file's tail.
+        """
+        path = Path(events_path)
+        totals = {"segments": 0, "events": 0}
+        with self._lock:
+            state = self._state()
+            done = set(state["segments"])
+            for entry in load_manifest(path)["segments"]:
+                seq = int(entry.get("seq", 0) or 0)
+                # Unsealed segments are picked up by a later run, once compressed and described.
+                if not entry.get("sealed") or seq in done:
+                    continue
+                key = _file_key(entry.get("inode", 0), entry.get("head", ""))
+                skip = state["partial"].pop(key, 0)
+                if key == state["active_key"]:
+                    # The file we were tailing was rotated since the last run.
+                    skip = state["active_offset"]
+                    state["active_key"] = ""
+                    state["active_offset"] = 0
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    count, _ = self._ingest_lines(read_segment_lines(path, entry), int(skip))
+                    done.add(seq)
+                    state["segments"] = sorted(done)
+                    self._save_state(state)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    self._load_dims()
+                    raise
+                totals["segments"] += 1
+                totals["events"] += count
+
+            try:
+                f = path.open("rb")
+            except FileNotFoundError:
+                return totals
+            with f:
+                key = _file_key(os.fstat(f.fileno()).st_ino, file_head(f))
+                if key != state["active_key"]:
+                    # Rotated but not sealed yet: remember how much of it we already have.
+                    if state["active_key"] and state["active_offset"]:
+                        state["partial"][state["active_key"]] = state["active_offset"]
+                    state["active_key"] = key
+                    state["active_offset"] = 0
+                f.seek(state["active_offset"])
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    count, consumed = self._ingest_lines(f, 0, complete_only=True)
+                    state["active_offset"] += consumed
+                    self._save_state(state)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    self._load_dims()
+                    raise
+            totals["events"] += count
+        return totals
+
+    def ctr(self, by: str = "tag", limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Views and clicks (read / like / save) per tag, source or category, most viewed first.
+        """
+        if by not in ("tag", "source", "category"):
+            raise ValueError("ctr can group by tag, source or category, got {0!r}".format(by))
+        if by == "tag":
+            # Count per item first (covering index scan), then spread item counts over item tags.
+            sql = """
+                SELECT it.tag_id, agg.action_id, SUM(agg.n)
+                FROM (SELECT item_id, action_id, COUNT(*) AS n FROM events GROUP BY item_id, action_id) AS agg
+                JOIN item_tags AS it ON it.item_id = agg.item_id
+                GROUP BY it.tag_id, agg.action_id
+            """
+        else:
+            sql = "SELECT {0}_id, action_id, COUNT(*) FROM events GROUP BY {0}_id, action_id".format(by)
+        with self._lock:
+            counts = self._action_counts(self._conn.execute(sql).fetchall())
+        names = self._names(by)
+        result = []
+        for key, per_action in counts.items():
+            views = per_action.get(VIEW_ACTION, 0)
+            clicks = sum(per_action.get(action, 0) for action in CLICK_ACTIONS)
+            if not views and not clicks:
+                continue
+            result.append(
+                {
+                    by: names.get(key, ""),
+                    "views": views,
+                    "clicks": clicks,
+                    "ctr": round(clicks / views, 4) if views else 0.0,
+                }
+            )
+        result.sort(key=lambda row: (-row["views"], -row["clicks"], row[by]))
+        return result[: max(1, int(limit))]
+
+    def views_per_hour(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        view_id = self._dims["action"].get(VIEW_ACTION, -1)
+        sql = "SELECT ts / 3600 AS hour, COUNT(*) FROM events WHERE action_id = ?"
+        params: List[Any] = [view_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(int(since))
+        if until is not None:
+            sql += " AND ts <= ?"
+            params.append(int(until))
+        sql += " GROUP BY hour ORDER BY hour"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"hour": datetime.fromtimestamp(hour * 3600, tz=timezone.utc).isoformat(), "views": int(count)}
+            for hour, count in rows
+        ]
+
+    def phase_ratio(self) -> List[Dict[str, Any]]:
+        """Likes vs skips per learning phase ("" = events logged before phases were recorded)."""
+        with self._lock:
+            counts = self._action_counts(
+                self._conn.execute("SELECT phase_id, action_id, COUNT(*) FROM events GROUP BY phase_id, action_id").fetchall()
+            )
+        names = self._names("phase")
+        result = []
+        for phase_id, per_action in counts.items():
+            likes = per_action.get("like", 0)
+            skips = per_action.get("skip", 0)
+            if not likes and not skips:
+                continue
+            result.append(
+                {
+                    "phase": names.get(phase_id, ""),
+                    "likes": likes,
+                    "skips": skips,
+                    "like_skip_ratio": round(likes / skips, 4) if skips else None,
+                }
+            )
+        result.sort(key=lambda row: row["phase"])
+        return result
+
+    def _action_counts(self, rows: Iterable[Tuple[int, int, int]]) -> Dict[int, Dict[str, int]]:
+        """(group id, action id, count) rows -> {group id: {action name: count}}."""
+        actions = self._names("action")
+        counts: Dict[int, Dict[str, int]] = {}
+        for key, action_id, count in rows:
+            per_action = counts.setdefault(key, {})
+            name = actions.get(action_id, "")
+            per_action[name] = per_action.get(name, 0) + int(count or 0)
+        return counts
+
+    def _ingest_lines(self, lines: Iterable[bytes], skip_bytes: int, complete_only: bool = False) -> Tuple[int, int]:
+        """Encode and insert lines (caller holds the transaction); returns (events, bytes consumed)."""
+        batch: List[Tuple[int, ...]] = []
+        count = 0
+        consumed = 0
+        for line in lines:
+            if complete_only and not line.endswith(b"\n"):
+                # A writer is mid-append; leave the partial line for the next run.
+                break
+            if consumed < skip_bytes:
+                consumed += len(line)
+                continue
+            consumed += len(line)
+            try:
+                row = json.loads(line.decode("utf-8"))
+            except Exception:
+                continue
+            if not isinstance(row, dict):
+                continue
+            batch.append(self._encode_row(row))
+            count += 1
+            if len(batch) >= INGEST_BATCH_ROWS:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+        return count, consumed
+
+    def _encode_row(self, row: Dict[str, Any]) -> Tuple[int, ...]:
+        metadata = row.get("metadata", {}) if isinstance(row.get("metadata", {}), dict) else {}
+        category = row.get("category") or metadata.get("category") or ""
+        item_id, new_item = self._encode("item", row.get("item_id"))
+        if new_item:
+            tags = row.get("tags", [])
+            if isinstance(tags, list):
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO item_tags(item_id, tag_id) VALUES (?, ?)",
+                    [(item_id, self._encode("tag", tag)[0]) for tag in tags if str(tag or "")],
+                )
+        return (
+            int(event_time(row) or 0),
+            self._encode("user", row.get("user_id"))[0],
+            self._encode("action", row.get("action"))[0],
+            item_id,
+            self._encode("source", row.get("source"))[0],
+            self._encode("category", category)[0],
+            self._encode("phase", row.get("phase"))[0],
+        )
+
+    def _encode(self, dimension: str, value: Any) -> Tuple[int, bool]:
+        text = str(value or "")
+        codes = self._dims[dimension]
+        code = codes.get(text)
+        if code is not None:
+            return code, False
+        cursor = self._conn.execute("INSERT OR IGNORE INTO dim_{0}(value) VALUES (?)".format(dimension), (text,))
+        created = cursor.rowcount == 1
+        if created:
+            code = int(cursor.lastrowid)
+        else:
+            # Another ingester added it since our dims were loaded.
+            code = int(self._conn.execute("SELECT id FROM dim_{0} WHERE value = ?".format(dimension), (text,)).fetchone()[0])
+        codes[text] = code
+        return code, created
+
+    def _insert(self, batch: List[Tuple[int, ...]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO events(ts, user_id, action_id, item_id, source_id, category_id, phase_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+    def _load_dims(self) -> None:
+        self._dims = {
+            name: {value: row_id for row_id, value in self._conn.execute("SELECT id, value FROM dim_{0}".format(name))}
+            for name in DIMENSIONS
+        }
+
+    def _names(self, dimension: str) -> Dict[int, str]:
+        return {code: value for value, code in self._dims[dimension].items()}
+
+    def _state(self) -> Dict[str, Any]:
+        row = self._conn.execute("SELECT value FROM ingest_state WHERE key = 'log'").fetchone()
+        try:
+            state = json.loads(row[0]) if row else {}
+        except ValueError:
+            state = {}
+        return {
+            "segments": list(state.get("segments", [])),
+            # "inode:head" of the active file being tailed, and how far it has been read.
+            "active_key": str(state.get("active_key", "") or ""),
+            "active_offset": int(state.get("active_offset", 0) or 0),
+            # Rotated-but-unsealed files: "inode:head" -> bytes already ingested.
+            "partial": dict(state.get("partial", {})),
+        }
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT INTO ingest_state(key, value) VALUES ('log', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (json.dumps(state, separators=(",", ":")),),
+        )
+
+
+def _file_key(inode: Any, head: Any) -> str:
+    return "{0}:{1}".format(int(inode or 0), head or "")
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        print("（无数据）")
+        return
+    columns = list(rows[0].keys())
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if row[column] is None else str(row[column]) for column in columns))
+
+
+def main() -> int:
+    root_dir = Path(__file__).resolve().parent.parent.parent
+    parser = argparse.ArgumentParser(description="Brush blog behavior event warehouse")
+    parser.add_argument("action", choices=["ingest", "ctr", "views-per-hour", "phase-ratio"], help="warehouse action")
+    parser.add_argument("--db", default=str(root_dir / "data" / "warehouse.db"), help="warehouse database path")
+    parser.add_argument(
+        "--events", default=str(root_dir / "data" / "behavior_events.jsonl"), help="active behavior events file"
+    )
+    parser.add_argument("--by", default="tag", choices=["tag", "source", "category"], help="ctr grouping")
+    parser.add_argument("--limit", type=int, default=20, help="max rows for ctr")
+    parser.add_argument("--no-ingest", action="store_true", help="query without ingesting new events first")
+    args = parser.parse_args()
+
+    warehouse = EventWarehouse(args.db)
+    try:
+        if args.action == "ingest" or not args.no_ingest:
+            result = warehouse.ingest(args.events)
+            if args.action == "ingest":
+                print("入仓完成：{0} 个分段，{1} 条事件".format(result["segments"], result["events"]))
+                return 0
+        if args.action == "ctr":
+            _print_rows(warehouse.ctr(by=args.by, limit=args.limit))
+        elif args.action == "views-per-hour":
+            _print_rows(warehouse.views_per_hour())
+        else:
+            _print_rows(warehouse.phase_ratio())
+    finally:
+        warehouse.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())